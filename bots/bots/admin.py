@@ -1038,6 +1038,13 @@ class TranslateAdmin(BotsAdmin):
                 "fields": ("alt", "frompartner", "topartner"),
             },
         ),
+        (
+            _("Validation of outgoing message"),
+            {
+                "fields": ("rsrv1", "rsrv2"),
+                "classes": ("collapse",),
+            },
+        ),
     )
 
     def add_view(self, request, form_url='', extra_context=None):
@@ -7,6 +7,7 @@ import sys
 # bots-modules
 from . import botsglobal
 from . import botslib
+from . import grammarcache
 from .botsconfig import (
     OK,
     DONE,
@@ -52,7 +53,11 @@ def evaluate(command, rootidtaofrun):
         traceofinfile.make_file_report()
     make_run_report(rootidtaofrun, resultsofrun, command, totalfilesize)
     # return report status: 0 (no error) or 1 (error)
-    return email_error_report(rootidtaofrun)
+    reportstatus = email_error_report(rootidtaofrun)
+    # use of grammars in memory and shared record definitions are reported per run
+    grammarcache.stats.clear()
+    grammarcache.internstats.clear()
+    return reportstatus
 
 
 def make_run_report(rootidtaofrun, resultsofrun, command, totalfilesize):
@@ -163,6 +168,20 @@ def email_error_report(rootidtaofrun) -> int:
         subject += _("; %d process errors") % (results["processerrors"])
         reporttext += _("    %d errors in processes.\n") % (results["processerrors"])
     reporttext += _("    %d files send in run.\n") % (results["send"])
+    if grammarcache.stats['hits'] or grammarcache.stats['misses']:
+        reporttext += _(
+            "    %(hits)d grammars used from memory, %(misses)d grammars read, %(evictions)d dropped.\n"
+        ) % {
+            "hits": grammarcache.stats['hits'],
+            "misses": grammarcache.stats['misses'],
+            "evictions": grammarcache.stats['evictions'],
+        }
+    if grammarcache.internstats:
+        reporttext += _("    Shared record definitions, memory saved: %(saved)s.\n") % {
+            "saved": ', '.join(
+                f'{directory} {memory // 1024} KB' for directory, memory in sorted(grammarcache.internstats.items())
+            )
+        }
 
     # log the report texts
     botsglobal.logger.info(reporttext)
@@ -39,6 +39,11 @@ QUERIES = 7
 SUBTRANSLATION = 8
 BOTSIDNR = 9
 FIXED_RECORD_LENGTH = 10  # length of fixed record
+NEXTINDEX = 11  # dict recordID -> index of first next record with this recordID in the level
+NEXTMANDATORY = 12  # index of first mandatory record after this record in the level
+FIXED_SLICES = 13  # fixed records: tuple of (field ID, slice of field in record); slice is None for BOTSID if noBOTSID
+FIELDINDEX = 14  # dict field ID -> position of field in compact record (node.Record); BOTSIDnr is first
+LEVELINDEX = 15  # records with LEVEL: dict (recordID, BOTSIDnr) -> index of record in LEVEL
 
 # ***grammar.recorddefs: dict keys for fields of record
 # eg: record[FIELDS][ID] == 'C124.0034'
@@ -53,10 +58,10 @@ MINLENGTH = 6
 BFORMAT = 7  # internal bots format; formats in grammar are converted to bformat
 MAXREPEAT = 8
 
-# ***lex_record in self.lex_records: is a dict
+# ***token of lex_record in self.lex_records: is a dict (outmessage) or inmessage.LexToken (inmessage, indexed the same way)
 VALUE = 0
 SFIELD = 1  # 1: is subfield, 0: field or first element composite
-LIN = 2
+LIN = 2  # not in inmessage.LexToken: line/pos is computed from LexRecord.offset and LexToken.pos
 POS = 3
 FIXEDLINE = 4  # for fixed records; tmp storage of fixed record
 FORMATFROMGRAMMAR = 5  # to store FORMAT field has in grammar
@@ -296,6 +296,8 @@ def generalinit(configdir=None):
     # initialise bots charsets
     initbotscharsets()
     node.Node.checklevel = botsglobal.ini.getint('settings', 'get_checklevel', 1)
+    node.Node.childindex = botsglobal.ini.getint('settings', 'node_childindex', 0)
+    node.Node.compactrecords = botsglobal.ini.getboolean('settings', 'compact_records', False)
     botslib.settimeout(botsglobal.ini.getint('settings', 'globaltimeout', 10))
 
     ############################################################################
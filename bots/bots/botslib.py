@@ -12,6 +12,7 @@ import os
 import platform
 import socket
 import sys
+import time
 
 import django
 from django.utils.translation import gettext
@@ -102,6 +103,16 @@ class _Transaction:
         'rsrv4',
         'rsrv5',
     )
+    # query to copy a transaction (copyta, copytas)
+    copyquery = """INSERT INTO ta (
+                script,status,parent,frompartner,topartner,fromchannel,tochannel,editype,messagetype,
+                alt,merge,testindicator,reference,frommail,tomail,charset,contenttype,filename,idroute,
+                nrmessages,botskey,envelope,rsrv3,cc)
+            SELECT %(script)s,%(newstatus)s,idta,frompartner,topartner,fromchannel,tochannel,editype,messagetype,
+                alt,merge,testindicator,reference,frommail,tomail,charset,contenttype,filename,idroute,nrmessages,
+                botskey,envelope,rsrv3,cc
+            FROM ta
+            WHERE idta=%(idta)s"""
     # stack for bots-processes. last one is the current process; starts with 1 element in list: root
     processlist = [0]
     idta = None
@@ -165,21 +176,25 @@ class _Transaction:
         """
         script = _Transaction.processlist[-1]
         newidta = insertta(
-            """INSERT INTO ta (
-                script,status,parent,frompartner,topartner,fromchannel,tochannel,editype,messagetype,
-                alt,merge,testindicator,reference,frommail,tomail,charset,contenttype,filename,idroute,
-                nrmessages,botskey,envelope,rsrv3,cc)
-            SELECT %(script)s,%(newstatus)s,idta,frompartner,topartner,fromchannel,tochannel,editype,messagetype,
-                alt,merge,testindicator,reference,frommail,tomail,charset,contenttype,filename,idroute,nrmessages,
-                botskey,envelope,rsrv3,cc
-            FROM ta
-            WHERE idta=%(idta)s""",
+            self.copyquery,
             {'idta': self.idta, 'script': script, 'newstatus': status},
         )
         newta = OldTransaction(newidta)
         newta.update(**ta_info)
         return newta
 
+    def copytas(self, status, number):
+        """
+        copy old transaction number times, return list of new transactions.
+        the new transactions are inserted with one commit; update them with updatetas().
+        """
+        script = _Transaction.processlist[-1]
+        newidtas = inserttas(
+            self.copyquery,
+            [{'idta': self.idta, 'script': script, 'newstatus': status}] * number,
+        )
+        return [OldTransaction(newidta) for newidta in newidtas]
+
 
 class OldTransaction(_Transaction):
     """Resurrect old transaction"""
@@ -353,6 +368,51 @@ def insertta(querystring, *args):
     return newidta
 
 
+def inserttas(querystring, args_list):
+    """
+    as insertta, for a list of parameters; all inserts with one commit.
+    returns list of idta's.
+    """
+    cursor = botsglobal.db.cursor()
+    newidtas = []
+    try:
+        for args in args_list:
+            cursor.execute(querystring, args)
+            newidta = cursor.lastrowid if hasattr(cursor, "lastrowid") else 0
+            if not newidta:
+                # no cursor.lastrowid with postgrSQL
+                cursor.execute("""SELECT lastval() as idta""")
+                newidta = dictfetchone(cursor)["idta"]
+            newidtas.append(newidta)
+    except Exception:
+        botsglobal.db.rollback()
+        raise
+    botsglobal.db.commit()
+    cursor.close()
+    return newidtas
+
+
+def updatetas(ta_infos):
+    """
+    update a list of db-ta's with one commit (executemany).
+    each dict in ta_infos has idta and the same keys.
+    Use a filter to update only valid fields in db-ta
+    """
+    if not ta_infos:
+        return 0
+    setstring = ','.join(f"{key}=%({key})s" for key in ta_infos[0] if key in _Transaction.filterlist)
+    cursor = botsglobal.db.cursor()
+    try:
+        cursor.executemany(f"""UPDATE ta SET {setstring} WHERE idta=%(idta)s""", ta_infos)
+    except Exception:
+        botsglobal.db.rollback()
+        raise
+    botsglobal.db.commit()
+    terug = cursor.rowcount
+    cursor.close()
+    return terug
+
+
 def unique_runcounter(domain, updatewith=None):
     """as unique, but per run of bots-engine."""
     # avoid using/mixing other values in botsglobal
@@ -599,7 +659,11 @@ def dirshouldbethere(path: str) -> bool:
         - False if path already exist
     """
     if path and not os.path.exists(path):
-        os.makedirs(path)
+        try:
+            os.makedirs(path)
+        except FileExistsError:
+            # made by other thread (eg mailbag writes in threads)
+            return False
         return True
     return False
 
@@ -947,8 +1011,21 @@ def lookup_translation(frommessagetype, fromeditype, alt, frompartner, topartner
     lookup the translation:
     frommessagetype,fromeditype,alt,frompartner,topartner -> mappingscript, tomessagetype, toeditype
     """
+    translation = lookup_translation_info(frommessagetype, fromeditype, alt, frompartner, topartner)
+    if translation is None:
+        # no translation found in translate table
+        return None, None, None
+    return translation['tscript'], translation['toeditype'], translation['tomessagetype']
+
+
+def lookup_translation_info(frommessagetype, fromeditype, alt, frompartner, topartner):
+    """
+    lookup the translation as lookup_translation, returns dict with tscript, toeditype, tomessagetype
+    and the validation profile of the translation: validation, validation_sample (None if not set).
+    returns None if no translation is found.
+    """
     for row2 in query(
-            """SELECT tscript,tomessagetype,toeditype
+            """SELECT tscript,tomessagetype,toeditype,rsrv1,rsrv2
             FROM translate
             WHERE frommessagetype = %(frommessagetype)s
             AND fromeditype = %(fromeditype)s
@@ -975,10 +1052,15 @@ def lookup_translation(frommessagetype, fromeditype, alt, frompartner, topartner
             }):
         # translation is found; only the first one is used
         # - this is what the ORDER BY in the query takes care of
-        return row2["tscript"], row2["toeditype"], row2["tomessagetype"]
-
-    # no translation found in translate table
-    return None, None, None
+        return {
+            'tscript': row2['tscript'],
+            'toeditype': row2['toeditype'],
+            'tomessagetype': row2['tomessagetype'],
+            # rsrv1 is used for validation, rsrv2 for validation_sample
+            'validation': row2['rsrv1'] or None,
+            'validation_sample': row2['rsrv2'],
+        }
+    return None
 
 
 def botsinfo():
@@ -1040,6 +1122,52 @@ def strftime(timeformat):
     return datetime().strftime(timeformat)
 
 
+def validdate(value):
+    """
+    check date of edi field: CCYYMMDD or YYMMDD.
+    Same as time.strptime with '%Y%m%d' or '%y%m%d' (YY 69-99 is 19YY, else 20YY);
+    dates of digits only (as usual) are checked without time.strptime (is slow).
+    """
+    if len(value) == 8:
+        timeformat = '%Y%m%d'
+    elif len(value) == 6:
+        timeformat = '%y%m%d'
+    else:
+        return False
+    try:
+        if value.isascii() and value.isdigit():
+            year = int(value[:-4])
+            if len(value) == 6:
+                year += 1900 if year >= 69 else 2000
+            python_datetime.date(year, int(value[-4:-2]), int(value[-2:]))
+        else:
+            time.strptime(value, timeformat)
+    except ValueError:
+        return False
+    return True
+
+
+def validtime(value):
+    """
+    check time of edi field: HHMM or HHMMSS.
+    Same as time.strptime with '%H%M' or '%H%M%S' (seconds up to 61);
+    times of digits only (as usual) are checked without time.strptime (is slow).
+    """
+    if len(value) == 4:
+        timeformat = '%H%M'
+    elif len(value) == 6:
+        timeformat = '%H%M%S'
+    else:
+        return False
+    if value.isascii() and value.isdigit():
+        return int(value[:2]) < 24 and int(value[2:4]) < 60 and (len(value) == 4 or int(value[4:]) < 62)
+    try:
+        time.strptime(value, timeformat)
+    except ValueError:
+        return False
+    return True
+
+
 def settimeout(milliseconds):
     """set a time-out for TCP-IP connections"""
     socket.setdefaulttimeout(milliseconds)
@@ -54,3 +54,8 @@ class BotsCursor(sqlite3.Cursor):
             query = reformatparamstyle.sub(r":\g<name>", string)
             # botsglobal.logger.debug('sqlite3.Cursor.execute("""%s""")', query)
             sqlite3.Cursor.execute(self, query, parameters)
+
+    def executemany(self, string, seq_of_parameters):
+        """sqlite3.Cursor.executemany"""
+        query = reformatparamstyle.sub(r":\g<name>", string)
+        sqlite3.Cursor.executemany(self, query, seq_of_parameters)
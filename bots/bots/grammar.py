@@ -5,7 +5,10 @@ Bots grammar lib
 # flake8: noqa:E501
 
 # bots-modules
+from . import botsglobal
 from . import botslib
+from . import grammarcache
+from . import grammarmanifest
 from .botsconfig import (
     DECIMALS,
     MINLENGTH,
@@ -19,9 +22,14 @@ from .botsconfig import (
     MAXREPEAT,
     SUBFIELDS,
     FIELDS,
+    FIELDINDEX,
     ISFIELD,
     FIXED_RECORD_LENGTH,
+    FIXED_SLICES,
     LEVEL,
+    LEVELINDEX,
+    NEXTINDEX,
+    NEXTMANDATORY,
     MANDATORY,
     FORMAT,
 )
@@ -34,7 +42,7 @@ from .exceptions import BotsImportError, GrammarError, GrammarPartMissing
 ERROR_IN_GRAMMAR = 'BOTS_error_1$%3@7#!%+_)_+[{]}'
 
 
-def grammarread(editype, grammarname, typeofgrammarfile) -> "Grammar":
+def grammarread(editype, grammarname, typeofgrammarfile, partners=()) -> "Grammar":
     """
     reads/imports a grammar (dispatch function for class Grammar and subclasses).
     typeofgrammarfile indicates some differences in reading/syntax handling:
@@ -42,7 +50,47 @@ def grammarread(editype, grammarname, typeofgrammarfile) -> "Grammar":
      - grammar: read whole grammar, get right syntax.
      - partners: only syntax is read
     grammars are imported from usersys/<'typeofgrammarfile'>/<editype>/<grammarname>.
+    partners: syntax of these partners (usersys/partners/<editype>/<partner>) overrules the syntax.
+    envelope and grammar are kept in memory (bots.ini grammar_memory_size); each call gets its own syntax,
+    the rest is shared (eg compiled formatters of fields).
+    with bots.ini grammar_cache: envelope and grammar are read from the grammar cache (no import, no checks).
     """
+    if typeofgrammarfile == 'partners':
+        return _grammarread(editype, grammarname, typeofgrammarfile)
+    key = (editype, grammarname, typeofgrammarfile, tuple(partner for partner in partners if partner))
+    grammarobject = grammarcache.get(key)
+    if grammarobject is None:
+        grammarobject = _grammarreadcached(editype, grammarname, typeofgrammarfile)
+        for partner in key[3]:
+            try:
+                partnersyntax = _grammarread(editype, partner, 'partners')
+            except BotsImportError:
+                # No partner specific syntax found (is not an error).
+                continue
+            # partner syntax overrules!
+            grammarobject.syntax.update(partnersyntax.syntax)
+            botsglobal.logger.debug(
+                'Partner syntax imported "%(filename)s".', {'filename': partnersyntax.module.__file__}
+            )
+        # compiled formatters of fields (message._formattable); shared by the copies, not in grammar cache.
+        grammarobject.formattables = {}
+        grammarcache.put(key, grammarobject)
+    return grammarobject.copy()
+
+
+def _grammarreadcached(editype, grammarname, typeofgrammarfile):
+    """reads a grammar; with bots.ini grammar_cache from the grammar cache."""
+    if not grammarcache.enabled():
+        return _grammarread(editype, grammarname, typeofgrammarfile)
+    state = grammarcache.load(editype, grammarname, typeofgrammarfile)
+    if state is None:
+        grammarobject = _grammarread(editype, grammarname, typeofgrammarfile)
+        state = grammarcache.save(editype, grammarname, typeofgrammarfile, grammarobject)
+    return Grammar.fromstate(state)
+
+
+def _grammarread(editype, grammarname, typeofgrammarfile):
+    """reads/imports a grammar; see grammarread."""
     # pylint: disable=protected-access
     try:
         classtocall = globals()[editype]
@@ -74,11 +122,12 @@ def grammarread(editype, grammarname, typeofgrammarfile) -> "Grammar":
                 envelopegrammar = classtocall(
                     typeofgrammarfile='grammars', editype=editype, grammarname=envelope
                 )
+                messagegrammar.grammarimports.append(envelopegrammar.grammarimports[0])
                 # Get right syntax: 2. update with syntax from envelope
                 messagegrammar.syntax.update(envelopegrammar.original_syntaxfromgrammar)
             except BotsImportError:
                 # not all envelopes have grammar files; eg csvheader, user defined envelope.
-                pass
+                messagegrammar.grammarimports.append(('grammars', editype, envelope))
         # Get right syntax: 3. update with syntax of messagetype
         messagegrammar.syntax.update(messagegrammar.original_syntaxfromgrammar)
         messagegrammar._init_restofgrammar()
@@ -104,6 +153,10 @@ def grammarread(editype, grammarname, typeofgrammarfile) -> "Grammar":
         # Get right syntax: 3. update with message syntax
         syntax.update(messagegrammar.original_syntaxfromgrammar)
         envelopegrammar.syntax = syntax
+        if envelopegrammar is not messagegrammar:
+            envelopegrammar.grammarimports.append(messagegrammar.grammarimports[0])
+        elif envelope:
+            envelopegrammar.grammarimports.append(('grammars', editype, envelope))
         envelopegrammar._init_restofgrammar()
         return envelopegrammar
 
@@ -151,7 +204,12 @@ class Grammar:
 
     def __init__(self, typeofgrammarfile, editype, grammarname):
         """import grammar; read syntax"""
+        if typeofgrammarfile == 'grammars' and grammarmanifest.enabled():
+            # module of grammar from grammar manifest (can be in subdirectory); not in manifest: BotsImportError
+            grammarname = grammarmanifest.modulename(editype, grammarname)
         self.module, self.grammarname = botslib.botsimport(typeofgrammarfile, editype, grammarname)
+        # grammar files read for this grammar (as arguments of botsimport); used by grammar cache.
+        self.grammarimports = [(typeofgrammarfile, editype, grammarname)]
         # get syntax from grammar file
         self.original_syntaxfromgrammar = getattr(self.module, 'syntax', {})
         if not isinstance(self.original_syntaxfromgrammar, dict):
@@ -160,6 +218,31 @@ class Grammar:
             )
         self.syntax = self.original_syntaxfromgrammar
 
+    @staticmethod
+    def fromstate(state):
+        """
+        make grammar from grammar cache state (grammarcache.load, grammarcache.save).
+        structure and recorddefs are shared, as for grammars read from the same module.
+        """
+        classtocall = globals()[state['class']]
+        grammarobject = classtocall.__new__(classtocall)
+        grammarobject.__dict__.update(state['attributes'])
+        return grammarobject
+
+    def copy(self):
+        """copy of grammar with its own syntax (syntax is changed, eg by outmessage); rest is shared."""
+        grammarobject = self.__class__.__new__(self.__class__)
+        grammarobject.__dict__.update(self.__dict__)
+        grammarobject.syntax = self.syntax.copy()
+        return grammarobject
+
+    def __getattr__(self, name):
+        """grammar from grammar cache: module is imported when used (eg user exit getmessagetype)."""
+        if name == 'module' and 'grammarimports' in self.__dict__:
+            self.module = botslib.botsimport(*self.grammarimports[0])[0]
+            return self.module
+        raise AttributeError(name)
+
     def _init_restofgrammar(self):
         self.nextmessage = getattr(self.module, 'nextmessage', None)
         self.nextmessage2 = getattr(self.module, 'nextmessage2', None)
@@ -194,6 +277,9 @@ class Grammar:
                 # mark recorddefs as 'already read - with errors'
                 self.recorddefs[ERROR_IN_GRAMMAR] = True
                 raise
+            if ERROR_IN_GRAMMAR not in self.recorddefs and grammarcache.interning():
+                # recorddefs are checked (first read): equal field definitions/records of other grammars are shared
+                grammarcache.internrecorddefs(self.recorddefs, grammarcache.directory(self.grammarimports[0]))
             # mark recorddefs as 'read and checked OK'
             self.recorddefs[ERROR_IN_GRAMMAR] = False
             # read structure
@@ -616,9 +702,26 @@ class Grammar:
                 )
                 # _exception.__cause__ = None
                 raise _exception from exc
+            i[FIELDINDEX] = self._fieldindex(i[FIELDS])
             if LEVEL in i:
                 self._linkrecorddefs2structure(i[LEVEL])
 
+    @staticmethod
+    def _fieldindex(fields):
+        """
+        positions of the fields in a compact record (node.Record): BOTSIDnr is first,
+        then the fields in order of the grammar: field, repeating field and repeating composite have one position;
+        each subfield of a non-repeating composite has a position.
+        """
+        fieldindex = {'BOTSIDnr': 0}
+        for field in fields:
+            if field[ISFIELD] or field[MAXREPEAT] > 1:
+                fieldindex[field[ID]] = len(fieldindex)
+            else:
+                for subfield in field[SUBFIELDS]:
+                    fieldindex[subfield[ID]] = len(fieldindex)
+        return fieldindex
+
     def _dostructure(self):
         """
         1. check the structure for validity.
@@ -675,6 +778,7 @@ class Grammar:
             self._checkbackcollision(self.structure)
             self._checknestedcollision(self.structure)
         self._checkbotscollision(self.structure)
+        self._compilestructure(self.structure)
 
     def _checkstructure(self, structure, mpath):
         """
@@ -839,6 +943,30 @@ class Grammar:
             if LEVEL in i:
                 self._checkbotscollision(i[LEVEL])
 
+    def _compilestructure(self, structure):
+        """
+        Recursive.
+        Add lookup tables for parsing incoming messages (inmessage._parseiter);
+        the parser jumps directly to the next position of a record instead of scanning the level.
+        - NEXTINDEX: dict recordID -> index of the first record with this recordID after this record.
+        - NEXTMANDATORY: index of the first mandatory record after this record
+          (length of level if there is none).
+        Add lookup table for checking/sorting of node trees (message._canonicaltree):
+        - LEVELINDEX (records with LEVEL): dict (recordID, BOTSIDnr) -> index of the record in LEVEL.
+        """
+        nextindex = {}
+        nextmandatory = len(structure)
+        for index in range(len(structure) - 1, -1, -1):
+            i = structure[index]
+            i[NEXTINDEX] = nextindex.copy()
+            i[NEXTMANDATORY] = nextmandatory
+            nextindex[i[ID]] = index
+            if i[MIN]:
+                nextmandatory = index
+            if LEVEL in i:
+                i[LEVELINDEX] = {(j[ID], j[BOTSIDNR]): position for position, j in enumerate(i[LEVEL])}
+                self._compilestructure(i[LEVEL])
+
     def _checknestedcollision(self, structure, collision=None):
         """
         Recursive.
@@ -989,6 +1117,8 @@ class csv(Grammar):
         "strict_syntax_check": False,  # for strict checks: no spaces between records
         "strip_value": False,  # Strip field value of incoming document
         'triad': '',
+        'validation': 'full',
+        'validation_sample': 0,
         'wrap_length': 0,  # for producing wrapped format, where a file consists of fixed length records ending with crr/lf. Often seen in mainframe, as400
         # settings needed as defaults, but not useful for this editype
         'checkunknownentities': True,
@@ -1054,6 +1184,8 @@ class fixed(Grammar):
         'merge': True,
         'noBOTSID': False,  # allow fixed records without record ID.
         'triad': '',
+        'validation': 'full',
+        'validation_sample': 0,
         # settings needed as defaults, but not useful for this editype
         'add_crlfafterrecord_sep': '',
         'checkunknownentities': True,
@@ -1130,6 +1262,18 @@ class fixed(Grammar):
                 i[FIXED_RECORD_LENGTH] -= -(
                     self.syntax['endrecordID'] - self.syntax['startrecordID']
                 )
+            # 4. table of slices of the fields in the record, used when parsing fixed records.
+            # if noBOTSID: BOTSID is not in the record (slice is None).
+            fixed_slices = []
+            position_in_record = 0
+            for field in i[FIELDS]:
+                if field[ID] == 'BOTSID' and self.syntax['noBOTSID']:
+                    fixed_slices.append((field[ID], None))
+                    continue
+                fixed_slices.append((field[ID], slice(position_in_record, position_in_record + field[LENGTH])))
+                position_in_record += field[LENGTH]
+            i[FIXED_SLICES] = tuple(fixed_slices)
+            i[FIELDINDEX] = self._fieldindex(i[FIELDS])
             # and go recursive
             if LEVEL in i:
                 self._linkrecorddefs2structure(i[LEVEL])
@@ -1165,6 +1309,8 @@ class idoc(fixed):
         'sfield_sep': '',
         'skip_char': '',
         'triad': '',
+        'validation': 'full',
+        'validation_sample': 0,
         # bots internal, never change/overwrite
         'has_structure': True,  # is True, read structure, recorddef, check these
         'checkcollision': True,
@@ -1205,6 +1351,8 @@ class xml(Grammar):
         # leads to this output in xml-file:  <?xml-stylesheet href="mystylesheet.xsl" type="text/xml"?><?type-of-ppi attr1="value1" attr2="value2"?>
         'standalone': None,  # as used in xml prolog; values: 'yes' , 'no' or None (not used)
         'triad': '',
+        'validation': 'full',
+        'validation_sample': 0,
         'version': '1.0',  # as used in xml prolog
         # settings needed as defaults, but not useful for this editype
         'add_crlfafterrecord_sep': '',
@@ -1248,6 +1396,8 @@ class xmlnocheck(xml):
         # leads to this output in xml-file:  <?xml-stylesheet href="mystylesheet.xsl" type="text/xml"?><?type-of-ppi attr1="value1" attr2="value2"?>
         'standalone': None,  # as used in xml prolog; values: 'yes' , 'no' or None (not used)
         'triad': '',
+        'validation': 'full',
+        'validation_sample': 0,
         'version': '1.0',  # as used in xml prolog
         # settings needed as defaults, but not useful for this editype
         'add_crlfafterrecord_sep': '',
@@ -1295,6 +1445,8 @@ class templatehtml(Grammar):
         'sfield_sep': '',
         'skip_char': '',
         'triad': '',
+        'validation': 'full',
+        'validation_sample': 0,
         # bots internal, never change/overwrite
         'has_structure': False,  # is True, read structure, recorddef, check these
         'checkcollision': False,
@@ -1346,6 +1498,8 @@ class edifact(Grammar):
         'quote_char': '',
         'record_tag_sep': '',  # Tradacoms/GTDI
         'triad': '',
+        'validation': 'full',
+        'validation_sample': 0,
         # bots internal, never change/overwrite
         'has_structure': True,  # is True, read structure, recorddef, check these
         'checkcollision': True,
@@ -1398,6 +1552,8 @@ class x12(Grammar):
         'quote_char': '',
         'record_tag_sep': '',  # Tradacoms/GTDI
         'triad': '',
+        'validation': 'full',
+        'validation_sample': 0,
         # bots internal, never change/overwrite
         # is True, read structure, recorddef, check these
         'has_structure': True,
@@ -1449,6 +1605,8 @@ class json(Grammar):
         'indented': False,  # False:  output is one string (no cr/lf); True:  output is indented/human readable
         'merge': False,
         'triad': '',
+        'validation': 'full',
+        'validation_sample': 0,
         # settings needed as defaults, but not useful for this editype
         'add_crlfafterrecord_sep': '',
         'escape': '',
@@ -1484,6 +1642,8 @@ class jsonnocheck(json):
         'indented': False,  # False:  output is one string (no cr/lf); True: output is indented/human readable
         'merge': False,
         'triad': '',
+        'validation': 'full',
+        'validation_sample': 0,
         # settings needed as defaults, but not useful for this editype
         'add_crlfafterrecord_sep': '',
         'escape': '',
@@ -1538,6 +1698,8 @@ class tradacoms(Grammar):
         'reserve': '',
         'skip_char': '\r\n',
         'triad': '',
+        'validation': 'full',
+        'validation_sample': 0,
         # bots internal, never change/overwrite
         'has_structure': True,  # is True, read structure, recorddef, check these
         'checkcollision': True,
@@ -0,0 +1,379 @@
+"""
+Bots grammar cache.
+Grammars read in a process are kept in memory (bots.ini grammar_memory_size), least recently used are dropped.
+Grammar cache on disk (bots.ini grammar_cache):
+A grammar that is read, checked and processed (grammar.grammarread) is pickled to a file in the grammar cache.
+Next runs load the grammar from the cache: no import of the grammar files, no checks.
+A cached grammar is valid as long as the grammar files it is read from are not changed
+(modification time and size; if these differ: hash of the file).
+Recorddefs are in separate cache files, shared by the grammars using the same recorddefs (eg edifact directory).
+Cache files are written to a temporary file and renamed, so the cache can be shared by several bots-engines.
+Shared record definitions (bots.ini grammar_intern): equal field definitions and records in the recorddefs of
+grammars (eg edifact directories D96A, D01B) are one (immutable) tuple.
+"""
+
+import ast
+import collections
+import hashlib
+import importlib.util
+import io
+import os
+import pickle
+import sys
+import tempfile
+
+# bots-modules
+from . import botsglobal, botslib
+
+# change if the content of cache files changes.
+CACHE_FORMAT = 2
+
+# bots source files that process grammars; a change gives other cache files.
+CODEFILES = ('grammar.py', 'grammarcache.py', 'botsconfig.py')
+
+# grammars read in this process, least recently used first;
+# key is (editype, grammarname, typeofgrammarfile, partners)
+_grammars = collections.OrderedDict()
+# use of grammars in memory (hits, misses, evictions); in report of run
+stats = collections.Counter()
+# recorddefs loaded/saved in this process, key is hash of recorddefs
+_recorddefs = {}
+# shared field definitions and records (tuples), key is the definition itself
+_interned = {}
+# memory saved by shared record definitions per grammar directory (eg edifact/D96A); in report of run
+internstats = collections.Counter()
+# dependency and imported modules per grammar file, for saving grammars in this process
+_sources = {}
+_codehash = []
+
+
+def get(key):
+    """grammar from grammars in memory; None if not in memory."""
+    grammarobject = _grammars.get(key)
+    if grammarobject is None:
+        stats['misses'] += 1
+        return None
+    _grammars.move_to_end(key)
+    stats['hits'] += 1
+    return grammarobject
+
+
+def put(key, grammarobject):
+    """keep grammar in memory; drop least recently used grammars (bots.ini grammar_memory_size)."""
+    size = botsglobal.ini.getint('settings', 'grammar_memory_size', 100)
+    if size <= 0:
+        return
+    _grammars[key] = grammarobject
+    while len(_grammars) > size:
+        _grammars.popitem(last=False)
+        stats['evictions'] += 1
+
+
+def enabled():
+    """grammar cache is used (bots.ini grammar_cache)."""
+    return botsglobal.ini.getboolean('settings', 'grammar_cache', False)
+
+
+def cachedir():
+    """directory of grammar cache (bots.ini grammar_cache_dir); default: botssys/grammarcache."""
+    return botslib.join(
+        botsglobal.ini.get(
+            'settings', 'grammar_cache_dir', os.path.join(botsglobal.ini.get('directories', 'botssys'), 'grammarcache')
+        )
+    )
+
+
+def load(editype, grammarname, typeofgrammarfile):
+    """
+    return state of grammar (see save) from the grammar cache;
+    None if not in cache or if grammar files are changed.
+    """
+    key = (editype, grammarname, typeofgrammarfile)
+    filename = _cachefilename(key)
+    try:
+        with open(filename, 'rb') as cachefile:
+            header = pickle.load(cachefile)
+            if header['format'] != CACHE_FORMAT or header['key'] != key or not isvalid(header['dependencies']):
+                botsglobal.logger.debug('Grammar cache: "%(filename)s" is out of date.', {'filename': filename})
+                return None
+            state = _Unpickler(cachefile, header['directory']).load()
+    except FileNotFoundError:
+        return None
+    except (
+        OSError, EOFError, AttributeError, ImportError, KeyError, TypeError, ValueError, pickle.UnpicklingError
+    ) as exc:
+        # unreadable (eg while written by older bots version): is written again.
+        botsglobal.logger.debug(
+            'Grammar cache: could not read "%(filename)s": %(exc)s', {'filename': filename, 'exc': exc}
+        )
+        return None
+    return state
+
+
+def save(editype, grammarname, typeofgrammarfile, grammarobject):
+    """
+    save grammar in grammar cache; return state of grammar.
+    state is a dict with class of grammar and attributes of grammar (not the imported module).
+    recorddefs are saved in a separate cache file; grammars with the same recorddefs use the same file.
+    """
+    key = (editype, grammarname, typeofgrammarfile)
+    state = {
+        'class': grammarobject.__class__.__name__,
+        'attributes': {name: value for name, value in vars(grammarobject).items() if name != 'module'},
+    }
+    filename = _cachefilename(key)
+    try:
+        recorddefs = state['attributes'].get('recorddefs')
+        digest = None
+        if recorddefs is not None:
+            content = pickle.dumps(recorddefs, pickle.HIGHEST_PROTOCOL)
+            digest = hashlib.sha256(content).hexdigest()
+            _recorddefs[digest] = recorddefs
+            if not os.path.exists(_recorddefsfilename(digest)):
+                writefile(_recorddefsfilename(digest), content)
+        cachefile = io.BytesIO()
+        pickle.dump(
+            {
+                'format': CACHE_FORMAT,
+                'key': key,
+                'directory': directory(grammarobject.grammarimports[0]),
+                'dependencies': dependencies(grammarobject.grammarimports),
+            },
+            cachefile,
+            pickle.HIGHEST_PROTOCOL,
+        )
+        _Pickler(cachefile, recorddefs, digest).dump(state)
+        writefile(filename, cachefile.getvalue())
+    except (OSError, AttributeError, TypeError, pickle.PicklingError) as exc:
+        # eg grammar has a lambda function: can not be pickled. Grammar is still used.
+        botsglobal.logger.debug(
+            'Grammar cache: could not write "%(filename)s": %(exc)s', {'filename': filename, 'exc': exc}
+        )
+    return state
+
+
+def clear():
+    """
+    forget grammars read in this process (cache files are kept).
+    used when grammar files are changed, eg by installing a plugin.
+    """
+    _grammars.clear()
+    _interned.clear()
+    _recorddefs.clear()
+    _sources.clear()
+
+
+class _Pickler(pickle.Pickler):
+    """pickle grammar state; recorddefs (and records in structure) are references to the recorddefs cache file."""
+
+    def __init__(self, file, recorddefs, digest):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.references = {}
+        if recorddefs is not None:
+            self.references[id(recorddefs)] = (digest, None)
+            for recordid, fields in recorddefs.items():
+                if isinstance(fields, (list, tuple)):
+                    self.references[id(fields)] = (digest, recordid)
+
+    def persistent_id(self, obj):
+        return self.references.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    """unpickle grammar state; get recorddefs from recorddefs cache file."""
+
+    def __init__(self, file, grammardirectory):
+        super().__init__(file)
+        self.grammardirectory = grammardirectory
+
+    def persistent_load(self, pid):
+        digest, recordid = pid
+        if digest not in _recorddefs:
+            with open(_recorddefsfilename(digest), 'rb') as recorddefsfile:
+                recorddefs = pickle.load(recorddefsfile)
+            if interning():
+                internrecorddefs(recorddefs, self.grammardirectory)
+            _recorddefs[digest] = recorddefs
+        if recordid is None:
+            return _recorddefs[digest]
+        return _recorddefs[digest][recordid]
+
+
+def interning():
+    """record definitions are shared (bots.ini grammar_intern)."""
+    return botsglobal.ini.getboolean('settings', 'grammar_intern', False)
+
+
+def directory(grammarimport):
+    """grammar directory of grammar module (as arguments of botsimport); eg edifact/D96A."""
+    _typeofgrammarfile, editype, grammarname = grammarimport
+    return '/'.join([editype] + grammarname.split('.')[:-1])
+
+
+def internrecorddefs(recorddefs, grammardirectory):
+    """
+    replace the records in (checked) recorddefs by shared tuples of shared field definitions;
+    equal definitions in other recorddefs are the same object.
+    memory saved (memory of the lists of recorddefs minus memory of new shared tuples) is added to internstats.
+    """
+    seen = set()
+    before = sum(_sizeof(fields, seen) for fields in recorddefs.values() if isinstance(fields, (list, tuple)))
+    added = []
+    for recordid, fields in recorddefs.items():
+        if isinstance(fields, (list, tuple)):
+            recorddefs[recordid] = _intern(fields, added)
+    memory = before - sum(added)
+    internstats[grammardirectory] += memory
+    botsglobal.logger.debug(
+        'Shared record definitions of grammar directory "%(directory)s": %(memory)s bytes saved.',
+        {'directory': grammardirectory, 'memory': memory},
+    )
+
+
+def _intern(definition, added):
+    """
+    shared tuple for field definition or record (list of field definitions); nested lists are shared too.
+    memory of tuples that are new is appended to added.
+    """
+    definition = tuple(_intern(value, added) if isinstance(value, (list, tuple)) else value for value in definition)
+    interned = _interned.get(definition)
+    if interned is not None and all(
+            # equal is not enough: 1 == True == 1.0
+            value is other if isinstance(value, tuple) else type(value) is type(other)
+            for value, other in zip(definition, interned)
+    ):
+        return interned
+    if interned is None:
+        _interned[definition] = definition
+    added.append(sys.getsizeof(definition))
+    return definition
+
+
+def _sizeof(definition, seen):
+    """memory of definition and nested lists/tuples (not of the values: strings, numbers); each object once."""
+    if id(definition) in seen:
+        return 0
+    seen.add(id(definition))
+    return sys.getsizeof(definition) + sum(
+        _sizeof(value, seen) for value in definition if isinstance(value, (list, tuple))
+    )
+
+
+def writefile(filename, content):
+    """write to temporary file and rename: other processes never read a partly written file."""
+    botslib.dirshouldbethere(os.path.dirname(filename))
+    handle, tmpfilename = tempfile.mkstemp(dir=os.path.dirname(filename), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as tmpfile:
+            tmpfile.write(content)
+        os.replace(tmpfilename, filename)
+    except BaseException:
+        os.remove(tmpfilename)
+        raise
+
+
+def codehash():
+    """hash of the bots code that reads and checks grammars (and python version)."""
+    if not _codehash:
+        digest = hashlib.sha256(repr((CACHE_FORMAT, sys.version_info[:2])).encode())
+        for codefile in CODEFILES:
+            with open(os.path.join(os.path.dirname(__file__), codefile), 'rb') as handle:
+                digest.update(handle.read())
+        _codehash.append(digest.hexdigest())
+    return _codehash[0]
+
+
+def _recorddefsfilename(digest):
+    return os.path.join(cachedir(), f'recorddefs.{digest[:32]}.pickle')
+
+
+def _cachefilename(key):
+    """name of cache file: readable part plus hash of key, bots code and usersys."""
+    digest = hashlib.sha256(
+        repr((codehash(), botsglobal.usersysimportpath, botsglobal.ini.get('directories', 'usersysabs'), key)).encode()
+    ).hexdigest()
+    readable = '.'.join(part for part in key if part).replace(os.sep, '_')
+    return os.path.join(cachedir(), f'{readable}.{digest[:24]}.pickle')
+
+
+def _filehash(filename):
+    with open(filename, 'rb') as handle:
+        return hashlib.sha256(handle.read()).hexdigest()
+
+
+def dependencies(grammarimports):
+    """
+    files a grammar is read from: list of (filename, mtime, size, hash).
+    these are the grammar files (botsimport) plus the usersys modules they import (recursive).
+    for a grammar file that could not be imported (eg no envelope grammar) mtime, size and hash are None:
+    grammar is valid as long as this file does not exist.
+    """
+    files = {}
+    modules = []
+    for args in grammarimports:
+        modulename = '.'.join((botsglobal.usersysimportpath,) + tuple(args))
+        if modulename in sys.modules:
+            modules.append(sys.modules[modulename])
+        else:
+            modulefile = os.path.join(
+                botsglobal.ini.get('directories', 'usersysabs'), *'.'.join(args).split('.')
+            )
+            for filename in (modulefile + '.py', os.path.join(modulefile, '__init__.py')):
+                files[filename] = (filename, None, None, None)
+    while modules:
+        module = modules.pop()
+        filename = getattr(module, '__file__', None)
+        if not filename or filename in files:
+            continue
+        if filename not in _sources:
+            stat = os.stat(filename)
+            _sources[filename] = (
+                (filename, stat.st_mtime_ns, stat.st_size, _filehash(filename)),
+                list(_importedmodulenames(module, filename)),
+            )
+        files[filename] = _sources[filename][0]
+        modules.extend(sys.modules[modulename] for modulename in _sources[filename][1])
+    return sorted(files.values())
+
+
+def _importedmodulenames(module, filename):
+    """usersys modules imported by module (as found in source of module)."""
+    if not filename.endswith('.py'):
+        return
+    with open(filename, 'rb') as handle:
+        tree = ast.parse(handle.read(), filename)
+    package = module.__package__ or ''
+    for astnode in ast.walk(tree):
+        if isinstance(astnode, ast.Import):
+            modulenames = [alias.name for alias in astnode.names]
+        elif isinstance(astnode, ast.ImportFrom):
+            try:
+                base = importlib.util.resolve_name('.' * astnode.level + (astnode.module or ''), package)
+            except (ImportError, ValueError):
+                continue
+            # 'from package import name': name can be a module
+            modulenames = [base] + [f'{base}.{alias.name}' for alias in astnode.names]
+        else:
+            continue
+        for modulename in modulenames:
+            if modulename.startswith(botsglobal.usersysimportpath + '.') and modulename in sys.modules:
+                yield modulename
+
+
+def isvalid(dependencies):
+    """files of cached grammar are not changed."""
+    for filename, mtime, size, digest in dependencies:
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            if digest is None:
+                continue
+            return False
+        if digest is None:
+            return False
+        if (stat.st_mtime_ns, stat.st_size) == (mtime, size):
+            continue
+        # eg other copy of usersys (other pod): compare content
+        if stat.st_size != size or _filehash(filename) != digest:
+            return False
+    return True
@@ -4,31 +4,64 @@ Bots grammar check
 # pylint: disable=broad-exception-caught
 
 import atexit
+import concurrent.futures
+import csv
 import glob
+import hashlib
+import json
 import logging
 import os
 import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
 
 # Bots-modules
 from . import botsinit
 from . import botsglobal
 from . import grammar
+from . import grammarcache
+from . import grammarmanifest
+from .botsconfig import LEVEL
 from .exceptions import txtexc
 
+# change if the content of the result file of startmulti changes.
+RESULTS_FORMAT = 1
+REPORT_FIELDS = ('grammar', 'filename', 'status', 'cached', 'loadtime', 'depth', 'records', 'errors')
 
-def startmulti(grammardir, editype):
+
+def checkmanifest(editype, grammarname, grammarobject):
+    """with bots.ini grammar_manifest: check (and update) grammar manifest for grammar; return list of errors."""
+    if not grammarmanifest.enabled():
+        return []
+    return grammarmanifest.check(editype, grammarname, grammarobject)
+
+
+def startmulti(grammardir, editype, processes=None, report=None, configdir=None):
     """
     specialized tool for bulk checking of grammars while developing botsgrammars
-    grammardir: directory with gramars (eg bots/usersys/grammars/edifact)
+    grammardir: grammar files (glob, eg bots/usersys/grammars/edifact/*.py or .../edifact/**/*.py)
     editype: eg edifact
+    for processes, report: see checkmulti.
     """
-    configdir = None
     # find locating of bots, configfiles, init paths etc.
     botsinit.generalinit(configdir)
     botsglobal.logger = botsinit.initenginelogging(__name__)
     atexit.register(logging.shutdown)
+    # grammarcheck always does all checks: no grammar cache.
+    botsglobal.ini.set('settings', 'grammar_cache', 'False')
+    return checkmulti(grammardir, editype, processes, report, configdir)
+
 
-    for filename in glob.iglob(grammardir):
+def checkmulti(grammardir, editype, processes=None, report=None, configdir=None):
+    """
+    check grammar files (glob) of editype; bots is initialised.
+    processes: number of processes that check grammars (default: number of cpu's); 1: no extra processes.
+    report: file for report (.csv: csv, else json); per grammar: load time, levels and records of structure.
+    grammars that are OK are not checked again while the files they are read from are not changed.
+    return number of grammars with errors.
+    """
+    grammars = []
+    for filename in sorted(glob.iglob(grammardir, recursive=True)):
         filename_basename = os.path.basename(filename)
         if filename_basename in ['__init__.py', 'envelope.py']:
             continue
@@ -38,15 +71,179 @@ def startmulti(grammardir, editype):
                 or filename_basename.endswith('records.py')
         ):
             continue
-        if filename_basename.endswith('pyc'):
+        if not filename_basename.endswith('.py'):
             continue
-        filename_noextension = os.path.splitext(filename_basename)[0]
+        grammars.append((_grammarname(editype, filename), filename))
+
+    resultsfilename = _resultsfilename(editype)
+    previous = _loadresults(resultsfilename)
+    results = []
+    tocheck = []
+    for grammarname, filename in grammars:
+        result = previous.get(filename)
+        if result is not None and result['grammar'] == grammarname and grammarcache.isvalid(result['dependencies']):
+            results.append(dict(result, cached=True))
+        else:
+            results.append(None)
+            tocheck.append((grammarname, filename))
+
+    if grammarmanifest.enabled():
+        # manifest is made once, not in every process
+        grammarmanifest.get(editype)
+    if processes == 1 or len(tocheck) < 2:
+        checked = [_checkgrammar(editype, grammarname, filename) for grammarname, filename in tocheck]
+    else:
         try:
-            grammar.grammarread(editype, filename_noextension, typeofgrammarfile='grammars')
-        except Exception:
-            print(txtexc(), end="\n\n")
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=processes, initializer=_initprocess, initargs=(configdir,)
+            ) as executor:
+                checked = list(
+                    executor.map(
+                        _checkgrammar,
+                        [editype] * len(tocheck),
+                        [grammarname for grammarname, _filename in tocheck],
+                        [filename for _grammarname, filename in tocheck],
+                    )
+                )
+        except BrokenProcessPool as exc:
+            # a process stopped (eg killed): check grammars in this process.
+            botsglobal.logger.debug('Grammarcheck: processes stopped, check in one process: %(exc)s', {'exc': exc})
+            checked = [_checkgrammar(editype, grammarname, filename) for grammarname, filename in tocheck]
+    checked = iter(checked)
+    results = [result or next(checked) for result in results]
+
+    errorcount = 0
+    for result in results:
+        if result['status'] == 'OK':
+            print('OK - no error found in grammar', result['filename'], end='\n\n')
         else:
-            print('OK - no error found in grammar', filename, end='\n\n')
+            errorcount += 1
+            print(result['errors'], end='\n\n')
+    print(
+        f'{len(results)} grammars: {len(results) - errorcount} OK ({len(results) - len(tocheck)} not changed), '
+        f'{errorcount} with errors.'
+    )
+    _saveresults(resultsfilename, results)
+    if report:
+        _writereport(report, results)
+    return errorcount
+
+
+def _grammarname(editype, filename):
+    """name of grammar for grammarread: module relative to usersys/grammars/<editype> (eg D96A.ORDERSD96AUN)."""
+    root = os.path.join(botsglobal.ini.get('directories', 'usersysabs'), 'grammars', editype)
+    relpath = os.path.relpath(os.path.abspath(filename), root)
+    if relpath.startswith(os.pardir):
+        return os.path.splitext(os.path.basename(filename))[0]
+    return os.path.splitext(relpath)[0].replace(os.sep, '.')
+
+
+def _initprocess(configdir):
+    """initialise process of startmulti (not needed if process is forked)."""
+    if botsglobal.ini is None:
+        botsinit.generalinit(configdir)
+        botsglobal.logger = botsinit.initenginelogging(__name__)
+        botsglobal.ini.set('settings', 'grammar_cache', 'False')
+
+
+def _checkgrammar(editype, grammarname, filename):
+    """read and check grammar; return result for report."""
+    result = {
+        'grammar': grammarname,
+        'filename': filename,
+        'status': 'OK',
+        'cached': False,
+        'loadtime': None,
+        'depth': None,
+        'records': None,
+        'errors': '',
+        'dependencies': [],
+    }
+    try:
+        starttime = time.perf_counter()
+        grammarobject = grammar.grammarread(editype, grammarname, typeofgrammarfile='grammars')
+        result['loadtime'] = round(time.perf_counter() - starttime, 6)
+        errors = checkmanifest(editype, grammarname, grammarobject)
+    except Exception:
+        result['status'] = 'error'
+        result['errors'] = txtexc()
+        return result
+    if getattr(grammarobject, 'structure', None):
+        result['depth'], result['records'] = _size(grammarobject.structure)
+    if errors:
+        result['status'] = 'error'
+        result['errors'] = '\n'.join(errors)
+    else:
+        result['dependencies'] = grammarcache.dependencies(grammarobject.grammarimports)
+    return result
+
+
+def _size(structure):
+    """return number of levels and number of records of structure."""
+    depth = 0
+    records = len(structure)
+    for record in structure:
+        if LEVEL in record:
+            subdepth, subrecords = _size(record[LEVEL])
+            depth = max(depth, subdepth)
+            records += subrecords
+    return depth + 1, records
+
+
+def _resultsfilename(editype):
+    digest = hashlib.sha256(
+        repr(
+            (
+                grammarcache.codehash(),
+                botsglobal.usersysimportpath,
+                botsglobal.ini.get('directories', 'usersysabs'),
+                grammarmanifest.enabled(),
+            )
+        ).encode()
+    ).hexdigest()
+    return os.path.join(grammarcache.cachedir(), f'grammarcheck.{editype}.{digest[:24]}.json')
+
+
+def _loadresults(filename):
+    """results of grammars that were OK in previous startmulti, key is filename."""
+    try:
+        with open(filename, 'rb') as resultsfile:
+            content = json.load(resultsfile)
+        if content['format'] == RESULTS_FORMAT:
+            return content['results']
+    except FileNotFoundError:
+        pass
+    except (OSError, KeyError, TypeError, ValueError) as exc:
+        botsglobal.logger.debug(
+            'Grammarcheck: could not read "%(filename)s": %(exc)s', {'filename': filename, 'exc': exc}
+        )
+    return {}
+
+
+def _saveresults(filename, results):
+    content = {
+        'format': RESULTS_FORMAT,
+        'results': {result['filename']: result for result in results if result['status'] == 'OK'},
+    }
+    try:
+        grammarcache.writefile(filename, json.dumps(content, sort_keys=True).encode())
+    except (OSError, TypeError, ValueError) as exc:
+        botsglobal.logger.debug(
+            'Grammarcheck: could not write "%(filename)s": %(exc)s', {'filename': filename, 'exc': exc}
+        )
+
+
+def _writereport(filename, results):
+    """write report: csv if filename ends with .csv, else json."""
+    rows = [{field: result[field] for field in REPORT_FIELDS} for result in results]
+    if filename.lower().endswith('.csv'):
+        with open(filename, 'w', newline='', encoding='utf-8') as reportfile:
+            writer = csv.DictWriter(reportfile, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(filename, 'w', encoding='utf-8') as reportfile:
+            json.dump(rows, reportfile, indent=2)
 
 
 def start():
@@ -60,11 +257,16 @@ def start():
 
     Usage:  %(name)s  -c<directory> <editype> <messagetype>
        or   %(name)s  -c<directory> <path to grammar>
+       or   %(name)s  -c<directory> [-j<processes>] [-r<report>] <path to directory with grammars>
     Options:
         -c<directory>   directory for configuration files (default: config).
+        -j<processes>   check grammars of directory (and subdirectories) in this number of processes
+                        (default: number of cpu's). Grammars that are not changed are not checked again.
+        -r<report>      write report for grammars of directory to this file (.csv: csv, else json).
     Examples:
         %(name)s -cconfig  edifact  ORDERSD96AUNEAN008
         %(name)s -cconfig  C:/python27/lib/site-packages/bots/usersys/grammars/edifact/ORDERSD96AUNEAN008.py
+        %(name)s -cconfig  -j4 -rgrammars.csv  C:/python27/lib/site-packages/bots/usersys/grammars/edifact
 
     """ % {
         'name': os.path.basename(sys.argv[0]),
@@ -73,6 +275,9 @@ def start():
     configdir = None
     editype = ''
     messagetype = ''
+    grammardir = ''
+    processes = None
+    report = None
     for arg in sys.argv[1:]:
         if arg.startswith('-c'):
             configdir = arg[2:]
@@ -80,11 +285,24 @@ def start():
                 print(usage)
                 print('Error: configuration directory indicated, but no directory name.')
                 sys.exit(1)
+        elif arg.startswith('-j'):
+            try:
+                processes = int(arg[2:])
+                if processes < 1:
+                    raise ValueError
+            except ValueError:
+                print(usage)
+                print('Error: number of processes should be a positive number.')
+                sys.exit(1)
+        elif arg.startswith('-r') and arg[2:]:
+            report = arg[2:]
         elif arg in ['?', '/?', '-h', '--help'] or arg.startswith('-'):
             print(usage)
             sys.exit(0)
         else:
-            if os.path.isfile(arg):
+            if os.path.isdir(arg):
+                grammardir = arg
+            elif os.path.isfile(arg):
                 p1, p2 = os.path.split(arg)
                 editype = os.path.basename(p1)
                 messagetype, _ext = os.path.splitext(p2)
@@ -93,6 +311,16 @@ def start():
                 editype = arg
             else:
                 messagetype = arg
+    if grammardir:
+        # grammardir is usersys/grammars/<editype> or a subdirectory (eg edifact/D96A)
+        parts = os.path.abspath(grammardir).split(os.sep)
+        if 'grammars' in parts[:-1]:
+            editype = parts[len(parts) - 1 - parts[::-1].index('grammars') + 1]
+        else:
+            editype = parts[-1]
+        print('grammarcheck', editype, grammardir)
+        errorcount = startmulti(os.path.join(grammardir, '**', '*.py'), editype, processes, report, configdir)
+        sys.exit(1 if errorcount else 0)
     if not (editype and messagetype):
         print(usage)
         print('Error: both editype and messagetype, or a file path, are required.')
@@ -104,15 +332,20 @@ def start():
     botsinit.generalinit(configdir)
     botsglobal.logger = botsinit.initenginelogging(__name__)
     atexit.register(logging.shutdown)
+    # grammarcheck always does all checks: no grammar cache.
+    botsglobal.ini.set('settings', 'grammar_cache', 'False')
 
     try:
-        grammar.grammarread(editype, messagetype, typeofgrammarfile='grammars')
+        grammarobject = grammar.grammarread(editype, messagetype, typeofgrammarfile='grammars')
+        errors = checkmanifest(editype, messagetype, grammarobject)
     except Exception:
         print("Found error in grammar: ", txtexc())
         sys.exit(1)
-    else:
-        print('OK - no error found in grammar')
-        sys.exit(0)
+    if errors:
+        print("Found error in grammar manifest: ", '\n'.join(errors))
+        sys.exit(1)
+    print('OK - no error found in grammar')
+    sys.exit(0)
 
 
 if __name__ == '__main__':
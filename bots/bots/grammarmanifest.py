@@ -0,0 +1,280 @@
+"""
+Bots grammar manifest (bots.ini grammar_manifest).
+Index of the grammar files of an editype (usersys/grammars/<editype>, including subdirectories as in bots-grammars):
+module -> recorddefs module, envelope, modification time.
+grammarread finds the module of a grammar in the manifest, also in a subdirectory (eg 'ORDERSD96AUN' is in
+'D96A/ORDERSD96AUN.py'); a grammar that is not in the manifest is not searched for (no import).
+The manifest is in the grammar cache directory. A process checks only the modification time of the directories;
+directories that are changed are read again.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+
+# bots-modules
+from . import botsglobal, botslib, grammarcache
+from .botslib import gettext as _
+from .exceptions import BotsImportError
+
+# change if the content of the manifest changes.
+MANIFEST_FORMAT = 1
+
+# manifests loaded (and updated) in this process, key is editype
+_manifests = {}
+
+STRUCTURE = re.compile(r'^structure\s*=', re.MULTILINE)
+RECORDDEFS = re.compile(r'^recorddefs\s*=', re.MULTILINE)
+# eg: from .recordsD96AUN import recorddefs
+IMPORT = re.compile(r'^from\s+(\.*[\w.]*)\s+import\s+([^\n#]*)', re.MULTILINE)
+ENVELOPE = re.compile(r'''['"]envelope['"]\s*:\s*['"]([\w.]*)['"]''')
+
+
+def enabled():
+    """grammar manifest is used (bots.ini grammar_manifest)."""
+    return botsglobal.ini.getboolean('settings', 'grammar_manifest', False)
+
+
+def modulename(editype, grammarname):
+    """
+    return name of module of grammar (relative to usersys/grammars/<editype>, eg 'D96A.ORDERSD96AUN').
+    a grammar in a subdirectory is found by its name, unless there is a grammar with this name in the directory above.
+    if grammar is not in manifest, directories that are changed are read again (once);
+    if grammar is still not in manifest: raise BotsImportError.
+    """
+    manifest = get(editype)
+    name = _lookup(manifest, grammarname)
+    if name is None and _update(manifest):
+        # grammar file might be added after manifest was read in this process (eg webserver, jobqueue)
+        _save(editype, manifest)
+        name = _lookup(manifest, grammarname)
+    if name is not None:
+        return name
+    errs = [
+        _('No import of module "%(modulefile)s": not in grammar manifest.'),
+        {'modulefile': botslib.join(_rootdir(editype), grammarname)},
+    ]
+    botsglobal.logger.debug(*errs)
+    raise BotsImportError(*errs)
+
+
+def _lookup(manifest, grammarname):
+    """name of module of grammar in manifest; None if not in manifest."""
+    if grammarname in manifest['grammars']:
+        return grammarname
+    return manifest['aliases'].get(grammarname)
+
+
+def get(editype):
+    """manifest of editype; read from manifest file, updated for changed directories."""
+    if editype not in _manifests:
+        filename = _manifestfilename(editype)
+        try:
+            with open(filename, 'rb') as manifestfile:
+                manifest = json.load(manifestfile)
+            if manifest['format'] != MANIFEST_FORMAT or manifest['root'] != _rootdir(editype):
+                manifest = None
+        except FileNotFoundError:
+            manifest = None
+        except (OSError, KeyError, TypeError, ValueError) as exc:
+            # ValueError: not valid json (json.JSONDecodeError); KeyError, TypeError: not a manifest
+            botsglobal.logger.debug(
+                'Grammar manifest: could not read "%(filename)s": %(exc)s', {'filename': filename, 'exc': exc}
+            )
+            manifest = None
+        if manifest is None:
+            manifest = {
+                'format': MANIFEST_FORMAT,
+                'root': _rootdir(editype),
+                'directories': {},
+                'grammars': {},
+                'aliases': {},
+                'ambiguous': [],
+            }
+        if _update(manifest):
+            _save(editype, manifest)
+        _manifests[editype] = manifest
+    return _manifests[editype]
+
+
+def check(editype, grammarname, grammarobject):
+    """
+    check manifest against grammar file and grammar read with grammarread (for grammarcheck).
+    an entry that is out of date is updated.
+    return list of errors (empty if OK).
+    """
+    errors = []
+    manifest = get(editype)
+    name = modulename(editype, grammarname)
+    if grammarname in manifest['ambiguous']:
+        errors.append(
+            _('Grammar manifest: "%(grammarname)s" is in more subdirectories; used is "%(name)s".')
+            % {'grammarname': grammarname, 'name': name}
+        )
+    entry = manifest['grammars'][name]
+    filename = _filename(_rootdir(editype), name)
+    scanned = _scanfile(_rootdir(editype), name)
+    if scanned != entry:
+        errors.append(
+            _('Grammar manifest: entry of "%(filename)s" is out of date (is updated).') % {'filename': filename}
+        )
+        manifest['grammars'][name] = entry = scanned
+        _save(editype, manifest)
+    if os.path.abspath(grammarobject.module.__file__) != os.path.abspath(filename):
+        errors.append(
+            _('Grammar manifest: "%(grammarname)s" is in "%(filename)s", but is read from "%(modulefile)s".')
+            % {'grammarname': grammarname, 'filename': filename, 'modulefile': grammarobject.module.__file__}
+        )
+    if entry['recorddefs'] is not None:
+        recorddefsmodule = sys.modules.get(
+            '.'.join((botsglobal.usersysimportpath, 'grammars', editype, entry['recorddefs']))
+        )
+        if getattr(recorddefsmodule, 'recorddefs', None) is not getattr(grammarobject.module, 'recorddefs', None):
+            errors.append(
+                _('Grammar manifest: recorddefs of "%(grammarname)s" are not from "%(recorddefs)s".')
+                % {'grammarname': grammarname, 'recorddefs': entry['recorddefs']}
+            )
+    envelope = grammarobject.original_syntaxfromgrammar.get('envelope')
+    if entry['envelope'] != envelope:
+        errors.append(
+            _('Grammar manifest: envelope of "%(grammarname)s" is "%(envelope)s", in manifest "%(manifest)s".')
+            % {'grammarname': grammarname, 'envelope': envelope, 'manifest': entry['envelope']}
+        )
+    return errors
+
+
+def clear():
+    """forget manifests loaded in this process (eg after installing a plugin)."""
+    _manifests.clear()
+
+
+def _rootdir(editype):
+    return os.path.join(botsglobal.ini.get('directories', 'usersysabs'), 'grammars', editype)
+
+
+def _manifestfilename(editype):
+    digest = hashlib.sha256(repr((botsglobal.usersysimportpath, _rootdir(editype))).encode()).hexdigest()
+    return os.path.join(grammarcache.cachedir(), f'manifest.{editype}.{digest[:24]}.json')
+
+
+def _save(editype, manifest):
+    filename = _manifestfilename(editype)
+    try:
+        grammarcache.writefile(filename, json.dumps(manifest, sort_keys=True).encode())
+    except (OSError, TypeError, ValueError) as exc:
+        botsglobal.logger.debug(
+            'Grammar manifest: could not write "%(filename)s": %(exc)s', {'filename': filename, 'exc': exc}
+        )
+
+
+def _update(manifest):
+    """
+    read directories that are changed (modification time) again.
+    a file in a changed directory is read again if it is changed.
+    return True if manifest is changed.
+    """
+    olddirectories = manifest['directories']
+    oldgrammars = manifest['grammars']
+    directories = {}
+    grammars = {}
+    stack = ['']
+    while stack:
+        reldir = stack.pop()
+        absdir = os.path.join(manifest['root'], *reldir.split('.')) if reldir else manifest['root']
+        try:
+            mtime = os.stat(absdir).st_mtime_ns
+        except FileNotFoundError:
+            continue
+        olddirectory = olddirectories.get(reldir)
+        if olddirectory is not None and olddirectory['mtime'] == mtime:
+            directories[reldir] = olddirectory
+            for name in olddirectory['modules']:
+                grammars[name] = oldgrammars[name]
+        else:
+            directories[reldir] = {'mtime': mtime, 'subdirectories': [], 'modules': []}
+            for direntry in sorted(os.scandir(absdir), key=lambda direntry: direntry.name):
+                if direntry.name.startswith(('.', '_')):
+                    continue
+                if direntry.is_dir():
+                    directories[reldir]['subdirectories'].append(_dotted(reldir, direntry.name))
+                elif direntry.name.endswith('.py'):
+                    name = _dotted(reldir, direntry.name[:-3])
+                    directories[reldir]['modules'].append(name)
+                    entry = oldgrammars.get(name)
+                    if entry is None or entry['mtime'] != direntry.stat().st_mtime_ns:
+                        entry = _scanfile(manifest['root'], name)
+                    grammars[name] = entry
+        stack.extend(directories[reldir]['subdirectories'])
+    if directories == olddirectories:
+        return False
+    manifest['directories'] = directories
+    manifest['grammars'] = grammars
+    # grammars in subdirectories can be used by their name (unless in directory above); first in sort order
+    aliases = {}
+    ambiguous = set()
+    for name in sorted(grammars, key=lambda name: (name.count('.'), name)):
+        basename = name.rsplit('.', 1)[-1]
+        if name == basename or not grammars[name]['structure'] or basename in grammars:
+            continue
+        if basename in aliases:
+            ambiguous.add(basename)
+        else:
+            aliases[basename] = name
+    manifest['aliases'] = aliases
+    manifest['ambiguous'] = sorted(ambiguous)
+    return True
+
+
+def _dotted(reldir, name):
+    return f'{reldir}.{name}' if reldir else name
+
+
+def _filename(root, name):
+    return os.path.join(root, *name.split('.')) + '.py'
+
+
+def _scanfile(root, name):
+    """manifest entry of grammar file: found in the source (no import)."""
+    filename = _filename(root, name)
+    with open(filename, encoding='utf-8', errors='replace') as handle:
+        source = handle.read()
+    recorddefs = None
+    syntaxmodule = None
+    if RECORDDEFS.search(source):
+        recorddefs = name
+    for importedmodule, importednames in IMPORT.findall(source):
+        importednames = re.findall(r'\w+', importednames)
+        if 'recorddefs' in importednames:
+            recorddefs = _resolve(importedmodule, name)
+        if 'syntax' in importednames:
+            syntaxmodule = _resolve(importedmodule, name)
+    envelope = ENVELOPE.search(source)
+    if envelope is None and syntaxmodule:
+        # syntax is imported from other grammar file; eg from .edifact import syntax
+        try:
+            with open(_filename(root, syntaxmodule), encoding='utf-8', errors='replace') as handle:
+                envelope = ENVELOPE.search(handle.read())
+        except OSError:
+            pass
+    return {
+        'mtime': os.stat(filename).st_mtime_ns,
+        'structure': bool(STRUCTURE.search(source)),
+        'recorddefs': recorddefs,
+        'envelope': envelope.group(1) if envelope else None,
+    }
+
+
+def _resolve(importedmodule, name):
+    """name of relative imported module (relative to usersys/grammars/<editype>); None if not relative."""
+    level = len(importedmodule) - len(importedmodule.lstrip('.'))
+    if not level:
+        return None
+    package = name.split('.')[:-1]
+    if level - 1 > len(package):
+        return None
+    parts = package[:len(package) - level + 1]
+    if importedmodule[level:]:
+        parts.append(importedmodule[level:])
+    return '.'.join(parts) or None
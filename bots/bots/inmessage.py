@@ -4,9 +4,15 @@
 # pylint: disable=broad-exception-caught
 # flake8: noqa:E501
 
+import array
+import bisect
 import codecs
+import contextlib
+import csv as csvlib
+import gc
+import itertools
 import json as simplejson
-import time
+import re
 
 # bots-modules
 from . import botsglobal
@@ -21,8 +27,6 @@ from .botsconfig import (
     SUBTRANSLATION,
     DECIMALS,
     MINLENGTH,
-    LIN,
-    POS,
     MIN,
     MAX,
     BFORMAT,
@@ -33,13 +37,17 @@ from .botsconfig import (
     MAXREPEAT,
     SUBFIELDS,
     FIELDS,
+    FIELDINDEX,
     SFIELD,
     VALUE,
     ISFIELD,
     FIXEDLINE,
     FIXED_RECORD_LENGTH,
+    FIXED_SLICES,
     QUERIES,
     LEVEL,
+    NEXTINDEX,
+    NEXTMANDATORY,
 )
 from .botslib import gettext as _
 from .exceptions import BotsImportError, InMessageError, TranslationNotFoundError, txtexc
@@ -73,20 +81,7 @@ def parse_edi_file(**ta_info):
         ediobject.initfromfile()
     except UnicodeError as exc:
         # ~ raise MessageError("")  # UNITTEST_CORRECTION
-        content = botslib.get_relevant_text_for_UnicodeError(exc)
-        # exc.encoding should contain encoding, but does not (think this is not OK for UNOA, etc)
-        # pylint: disable=no-member  # pylint complain about exc.start ... this is in UnicodeError doc py 3.13
-        ediobject.errorlist.append(
-            str(
-                InMessageError(
-                    _(
-                        '[A59]: incoming file has not allowed characters at/after file-position'
-                        ' %(pos)s: "%(content)s".'
-                    ),
-                    {'pos': exc.start, 'content': content},
-                )
-            )
-        )
+        ediobject.errorlist.append(_unicodeerrortxt(exc))
     except Exception:
         # ~ raise MessageError('')      #UNITTEST_CORRECTION
         txt = txtexc()
@@ -98,6 +93,331 @@ def parse_edi_file(**ta_info):
     return ediobject
 
 
+def _unicodeerrortxt(exc, offset=0):
+    """error text for charset error; offset is file-position of the decoded block (when read in blocks)."""
+    content = botslib.get_relevant_text_for_UnicodeError(exc)
+    # exc.encoding should contain encoding, but does not (think this is not OK for UNOA, etc)
+    # pylint: disable=no-member  # pylint complain about exc.start ... this is in UnicodeError doc py 3.13
+    return str(
+        InMessageError(
+            _(
+                '[A59]: incoming file has not allowed characters at/after file-position'
+                ' %(pos)s: "%(content)s".'
+            ),
+            {'pos': offset + exc.start, 'content': content},
+        )
+    )
+
+
+@contextlib.contextmanager
+def _nogarbagecollection():
+    """
+    no garbage collection while lexing and parsing: many small objects but no reference cycles.
+    garbage collection is set back as it was (it might be disabled by the caller); no user exits in this block.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class LexToken:
+    """
+    Token of a lex_record: a field, subfield or repeat as found by the lexer.
+    Uses much less memory than a dict per token.
+    pos is the offset of the token in the record (see LexRecord).
+    For user exits (eg preprocess_lex) a token can still be used like a dict:
+    token[VALUE], token[SFIELD], token[FIXEDLINE] (fixed records).
+    """
+
+    __slots__ = ('value', 'sfield', 'pos', 'fixedline')
+    keys = {VALUE: 'value', SFIELD: 'sfield', FIXEDLINE: 'fixedline'}
+
+    def __init__(self, value, sfield=0, pos=0, fixedline=None):
+        self.value = value
+        self.sfield = sfield
+        self.pos = pos
+        self.fixedline = fixedline
+
+    def __getitem__(self, key):
+        return getattr(self, self.keys[key])
+
+    def __setitem__(self, key, value):
+        setattr(self, self.keys[key], value)
+
+    def __repr__(self):
+        return 'LexToken(%r, %r, %r)' % (self.value, self.sfield, self.pos)
+
+    @classmethod
+    def fromdict(cls, token):
+        """make LexToken from a token as dict (as used before)."""
+        return cls(token[VALUE], token.get(SFIELD, 0), 0, token.get(FIXEDLINE))
+
+
+class LexRecord(list):
+    """
+    lex_record: list of LexToken.
+    offset is the offset of the record in the edi file (for fixed files: the line number).
+    """
+
+    __slots__ = ('offset',)
+
+
+class LineIndex:
+    """
+    Line-start index of the content of an edi file: gives line and position of an offset.
+    Counting is as always done in bots: line and position start at 1;
+    a newline character is at position 0 of the next line.
+    """
+
+    __slots__ = ('newlines',)
+
+    def __init__(self, content):
+        # offsets of the newline characters
+        self.newlines = array.array('q', [match.start() for match in re.finditer('\n', content)])
+
+    def linpos(self, offset):
+        """return (line, position) of character at offset."""
+        # index is number of newlines before offset
+        index = bisect.bisect_left(self.newlines, offset)
+        if index < len(self.newlines) and self.newlines[index] == offset:
+            return index + 2, 0
+        if index:
+            return index + 1, offset - self.newlines[index - 1]
+        return 1, offset + 1
+
+
+def _fielderror(message, value, structure_record, node_instance, field_definition, **extra):
+    """parameters for error text of field (compiled formatters)."""
+    parameters = {
+        'linpos': node_instance.linpos(),
+        'record': message.mpathformat(structure_record[MPATH]),
+        'field': field_definition[ID],
+        'content': value,
+    }
+    parameters.update(extra)
+    return parameters
+
+
+def _compilealfanumeric(field_definition):
+    """compiled formatter for alfanumeric field: check length."""
+    maxlength = field_definition[LENGTH]
+    minlength = field_definition[MINLENGTH]
+
+    def formatfield(message, value, structure_record, node_instance):
+        if len(value) > maxlength:
+            message.add2errorlist(
+                _(
+                    '[F05]%(linpos)s: Record "%(record)s" field "%(field)s"'
+                    ' too big (max %(max)s): "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, node_instance, field_definition, max=maxlength)
+            )
+        if len(value) < minlength:
+            message.add2errorlist(
+                _(
+                    '[F06]%(linpos)s: Record "%(record)s" field "%(field)s"'
+                    ' too small (min %(min)s): "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, node_instance, field_definition, min=minlength)
+            )
+        return value
+
+    return formatfield
+
+
+def _compiledate(field_definition):
+    """compiled formatter for date field: check date (YYMMDD or CCYYMMDD)."""
+
+    def formatfield(message, value, structure_record, node_instance):
+        if not botslib.validdate(value):
+            message.add2errorlist(
+                _(
+                    '[F07]%(linpos)s: Record "%(record)s" date field "%(field)s"'
+                    ' not a valid date: "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, node_instance, field_definition)
+            )
+        return value
+
+    return formatfield
+
+
+def _compiletime(field_definition):
+    """compiled formatter for time field: check time (HHMM, HHMMSS, HHMMSSD or HHMMSSDD)."""
+
+    def formatfield(message, value, structure_record, node_instance):
+        if len(value) in (7, 8):
+            # HHMMSSD, HHMMSSDD
+            valid = botslib.validtime(value[:6]) and value[6:].isdigit()
+        else:
+            valid = botslib.validtime(value)
+        if not valid:
+            message.add2errorlist(
+                _(
+                    '[F08]%(linpos)s: Record "%(record)s" time field "%(field)s"'
+                    ' not a valid time: "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, node_instance, field_definition)
+            )
+        return value
+
+    return formatfield
+
+
+def _compilenumeric(field_definition, ta_info, checklength, checkformat):
+    """
+    compiled formatter for numeric field (R, N, I): check length (if checklength) and format (if checkformat);
+    convert to canonical format (minus sign in front, no triad separators, decimal sign is '.').
+    content that can not be converted (eg exponent, non-numerical) is always reported.
+    """
+    # pylint: disable=too-many-statements
+    bformat = field_definition[BFORMAT]
+    maxlength = field_definition[LENGTH]
+    minlength = field_definition[MINLENGTH]
+    decimals = field_definition[DECIMALS]
+    triad = ta_info['triad']
+    decimaal = ta_info['decimaal']
+    # length is part of the format: not checked if not checkformat
+    checksize = checklength and checkformat
+    if checksize and ta_info['lengthnumericbare']:
+        # length is without minus sign, plus sign and decimal sign
+        not_counted = str.maketrans('', '', '-+' + decimaal)
+    else:
+        not_counted = None
+
+    def canonical(message, value, structure_record, node_instance):
+        """check length and exponent; return value in canonical format."""
+        if checksize:
+            length = len(value if not_counted is None else value.translate(not_counted))
+            if length > maxlength:
+                message.add2errorlist(
+                    _(
+                        '[F10]%(linpos)s: Record "%(record)s" field "%(field)s"'
+                        ' too big (max %(max)s): "%(content)s".\n'
+                    )
+                    % _fielderror(message, value, structure_record, node_instance, field_definition, max=maxlength)
+                )
+            if length < minlength:
+                message.add2errorlist(
+                    _(
+                        '[F11]%(linpos)s: Record "%(record)s" field "%(field)s"'
+                        ' too small (min %(min)s): "%(content)s".\n'
+                    )
+                    % _fielderror(message, value, structure_record, node_instance, field_definition, min=minlength)
+                )
+        if value[-1] == '-':
+            # minus-sign at the end, put it in front.
+            value = value[-1] + value[:-1]
+        # strip triad-separators; replace decimal sign by canonical decimal sign
+        value = value.replace(triad, '').replace(decimaal, '.', 1)
+        if 'E' not in value and 'e' not in value:
+            return value
+        # exponent
+        if checklength:
+            message.add2errorlist(
+                _(
+                    '[F09]%(linpos)s: Record "%(record)s" field "%(field)s"'
+                    ' has non-numerical content: "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, node_instance, field_definition)
+            )
+        else:
+            message.add2errorlist(
+                _(
+                    '[F09]%(linpos)s: Record "%(record)s" field "%(field)s"'
+                    ' contains exponent: "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, node_instance, field_definition)
+            )
+        return value
+
+    if bformat == 'R':
+
+        def formatfield(message, value, structure_record, node_instance):
+            value = canonical(message, value, structure_record, node_instance)
+            if 'E' in value or 'e' in value:
+                # exponent (error is reported)
+                return value
+            try:
+                # convert to float in order to check validity
+                return '%.*F' % (len(value.partition('.')[2]), float(value))
+            except Exception:
+                message.add2errorlist(
+                    _(
+                        '[F16]%(linpos)s: Record "%(record)s" numeric field "%(field)s"'
+                        ' has non-numerical content: "%(content)s".\n'
+                    )
+                    % _fielderror(message, value, structure_record, node_instance, field_definition)
+                )
+            return value
+
+    elif bformat == 'N':
+
+        def formatfield(message, value, structure_record, node_instance):
+            value = canonical(message, value, structure_record, node_instance)
+            if 'E' in value or 'e' in value:
+                # exponent (error is reported)
+                return value
+            lendecimal = len(value.partition('.')[2])
+            if checkformat and lendecimal != decimals:
+                message.add2errorlist(
+                    _(
+                        '[F14]%(linpos)s: Record "%(record)s" numeric field "%(field)s"'
+                        ' has invalid nr of decimals: "%(content)s".\n'
+                    )
+                    % _fielderror(message, value, structure_record, node_instance, field_definition)
+                )
+            try:
+                # convert to float in order to check validity
+                return '%.*F' % (lendecimal, float(value))
+            except Exception:
+                message.add2errorlist(
+                    _(
+                        '[F15]%(linpos)s: Record "%(record)s" numeric field "%(field)s"'
+                        ' has non-numerical content: "%(content)s".\n'
+                    )
+                    % _fielderror(message, value, structure_record, node_instance, field_definition)
+                )
+            return value
+
+    else:
+        # bformat == 'I'
+        divisor = 10 ** decimals
+
+        def formatfield(message, value, structure_record, node_instance):
+            value = canonical(message, value, structure_record, node_instance)
+            if 'E' in value or 'e' in value:
+                # exponent (error is reported)
+                return value
+            if '.' in value:
+                message.add2errorlist(
+                    _(
+                        '[F12]%(linpos)s: Record "%(record)s" field "%(field)s" has format "I"'
+                        ' but contains decimal sign: "%(content)s".\n'
+                    )
+                    % _fielderror(message, value, structure_record, node_instance, field_definition)
+                )
+                return value
+            try:
+                # convert to float in order to check validity
+                return '%.*F' % (decimals, float(value) / divisor)
+            except Exception:
+                message.add2errorlist(
+                    _(
+                        '[F13]%(linpos)s: Record "%(record)s" numeric field "%(field)s"'
+                        ' has non-numerical content: "%(content)s".\n'
+                    )
+                    % _fielderror(message, value, structure_record, node_instance, field_definition)
+                )
+            return value
+
+    return formatfield
+
+
 # *****************************************************************************
 class Inmessage(message.Message):
     """
@@ -106,10 +426,14 @@ class Inmessage(message.Message):
     """
     # pylint: disable=too-many-instance-attributes
 
+    formatparameters = ('triad', 'decimaal', 'lengthnumericbare')
+
     def __init__(self, ta_info):
         super().__init__(ta_info)
         # init list of lex_records
         self.lex_records = []
+        # streaming translation: edi file is parsed message by message in nextmessage
+        self.streaming = False
         # count chars in edi file. used in _lex,
         # plus for EDIFACT set in _sniff (as UNA is not lexed)
         # self.countpos = 0
@@ -130,28 +454,51 @@ class Inmessage(message.Message):
         # some hard-coded examination of edi file;
         # ta_info can be overruled by syntax-parameters in edi-file
         self._sniff()
-        # start lexing
-        self._lex()
+        if hasattr(self, 'rawinput'):
+            # line and position of records/fields are computed (when needed) with a line-start index
+            self._lineindex = LineIndex(self.rawinput)
         # lex preprocessing via user exit indicated in syntax
         preprocess_lex = self.ta_info["preprocess_lex"]
+        if self.ta_info.get('streaming') \
+                and not callable(preprocess_lex) and not callable(self.ta_info['preprocess_nodes']):
+            # user exits preprocess_lex and preprocess_nodes need the whole edi file: no streaming
+            self._messagedefinitions = self._streaming_messagedefinitions()
+            self.streaming = self._messagedefinitions is not None
         if callable(preprocess_lex):
+            # user exit gets all lex_records: lex the whole edi file before parsing
+            with _nogarbagecollection():
+                self.lex_records.extend(self._lex())
             preprocess_lex(lex=self.lex_records, ta_info=self.ta_info)
-        if hasattr(self, 'rawinput'):
-            del self.rawinput
+            self._normalise_lex_records()
+            self.iternext_lex_record = iter(self.lex_records)
+        else:
+            # lex_records are lexed while parsing; a lex_record is discarded after it is parsed
+            self.iternext_lex_record = self._lexstream()
         self.set_syntax_used()
         # **breaking parser errors
         # make root Node None.
         self.root = node.Node()
-        self.iternext_lex_record = iter(self.lex_records)
-        leftover = self._parse(structure_level=self.defmessage.structure, inode=self.root)
+        if self.streaming:
+            # messages are parsed one by one in nextmessage
+            self._parser = self._parseiter(structure_level=self.defmessage.structure, inode=self.root)
+            return
+        with _nogarbagecollection():
+            leftover = self._parse(structure_level=self.defmessage.structure, inode=self.root)
+        self._endofparse(leftover)
+
+    def _endofparse(self, leftover):
+        """edi file is parsed: check for leftover, check envelope and message, get queries."""
+        if hasattr(self, 'rawinput'):
+            del self.rawinput
         if leftover:
             # probably not reached with edifact/x12 because of mailbag processing.
+            line, pos = self._linpos(leftover, leftover[0])
             raise InMessageError(
                 _(
                     '[A50] line %(line)s pos %(pos)s: Found non-valid data at end of edi file;'
                     ' probably a problem with separators or message structure.'
                 ),
-                {'line': leftover[0][LIN], 'pos': leftover[0][POS]},
+                {'line': line, 'pos': pos},
             )
         del self.lex_records
         # self.root is now root of a tree (of nodes).
@@ -167,249 +514,105 @@ class Inmessage(message.Message):
                 self.ta_info.update(childnode.queries)
                 break
 
+    def _streaming_messagedefinitions(self):
+        """
+        For streaming translation: get the record definitions (in the grammar structure)
+        of the messages as passed to the mapping script (nextmessage, nextmessage2).
+        Streaming is only possible if these messages are a SUBTRANSLATION in an envelope;
+        else returns None.
+        """
+        definitions = set()
+        for mpaths in (self.defmessage.nextmessage, self.defmessage.nextmessage2):
+            if mpaths is None:
+                continue
+            if len(mpaths) < 2:
+                return None
+            structure_level = self.defmessage.structure
+            for mpath in mpaths:
+                for record_definition in structure_level:
+                    if record_definition[ID] == mpath['BOTSID']:
+                        break
+                else:
+                    return None
+                structure_level = record_definition.get(LEVEL, [])
+            if SUBTRANSLATION not in record_definition:
+                return None
+            # record definitions are compared by identity
+            definitions.add(id(record_definition))
+        return definitions or None
+
+    def _lexstream(self):
+        """
+        lex_records one by one from the lexer, for parsing.
+        Only the first lex_record is kept in self.lex_records (used in try_to_retrieve_info).
+        """
+        lex_records = self._lex()
+        for lex_record in lex_records:
+            self.lex_records.append(lex_record)
+            yield lex_record
+            break
+        yield from lex_records
+
+    def _normalise_lex_records(self):
+        """after user exit preprocess_lex: user exit might have added records as list and tokens as dict."""
+        offset = 0
+        for index, lex_record in enumerate(self.lex_records):
+            if isinstance(lex_record, LexRecord) and hasattr(lex_record, 'offset'):
+                offset = lex_record.offset
+            else:
+                lex_record = self.lex_records[index] = LexRecord(lex_record)
+                lex_record.offset = offset
+            for tokenindex, token in enumerate(lex_record):
+                if isinstance(token, dict):
+                    lex_record[tokenindex] = LexToken.fromdict(token)
+
     def set_syntax_used(self):
         """Update self.syntax dict depending on message type."""
 
+    def _linpos(self, lex_record, token):
+        """return (line, position) in edi file of token in lex_record."""
+        return self._lineindex.linpos(lex_record.offset + token.pos)
+
     def handleconfirm(self, ta_fromfile, routedict, error):
         """end of edi file handling: writing of confirmations, etc."""
 
-    def _formatfield(self, value, field_definition, structure_record, node_instance):
+    def _compileformatfield(self, field_definition):
         """
-        Format of a field is checked and converted if needed.
-        Input: value (string), field definition.
-        Output: the formatted value (string)
-        Parameters of self.ta_info are used: triad, decimaal
-        for fixed field: same handling; length is not checked.
+        Compile the format of field_definition (see message._compileformatfield).
+        Parameters of self.ta_info are used: triad, decimaal, lengthnumericbare.
         """
+        checkformat = self.validation == 'full'
+        if field_definition[BFORMAT] in ('A', 'D', 'T') and not checkformat:
+            # only checked, not converted
+            return super()._compileformatfield(field_definition)
         if field_definition[BFORMAT] == 'A':
-            if len(value) > field_definition[LENGTH]:
-                self.add2errorlist(
-                    _(
-                        '[F05]%(linpos)s: Record "%(record)s" field "%(field)s"'
-                        ' too big (max %(max)s): "%(content)s".\n'
-                    )
-                    % {
-                        'linpos': node_instance.linpos(),
-                        'record': self.mpathformat(structure_record[MPATH]),
-                        'field': field_definition[ID],
-                        'content': value,
-                        'max': field_definition[LENGTH],
-                    }
-                )
-            if len(value) < field_definition[MINLENGTH]:
-                self.add2errorlist(
-                    _(
-                        '[F06]%(linpos)s: Record "%(record)s" field "%(field)s"'
-                        ' too small (min %(min)s): "%(content)s".\n'
-                    )
-                    % {
-                        'linpos': node_instance.linpos(),
-                        'record': self.mpathformat(structure_record[MPATH]),
-                        'field': field_definition[ID],
-                        'content': value,
-                        'min': field_definition[MINLENGTH],
-                    }
-                )
-        elif field_definition[BFORMAT] in 'DT':
-            lenght = len(value)
-            if field_definition[BFORMAT] == 'D':
-                try:
-                    if lenght == 6:
-                        time.strptime(value, '%y%m%d')
-                    elif lenght == 8:
-                        time.strptime(value, '%Y%m%d')
-                    else:
-                        raise ValueError('To be catched')
-                except ValueError:
-                    self.add2errorlist(
-                        _(
-                            '[F07]%(linpos)s: Record "%(record)s" date field "%(field)s"'
-                            ' not a valid date: "%(content)s".\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-            else:
-                # field_definition[BFORMAT] == 'T':
-                try:
-                    if lenght == 4:
-                        time.strptime(value, '%H%M')
-                    elif lenght == 6:
-                        time.strptime(value, '%H%M%S')
-                    elif lenght in [7, 8]:
-                        time.strptime(value[0:6], '%H%M%S')
-                        if not value[6:].isdigit():
-                            raise ValueError('To be catched')
-                    else:
-                        raise ValueError('To be catched')
-                except ValueError:
-                    self.add2errorlist(
-                        _(
-                            '[F08]%(linpos)s: Record "%(record)s" time field "%(field)s"'
-                            ' not a valid time: "%(content)s".\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-        else:  # elif field_definition[BFORMAT] in 'RNI':  # numerics (R, N, I)
-            if self.ta_info['lengthnumericbare']:
-                chars_not_counted = '-+' + self.ta_info['decimaal']
-                length = 0
-                for char in value:
-                    if char not in chars_not_counted:
-                        length += 1
-            else:
-                length = len(value)
-            if length > field_definition[LENGTH]:
-                self.add2errorlist(
-                    _(
-                        '[F10]%(linpos)s: Record "%(record)s" field "%(field)s"'
-                        ' too big (max %(max)s): "%(content)s".\n'
-                    )
-                    % {
-                        'linpos': node_instance.linpos(),
-                        'record': self.mpathformat(structure_record[MPATH]),
-                        'field': field_definition[ID],
-                        'content': value,
-                        'max': field_definition[LENGTH],
-                    }
-                )
-            if length < field_definition[MINLENGTH]:
-                self.add2errorlist(
-                    _(
-                        '[F11]%(linpos)s: Record "%(record)s" field "%(field)s"'
-                        ' too small (min %(min)s): "%(content)s".\n'
-                    )
-                    % {
-                        'linpos': node_instance.linpos(),
-                        'record': self.mpathformat(structure_record[MPATH]),
-                        'field': field_definition[ID],
-                        'content': value,
-                        'min': field_definition[MINLENGTH],
-                    }
-                )
-            if value[-1] == '-':
-                # minus-sign at the end, put it in front.
-                value = value[-1] + value[:-1]
-            # strip triad-separators
-            value = value.replace(self.ta_info['triad'], '')
-            # replace decimal sign by canonical decimal sign
-            value = value.replace(
-                self.ta_info['decimaal'], '.', 1
-            )
-            if 'E' in value or 'e' in value:
-                self.add2errorlist(
-                    _(
-                        '[F09]%(linpos)s: Record "%(record)s" field "%(field)s"'
-                        ' has non-numerical content: "%(content)s".\n'
-                    )
-                    % {
-                        'linpos': node_instance.linpos(),
-                        'record': self.mpathformat(structure_record[MPATH]),
-                        'field': field_definition[ID],
-                        'content': value,
-                    }
-                )
-            elif field_definition[BFORMAT] == 'R':
-                lendecimal = len(value.partition('.')[2])
-                try:
-                    # convert to float in order to check validity
-                    valuedecimal = float(value)
-                    value = '%.*F' % (lendecimal, valuedecimal)
-                except Exception:
-                    self.add2errorlist(
-                        _(
-                            '[F16]%(linpos)s: Record "%(record)s" numeric field "%(field)s"'
-                            ' has non-numerical content: "%(content)s".\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-            elif field_definition[BFORMAT] == 'N':
-                lendecimal = len(value.partition('.')[2])
-                if lendecimal != field_definition[DECIMALS]:
-                    self.add2errorlist(
-                        _(
-                            '[F14]%(linpos)s: Record "%(record)s" numeric field "%(field)s"'
-                            ' has invalid nr of decimals: "%(content)s".\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-                try:
-                    # convert to float in order to check validity
-                    valuedecimal = float(value)
-                    value = '%.*F' % (lendecimal, valuedecimal)
-                except Exception:
-                    self.add2errorlist(
-                        _(
-                            '[F15]%(linpos)s: Record "%(record)s" numeric field "%(field)s"'
-                            ' has non-numerical content: "%(content)s".\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-            elif field_definition[BFORMAT] == 'I':
-                if '.' in value:
-                    self.add2errorlist(
-                        _(
-                            '[F12]%(linpos)s: Record "%(record)s" field "%(field)s" has format "I"'
-                            ' but contains decimal sign: "%(content)s".\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-                else:
-                    try:  # convert to float in order to check validity
-                        valuedecimal = float(value)
-                        valuedecimal = valuedecimal / 10 ** field_definition[DECIMALS]
-                        value = '%.*F' % (field_definition[DECIMALS], valuedecimal)
-                    except Exception:
-                        self.add2errorlist(
-                            _(
-                                '[F13]%(linpos)s: Record "%(record)s" numeric field "%(field)s"'
-                                ' has non-numerical content: "%(content)s".\n'
-                            )
-                            % {
-                                'linpos': node_instance.linpos(),
-                                'record': self.mpathformat(structure_record[MPATH]),
-                                'field': field_definition[ID],
-                                'content': value,
-                            }
-                        )
-        return value
+            return _compilealfanumeric(field_definition)
+        if field_definition[BFORMAT] == 'D':
+            return _compiledate(field_definition)
+        if field_definition[BFORMAT] == 'T':
+            return _compiletime(field_definition)
+        # numerics (R, N, I)
+        return _compilenumeric(field_definition, self.ta_info, checklength=True, checkformat=checkformat)
 
     def _lex(self):
-        """edi file->self.lex_records."""
+        """generator: edi file->lex_records."""
 
     def _parsefields(self, lex_record, record_definition) -> dict:
         """Parse fields from one fixed message-record and check length of the fixed record."""
 
     def _parse(self, structure_level, inode):
+        """
+        Parse the lex_records to nodes (see _parseiter).
+        Returns the leftover lex_record (None if all lex_records are parsed).
+        """
+        parser = self._parseiter(structure_level, inode)
+        while True:
+            try:
+                next(parser)
+            except StopIteration as stop:
+                return stop.value
+
+    def _parseiter(self, structure_level, inode):
         """
         This is the heart of the parsing of incoming messages (but not for xml, json)
         Read the lex_records one by one (self.iternext_lex_record, is an iterator)
@@ -421,6 +624,8 @@ class Inmessage(message.Message):
          - structure_level: current grammar/segmentgroup of the grammar-structure.
          - inode: parent node; all parsed records are added as children of inode
         2x recursive: SUBTRANSLATION and segmentgroups
+        Is a generator: for streaming translation each message is yielded when it is parsed;
+        returns (StopIteration.value) the leftover lex_record.
         """
         # keep track of where we are in the structure_level
         structure_index = 0
@@ -442,11 +647,25 @@ class Inmessage(message.Message):
                     current_lex_record = None
                 get_next_lex_record = False
             if current_lex_record is None \
-                    or structure_level[structure_index][ID] != current_lex_record[ID][VALUE]:
-                if structure_level[structure_index][MIN] and not countnrofoccurences:
-                    # is record is required in structure_level, and countnrofoccurences==0: error;
+                    or structure_level[structure_index][ID] != current_lex_record[ID].value:
+                # record is not at current position in structure_level.
+                # lookup (tables are compiled by grammar) next position of record in structure_level,
+                # and first mandatory record that would be skipped.
+                record_definition = structure_level[structure_index]
+                if current_lex_record is None:
+                    next_index = structure_end
+                else:
+                    next_index = record_definition[NEXTINDEX].get(current_lex_record[ID].value, structure_end)
+                if record_definition[MIN] and not countnrofoccurences:
+                    mandatory_index = structure_index
+                else:
+                    mandatory_index = record_definition[NEXTMANDATORY]
+                if mandatory_index < next_index:
+                    # a required record in structure_level (with countnrofoccurences==0) is skipped: error;
                     # enough check here; message is validated more accurate later
+                    structure_index = mandatory_index
                     try:
+                        line, pos = self._linpos(current_lex_record, current_lex_record[ID])
                         raise InMessageError(
                             self.messagetypetxt
                             + _(
@@ -457,9 +676,9 @@ class Inmessage(message.Message):
                                 ' record: "%(looked)s".'
                             ),
                             {
-                                'record': current_lex_record[ID][VALUE],
-                                'line': current_lex_record[ID][LIN],
-                                'pos': current_lex_record[ID][POS],
+                                'record': current_lex_record[ID].value,
+                                'line': line,
+                                'pos': pos,
                                 'looked': self.mpathformat(structure_level[structure_index][MPATH]),
                             },
                         )
@@ -470,12 +689,12 @@ class Inmessage(message.Message):
                             + _('[S51]: Missing mandatory record "%(record)s".'),
                             {'record': self.mpathformat(structure_level[structure_index][MPATH])},
                         ) from exc
-                structure_index += 1
-                if structure_index == structure_end:
+                if next_index == structure_end:
                     # current_lex_record is not in this level. Go level up
                     # if on 'first level': give specific error
                     if current_lex_record is not None \
                             and structure_level == self.defmessage.structure:
+                        line, pos = self._linpos(current_lex_record, current_lex_record[ID])
                         raise InMessageError(
                             self.messagetypetxt
                             + _(
@@ -486,11 +705,11 @@ class Inmessage(message.Message):
                                 ' record: "%(looked)s".'
                             ),
                             {
-                                'record': current_lex_record[ID][VALUE],
-                                'line': current_lex_record[ID][LIN],
-                                'pos': current_lex_record[ID][POS],
+                                'record': current_lex_record[ID].value,
+                                'line': line,
+                                'pos': pos,
                                 'looked': self.mpathformat(
-                                    structure_level[structure_index - 1][MPATH]
+                                    structure_level[structure_end - 1][MPATH]
                                 ),
                             },
                         )
@@ -498,18 +717,15 @@ class Inmessage(message.Message):
                     # or the last current_lex_record
                     # (the last current_lex_record is not found in this level)
                     return current_lex_record
+                structure_index = next_index
                 countnrofoccurences = 0
-                # continue while-loop:
-                # get_next_lex_record is false as no match with structure is made;
-                # go and look at next record of structure
-                continue
             # record is found in grammar
             countnrofoccurences += 1
             # make new node
-            newnode = node.Node(
-                record=self._parsefields(current_lex_record, structure_level[structure_index]),
-                linpos_info=(current_lex_record[0][LIN], current_lex_record[0][POS]),
-            )
+            record = self._parsefields(current_lex_record, structure_level[structure_index])
+            if node.Node.compactrecords:
+                record = node.Record(structure_level[structure_index][FIELDINDEX], record)
+            newnode = node.Node(record=record, linpos_info=self._linpos(current_lex_record, current_lex_record[0]))
             # succes! append new node as a child to current (parent)node
             inode.append(newnode)
             if SUBTRANSLATION in structure_level[structure_index]:
@@ -560,7 +776,7 @@ class Inmessage(message.Message):
                     'Message nr %(count)s, type %(type)s, '
                     % {'count': self.messagecount, 'type': messagetype}
                 )
-                current_lex_record = self._parse(
+                current_lex_record = yield from self._parseiter(
                     structure_level=defmessage.structure[0][LEVEL], inode=newnode
                 )
                 # copy messagetype into 1st segment of subtranslation (eg UNH, ST)
@@ -573,13 +789,16 @@ class Inmessage(message.Message):
                 self.checkmessage(newnode, defmessage, subtranslation=True)
                 # ~ end SUBTRANSLATION
                 self.messagetypetxt = ''
+                if self.streaming and id(structure_level[structure_index]) in self._messagedefinitions:
+                    # streaming translation: message is parsed and checked; pass it to nextmessage
+                    yield newnode
                 # get_next_lex_record is still False;
                 # we are trying to match the last (not matched)
                 # record from the SUBTRANSLATION (named 'current_lex_record').
             else:
                 if LEVEL in structure_level[structure_index]:
                     # if header, go parse segmentgroup (recursive)
-                    current_lex_record = self._parse(
+                    current_lex_record = yield from self._parseiter(
                         structure_level=structure_level[structure_index][LEVEL], inode=newnode
                     )
                     # get_next_lex_record is still False;
@@ -620,8 +839,18 @@ class Inmessage(message.Message):
     def checkenvelope(self):
         pass
 
+    def _checkmessageenvelope(self, message_node, envelope_node):
+        """
+        check envelope of one message (eg UNH-UNT counters & references).
+        envelope_node is the node the message is in (eg UNB, UNG).
+        method is specified in subclasses.
+        """
+
     def nextmessage(self):
         """Passes each 'message' to the mapping script."""
+        if self.streaming:
+            yield from self._nextmessage_streaming()
+            return
         # node preprocessing via user exit indicated in syntax
         preprocess_nodes = self.ta_info["preprocess_nodes"]
         if callable(preprocess_nodes):
@@ -738,6 +967,76 @@ class Inmessage(message.Message):
                     ta_info['bots_accessenvelope'] = self.root
                     yield self._initmessagefromnode(child, ta_info, self.syntax)
 
+    def _nextmessage_streaming(self):
+        """
+        Streaming translation: passes each message to the mapping script as soon as it is parsed.
+        Envelope records are parsed as they come; a message (SUBTRANSLATION) is parsed, checked and
+        passed to the mapping script. After mapping the records of the message are freed
+        (only the first record of the message is kept, eg for confirmations),
+        so memory use is bounded by the largest message.
+        After errors no more messages are passed, but parsing goes on to report all errors.
+        """
+        count = 0
+        try:
+            while True:
+                try:
+                    with _nogarbagecollection():
+                        message_node = next(self._parser)
+                except StopIteration as stop:
+                    leftover = stop.value
+                    break
+                envelope_nodes, queries = self._envelopeofmessage(message_node)
+                self._checkmessageenvelope(message_node, envelope_nodes[-1])
+                if not self.errorlist:
+                    count += 1
+                    ta_info = self.ta_info.copy()
+                    ta_info.update(queries)
+                    ta_info['message_number'] = count
+                    # number of messages is not known before the whole edi file is parsed
+                    ta_info['total_number_of_messages'] = 0
+                    # give mappingscript access to envelope (as parsed until now)
+                    ta_info['bots_accessenvelope'] = self.root
+                    yield self._initmessagefromnode(
+                        message_node, ta_info, self.syntax, [envelope_node.record for envelope_node in envelope_nodes])
+                # free the message
+                message_node.children = []
+                message_node._queries = {'messagetype': message_node.queries['messagetype']}  # pylint: disable=protected-access
+            del self._parser
+            self._endofparse(leftover)
+        except Exception:
+            # as in parse_edi_file: these are 'fatal errors'
+            txt = txtexc()
+            if not botsglobal.ini.getboolean('settings', 'debug', False):
+                txt = txt.partition(': ')[2]
+            self.errorlist.append(txt)
+            self.errorfatal = True
+        self.checkforerrorlist()
+
+    def _envelopeofmessage(self, message_node):
+        """
+        For streaming translation: get the envelope nodes of the message that is just parsed
+        (outermost first, eg [UNB, UNG]) and the queries for the message.
+        Queries are as in nextmessage: queries of the envelope records are copied 'down' to the message.
+        """
+        envelope_nodes = []
+        queries = {}
+        inode = self.root
+        structure_level = self.defmessage.structure
+        while True:
+            # message is the last node parsed, so its envelope records are also the last ones.
+            inode = inode.children[-1]
+            for record_definition in structure_level:
+                if record_definition[ID] == inode.record['BOTSID']:
+                    break
+            if QUERIES in record_definition:
+                inode.get_queries_from_edi(record_definition)
+            inode.queries = queries
+            queries = inode.queries
+            if inode is message_node:
+                return envelope_nodes, queries
+            envelope_nodes.append(inode)
+            structure_level = record_definition[LEVEL]
+
     def _canonicaltree(self, node_instance, structure):
         """
         call the _canonicaltree for Message (check min/max, sort)
@@ -780,6 +1079,8 @@ class Inmessage(message.Message):
 class fixed(Inmessage):
     """class for record of fixed length."""
 
+    formatparameters = ('triad', 'decimaal')
+
     def _readcontent_edifile(self):
         """open the edi file."""
         botsglobal.logger.debug('Read edi file "%(filename)s".', self.ta_info)
@@ -790,8 +1091,26 @@ class fixed(Inmessage):
             errors=self.ta_info['checkcharsetin'],
         )
 
+    def _readlines(self, size=65536):
+        """
+        generator: lines of the edi file (with line ending).
+        File is read in big blocks and split in lines as the filehandler does (str.splitlines);
+        much faster than reading line by line.
+        """
+        rest = ''
+        while True:
+            data = self.filehandler.read(size)
+            if not data:
+                break
+            lines = (rest + data).splitlines(True)
+            # last line might continue in next block (including '\r' + '\n')
+            rest = lines.pop()
+            yield from lines
+        if rest:
+            yield rest
+
     def _lex(self):
-        """edi file->self.lex_records."""
+        """generator: edi file->lex_records."""
         try:
             # there is a problem with the way python reads line by line:
             # file/line offset is not correctly reported.
@@ -800,30 +1119,23 @@ class fixed(Inmessage):
                 # if read records contain no BOTSID: add it
                 # add the recordname as BOTSID
                 botsid = self.defmessage.structure[0][ID]
-                for linenr, line in enumerate(self.filehandler, start=1):
+                for linenr, line in enumerate(self._readlines(), start=1):
                     if not line.isspace():
                         line = line.rstrip('\r\n')
                         # append record to recordlist
-                        self.lex_records.append(
-                            [{VALUE: botsid, LIN: linenr, POS: 0, FIXEDLINE: line}]
-                        )
+                        lex_record = LexRecord([LexToken(botsid, 0, 0, line)])
+                        lex_record.offset = linenr
+                        yield lex_record
             else:
                 startrecordid = self.ta_info['startrecordID']
                 endrecordid = self.ta_info['endrecordID']
-                for linenr, line in enumerate(self.filehandler, start=1):
+                for linenr, line in enumerate(self._readlines(), start=1):
                     if not line.isspace():
                         line = line.rstrip('\r\n')
                         # append record to recordlist
-                        self.lex_records.append(
-                            [
-                                {
-                                    VALUE: line[startrecordid:endrecordid].strip(),
-                                    LIN: linenr,
-                                    POS: 0,
-                                    FIXEDLINE: line,
-                                }
-                            ]
-                        )
+                        lex_record = LexRecord([LexToken(line[startrecordid:endrecordid].strip(), 0, 0, line)])
+                        lex_record.offset = linenr
+                        yield lex_record
         except UnicodeError as exc:
             rep_linenr = locals().get('linenr', 0) + 1
             content = botslib.get_relevant_text_for_UnicodeError(exc)
@@ -834,12 +1146,16 @@ class fixed(Inmessage):
             # _exception.__cause__ = None
             raise _exception from exc
 
+    def _linpos(self, lex_record, token):
+        """for fixed files the offset of a record is its line number."""
+        return lex_record.offset, 0
+
     def _parsefields(self, lex_record, record_definition) -> dict:
         """Parse fields from one fixed message-record and check length of the fixed record."""
         # start with empty dict
         record2build = {}
         # shortcut to fixed incoming record
-        fixedrecord = lex_record[ID][FIXEDLINE]
+        fixedrecord = lex_record[ID].fixedline
         lenfixed = len(fixedrecord)
         recordlength = record_definition[FIXED_RECORD_LENGTH]
         if recordlength != lenfixed:
@@ -849,8 +1165,8 @@ class fixed(Inmessage):
                         '[S52] line %(line)s: Record "%(record)s" too short; is %(pos)s pos,'
                         ' defined is %(defpos)s pos.'
                     ),
-                    line=lex_record[ID][LIN],
-                    record=lex_record[ID][VALUE],
+                    line=lex_record.offset,
+                    record=lex_record[ID].value,
                     pos=lenfixed,
                     defpos=recordlength,
                 )
@@ -860,188 +1176,38 @@ class fixed(Inmessage):
                         '[S53] line %(line)s: Record "%(record)s" too long;'
                         ' is %(pos)s pos, defined is %(defpos)s pos.'
                     ),
-                    line=lex_record[ID][LIN],
-                    record=lex_record[ID][VALUE],
+                    line=lex_record.offset,
+                    record=lex_record[ID].value,
                     pos=lenfixed,
                     defpos=recordlength,
                 )
-        pos = 0
-        for field_definition in record_definition[FIELDS]:
-            if field_definition[ID] == 'BOTSID' and self.ta_info['noBOTSID']:
-                record2build['BOTSID'] = lex_record[ID][VALUE]
+        # slices of the fields are computed by grammar
+        for field_id, field_slice in record_definition[FIXED_SLICES]:
+            if field_slice is None:
+                # noBOTSID
+                record2build[field_id] = lex_record[ID].value
                 continue
-            # copy string to avoid memory problem
-            value = fixedrecord[pos: pos + field_definition[LENGTH]].strip()
+            value = fixedrecord[field_slice].strip()
             if value:
-                record2build[field_definition[ID]] = value
-            pos += field_definition[LENGTH]
+                record2build[field_id] = value
         record2build['BOTSIDnr'] = record_definition[BOTSIDNR]
         return record2build
 
-    def _formatfield(self, value, field_definition, structure_record, node_instance):
+    def _compileformatfield(self, field_definition):
         """
-        Format of a field is checked and converted if needed.
-        Input: value (string), field definition.
-        Output: the formatted value (string)
-        Parameters of self.ta_info are used: triad, decimaal
+        Compile the format of field_definition (see message._compileformatfield).
+        Parameters of self.ta_info are used: triad, decimaal.
         for fixed field: same handling; length is not checked.
         """
-        if field_definition[BFORMAT] == 'A':
-            pass
-        elif field_definition[BFORMAT] in 'DT':
-            lenght = len(value)
-            if field_definition[BFORMAT] == 'D':
-                try:
-                    if lenght == 6:
-                        time.strptime(value, '%y%m%d')
-                    elif lenght == 8:
-                        time.strptime(value, '%Y%m%d')
-                    else:
-                        raise ValueError('To be catched')
-                except ValueError:
-                    self.add2errorlist(
-                        _(
-                            '[F07]%(linpos)s: Record "%(record)s" date field "%(field)s"'
-                            ' not a valid date: "%(content)s".\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-            else:  # if field_definition[BFORMAT] == 'T':
-                try:
-                    if lenght == 4:
-                        time.strptime(value, '%H%M')
-                    elif lenght == 6:
-                        time.strptime(value, '%H%M%S')
-                    elif lenght in [7, 8]:
-                        time.strptime(value[0:6], '%H%M%S')
-                        if not value[6:].isdigit():
-                            raise ValueError('To be catched')
-                    else:
-                        raise ValueError('To be catched')
-                except ValueError:
-                    self.add2errorlist(
-                        _(
-                            '[F08]%(linpos)s: Record "%(record)s" time field "%(field)s"'
-                            ' not a valid time: "%(content)s".\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-        else:  # elif field_definition[BFORMAT] in 'RNI':   #numerics (R, N, I)
-            if value[-1] == '-':
-                # if minus-sign at the end, put it in front.
-                value = value[-1] + value[:-1]
-            # strip triad-separators
-            value = value.replace(self.ta_info['triad'], '')
-            # replace decimal sign by canonical decimal sign
-            value = value.replace(self.ta_info['decimaal'], '.', 1)
-            if 'E' in value or 'e' in value:
-                self.add2errorlist(
-                    _(
-                        '[F09]%(linpos)s: Record "%(record)s" field "%(field)s"'
-                        ' contains exponent: "%(content)s".\n'
-                    )
-                    % {
-                        'linpos': node_instance.linpos(),
-                        'record': self.mpathformat(structure_record[MPATH]),
-                        'field': field_definition[ID],
-                        'content': value,
-                    }
-                )
-            if field_definition[BFORMAT] == 'R':
-                lendecimal = len(value.partition('.')[2])
-                try:
-                    # convert to decimal in order to check validity
-                    valuedecimal = float(value)
-                    value = '%.*F' % (lendecimal, valuedecimal)
-                except Exception:
-                    self.add2errorlist(
-                        _(
-                            '[F16]%(linpos)s: Record "%(record)s" numeric field "%(field)s"'
-                            ' has non-numerical content: "%(content)s".\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-            elif field_definition[BFORMAT] == 'N':
-                lendecimal = len(value.partition('.')[2])
-                if lendecimal != field_definition[DECIMALS]:
-                    self.add2errorlist(
-                        _(
-                            '[F14]%(linpos)s: Record "%(record)s" numeric field "%(field)s"'
-                            ' has invalid nr of decimals: "%(content)s".\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-                try:
-                    # convert to decimal in order to check validity
-                    valuedecimal = float(value)
-                    value = '%.*F' % (lendecimal, valuedecimal)
-                except Exception:
-                    self.add2errorlist(
-                        _(
-                            '[F15]%(linpos)s: Record "%(record)s" numeric field "%(field)s"'
-                            ' has non-numerical content: "%(content)s".\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-            elif field_definition[BFORMAT] == 'I':
-                if '.' in value:
-                    self.add2errorlist(
-                        _(
-                            '[F12]%(linpos)s: Record "%(record)s" field "%(field)s" has format "I"'
-                            ' but contains decimal sign: "%(content)s".\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-                else:
-                    try:
-                        # convert to decimal in order to check validity
-                        valuedecimal = float(value)
-                        valuedecimal = valuedecimal / 10 ** field_definition[DECIMALS]
-                        value = '%.*F' % (field_definition[DECIMALS], valuedecimal)
-                    except Exception:
-                        self.add2errorlist(
-                            _(
-                                '[F13]%(linpos)s: Record "%(record)s" numeric field "%(field)s"'
-                                ' has non-numerical content: "%(content)s".\n'
-                            )
-                            % {
-                                'linpos': node_instance.linpos(),
-                                'record': self.mpathformat(structure_record[MPATH]),
-                                'field': field_definition[ID],
-                                'content': value,
-                            }
-                        )
-        return value
+        checkformat = self.validation == 'full'
+        if field_definition[BFORMAT] == 'A' or (field_definition[BFORMAT] in ('D', 'T') and not checkformat):
+            return message.Message._compileformatfield(self, field_definition)
+        if field_definition[BFORMAT] == 'D':
+            return _compiledate(field_definition)
+        if field_definition[BFORMAT] == 'T':
+            return _compiletime(field_definition)
+        # numerics (R, N, I)
+        return _compilenumeric(field_definition, self.ta_info, checklength=False, checkformat=checkformat)
 
 
 class idoc(fixed):
@@ -1057,8 +1223,23 @@ class var(Inmessage):
 
     def _lex(self):
         """
-        lexes file with variable records to list of lex_records,
-        fields and subfields (build self.lex_records).
+        generator: lexes file with variable records to lex_records,
+        fields and subfields.
+        Lexer engine is set per editype in bots.ini (setting lexer_bulk); both engines give the same result.
+        """
+        if self._use_lexer_bulk():
+            yield from self._lex_bulk()
+        else:
+            yield from self._lex_char()
+
+    def _use_lexer_bulk(self):
+        """editype is in bots.ini setting lexer_bulk."""
+        lexer_bulk = botsglobal.ini.get('settings', 'lexer_bulk', None)
+        return bool(lexer_bulk) and self.ta_info['editype'] in [editype.strip() for editype in lexer_bulk.split(',')]
+
+    def _lex_char(self):
+        """
+        lexer engine that handles the edi file character by character.
         """
         # pylint: disable=too-many-locals, line-too-long
         # flake8: noqa:E221
@@ -1075,157 +1256,319 @@ class var(Inmessage):
         escape      = self.ta_info['escape']  # char after escape-char is not interpreted as separator
         mode_escape = 0    # 0=not escaping, 1=escaping
         skip_char   = self.ta_info['skip_char']   # chars to ignore/skip/discard. eg edifact: if wrapped to 80pos lines and <CR/LF> at end of segment
-        lex_record  = []   # gather the content of a record
+        lex_record  = LexRecord()  # gather the content of a record
         value       = ''   # gather the content of (sub)field; the current token
-        valueline   = 1    # record line of token
-        valuepos    = 1    # record position of token in line
-        countline   = 1    # count number of lines; start with 1
-        countpos    = 0    # count position/number of chars within line
+        valuepos    = 0    # offset of token in edi file
+        sep = field_sep + sfield_sep + record_sep + escape + rep_sep
+
+        for offset, char in enumerate(self.rawinput):
+            # get next char
+            if mode_quote:
+                # lexing within a quote; note that quote-char works as escape-char within a quote
+                if mode_2quote:
+                    mode_2quote = 0
+                    if char == quote_char:
+                        # after quote-char another quote-char: used to escape quote_char:
+                        # append quote_char
+                        value += char
+                        continue
+                    # quote is ended:
+                    mode_quote = 0
+                    # continue parsing of this char
+                elif mode_escape:
+                    # tricky: escaping a quote char
+                    mode_escape = 0
+                    value += char
+                    continue
+                elif char == quote_char:
+                    # either end-quote or escaping quote_char,we do not know yet
+                    mode_2quote = 1
+                    continue
+                elif char == escape:
+                    mode_escape = 1
+                    continue
+                else:
+                    # we are in quote, just append char to token
+                    value += char
+                    continue
+            if char in skip_char:
+                # char is skipped. In csv these chars could be in a quote;
+                # in eg edifact chars will be skipped, even if after escape sign.
+                continue
+            if not mode_inrecord:
+                # get here after record-separator is found. we are 'between' records.
+                # some special handling for whtiespace characters; for other chars: go on lexing
+                if char.isspace():
+                    # whitespace = ' \t\n\r\v\f'....note that CRLF might be in skip_char
+                    if char in field_sep and isinstance(self, csv):
+                        # exception for tab-delimited csv/excel files: if first field is not filled: first TAB is significant!
+                        # just go on lexing
+                        pass
+                    elif strict_syntax_check:
+                        # for strict checks: no spaces between records
+                        countline, countpos = LineIndex(self.rawinput).linpos(offset)
+                        raise InMessageError(
+                            _(
+                                '[A67]: Found space characters between segments.'
+                                ' Line %(countline)s, position %(pos)s, position %(countpos)s.'
+                            ),
+                            {'countline': countline, 'countpos': countpos},
+                        )
+                    else:
+                        # ignore whitespace character; continue for-loop with next character
+                        continue
+                # not whitespace - a new record has started
+                mode_inrecord = 1
+                lex_record.offset = offset
+            if mode_escape:
+                # in escaped_mode: char after escape sign is appended to token
+                mode_escape = 0
+                value += char
+                continue
+            if not value:
+                # no char in token: this is a new token, get offset for (new) token
+                valuepos = offset
+            if char == quote_char and (not value or value.isspace()):
+                # for csv: handle new quote value. New quote value only makes sense
+                # for new field (value is empty) or field contains only whitespace
+                mode_quote = 1
+                continue
+            if char not in sep:
+                # just a char: append char to value
+                value += char
+                continue
+            if char in field_sep:
+                # end of (sub)field. Note: first field of composite is marked as 'field'
+                # write current value to lex_record
+                lex_record.append(LexToken(value, sfield, valuepos - lex_record.offset))
+                value = ''
+                sfield = 0  # new token is field
+                continue
+            if char == sfield_sep:
+                # end of (sub)field. Note: first field of composite is marked as 'field'
+                # write current value to lex_record
+                lex_record.append(LexToken(value, sfield, valuepos - lex_record.offset))
+                value = ''
+                sfield = 1  # new token is sub-field
+                continue
+            if char in record_sep:  # end of record
+                if strict_syntax_check and not lex_record:
+                    # check for 'double' record seperator.
+                    countline, countpos = LineIndex(self.rawinput).linpos(offset)
+                    raise InMessageError(
+                        _('[A69]: Found double record seperator. Line %(countline)s,'
+                          ' position %(pos)s, position %(countpos)s.'),
+                        {'countline': countline, 'countpos': countpos})
+                # write current value to lex_record
+                lex_record.append(LexToken(value, sfield, valuepos - lex_record.offset))
+                yield lex_record
+                lex_record = LexRecord()
+                value = ''
+                # new token is field
+                sfield = 0
+                # we are not in a record
+                mode_inrecord = 0
+                continue
+            if char == escape:
+                mode_escape = 1
+                continue
+            if char == rep_sep:
+                # write current value to lex_record
+                lex_record.append(LexToken(value, sfield, valuepos - lex_record.offset))
+                value = ''
+                # new token is repeating
+                sfield = 2
+                continue
+        # end of for-loop. all characters have been processed.
+
+        # in a perfect world, value should always be empty now, but:
+        # it appears a csv record is not always closed properly,
+        # so force the closing of the last record of csv file:
+        if mode_inrecord and self.ta_info.get('allow_lastrecordnotclosedproperly', False):
+            # append element in record
+            lex_record.append(LexToken(value, sfield, valuepos - lex_record.offset))
+            yield lex_record
+        else:
+            leftover = value.strip('\x00\x1a')
+            if leftover:
+                raise InMessageError(
+                    _(
+                        '[A51]: Found non-valid data at end of edi file;'
+                        ' probably a problem with separators or message structure: "%(leftover)s".'
+                    ),
+                    {'leftover': leftover},
+                )
+
+    def _lex_bulk(self, start=0, stop=None):
+        """
+        lexer engine that splits the edi file on the separators.
+        Records that contain an escape, quote or skip character are lexed character by character
+        (see _lex_charrecord), so lex_records and errors are the same as for _lex_char.
+        start, stop: lex only the records starting at/after offset start and before offset stop
+        (start should be the start of a record or 'between' records).
+        Generator; returns the offset after the last lexed record.
+        """
+        # pylint: disable=too-many-locals
+        rawinput = self.rawinput
+        field_sep = self.ta_info['field_sep'] + self.ta_info['record_tag_sep']
+        sfield_sep = self.ta_info['sfield_sep']
+        record_sep = self.ta_info['record_sep']
+        rep_sep = self.ta_info['reserve']
+        strict_syntax_check = self.ta_info['strict_syntax_check']
+        skip_char = self.ta_info['skip_char']
+        # separators in same order of precedence as in _lex_char: field_sep, sfield_sep, record_sep, escape, rep_sep
+        sfield_sep = sfield_sep if sfield_sep not in field_sep else ''
+        record_sep = ''.join(char for char in record_sep if char not in field_sep and char != sfield_sep)
+        rep_sep = rep_sep if rep_sep not in field_sep + sfield_sep + record_sep + self.ta_info['escape'] else ''
+        specials = self.ta_info['escape'] + self.ta_info['quote_char'] + skip_char
+        if not record_sep or any(char in field_sep + sfield_sep + record_sep + rep_sep for char in specials):
+            # separators that are also escape/quote/skip characters: not suited for splitting.
+            yield from self._lex_char()
+            return len(rawinput)
+        # search for end of record; stops at escape, quote or skip characters as well
+        stop_search = re.compile('[%s]' % re.escape(record_sep + specials)).search
+        token_split = re.compile('([%s])' % re.escape(field_sep + sfield_sep + rep_sep)).split
+        sfieldtype = dict.fromkeys(field_sep, 0)
+        if sfield_sep:
+            sfieldtype[sfield_sep] = 1
+        if rep_sep:
+            sfieldtype[rep_sep] = 2
+        is_csv = isinstance(self, csv)
+        length = len(rawinput) if stop is None else stop
+        offset = start
+        while offset < length:
+            # 'between' records: skip the skip_char and whitespace.
+            char = rawinput[offset]
+            if char in skip_char or (char.isspace() and not (is_csv and char in field_sep)):
+                if strict_syntax_check and char not in skip_char:
+                    countline, countpos = LineIndex(rawinput).linpos(offset)
+                    raise InMessageError(
+                        _(
+                            '[A67]: Found space characters between segments.'
+                            ' Line %(countline)s, position %(pos)s, position %(countpos)s.'
+                        ),
+                        {'countline': countline, 'countpos': countpos},
+                    )
+                offset += 1
+                continue
+            # a new record has started
+            match = stop_search(rawinput, offset)
+            if match is None or match.group() not in record_sep:
+                # last record is not closed, or record with escape, quote or skip characters.
+                offset = yield from self._lex_charrecord(offset)
+                continue
+            end = match.start()
+            parts = token_split(rawinput[offset:end])
+            if strict_syntax_check and len(parts) == 1:
+                countline, countpos = LineIndex(rawinput).linpos(end)
+                raise InMessageError(
+                    _('[A69]: Found double record seperator. Line %(countline)s,'
+                      ' position %(pos)s, position %(countpos)s.'),
+                    {'countline': countline, 'countpos': countpos})
+            lex_record = LexRecord([LexToken(parts[0])])
+            lex_record.offset = offset
+            tokenpos = len(parts[0]) + 1
+            for index in range(1, len(parts), 2):
+                lex_record.append(LexToken(parts[index + 1], sfieldtype[parts[index]], tokenpos))
+                tokenpos += len(parts[index + 1]) + 1
+            yield lex_record
+            offset = end + 1
+        return offset
+
+    def _lex_charrecord(self, start):
+        """
+        used by _lex_bulk: lex one record character by character, starting at offset start.
+        Generator; yields the lex_record and returns the offset after the record separator.
+        At end of edi file the same checks as in _lex_char are done.
+        """
+        # pylint: disable=too-many-locals
+        rawinput = self.rawinput
+        record_sep = self.ta_info['record_sep']
+        field_sep = self.ta_info['field_sep'] + self.ta_info['record_tag_sep']
+        sfield_sep = self.ta_info['sfield_sep']
+        rep_sep = self.ta_info['reserve']
+        strict_syntax_check = self.ta_info['strict_syntax_check']
+        sfield = 0
+        quote_char = self.ta_info['quote_char']
+        mode_quote = 0
+        mode_2quote = 0
+        escape = self.ta_info['escape']
+        mode_escape = 0
+        skip_char = self.ta_info['skip_char']
+        lex_record = LexRecord()
+        lex_record.offset = start
+        value = ''
+        valuepos = 0
         sep = field_sep + sfield_sep + record_sep + escape + rep_sep
 
-        for char in self.rawinput:
-            # get next char
-            if char == '\n':
-                # count number lines/position; no action.
-                countline += 1  # count line
-                countpos = 0  # position back to 0
-            else:
-                countpos += 1  # position within line
+        for offset in range(start, len(rawinput)):
+            char = rawinput[offset]
             if mode_quote:
-                # lexing within a quote; note that quote-char works as escape-char within a quote
                 if mode_2quote:
                     mode_2quote = 0
                     if char == quote_char:
-                        # after quote-char another quote-char: used to escape quote_char:
-                        # append quote_char
                         value += char
                         continue
-                    # quote is ended:
                     mode_quote = 0
-                    # continue parsing of this char
                 elif mode_escape:
-                    # tricky: escaping a quote char
                     mode_escape = 0
                     value += char
                     continue
                 elif char == quote_char:
-                    # either end-quote or escaping quote_char,we do not know yet
                     mode_2quote = 1
                     continue
                 elif char == escape:
                     mode_escape = 1
                     continue
                 else:
-                    # we are in quote, just append char to token
                     value += char
                     continue
             if char in skip_char:
-                # char is skipped. In csv these chars could be in a quote;
-                # in eg edifact chars will be skipped, even if after escape sign.
                 continue
-            if not mode_inrecord:
-                # get here after record-separator is found. we are 'between' records.
-                # some special handling for whtiespace characters; for other chars: go on lexing
-                if char.isspace():
-                    # whitespace = ' \t\n\r\v\f'....note that CRLF might be in skip_char
-                    if char in field_sep and isinstance(self, csv):
-                        # exception for tab-delimited csv/excel files: if first field is not filled: first TAB is significant!
-                        # just go on lexing
-                        pass
-                    elif strict_syntax_check:
-                        # for strict checks: no spaces between records
-                        raise InMessageError(
-                            _(
-                                '[A67]: Found space characters between segments.'
-                                ' Line %(countline)s, position %(pos)s, position %(countpos)s.'
-                            ),
-                            {'countline': countline, 'countpos': countpos},
-                        )
-                    else:
-                        # ignore whitespace character; continue for-loop with next character
-                        continue
-                # not whitespace - a new record has started
-                mode_inrecord = 1
             if mode_escape:
-                # in escaped_mode: char after escape sign is appended to token
                 mode_escape = 0
                 value += char
                 continue
             if not value:
-                # no char in token: this is a new token, get line and pos for (new) token
-                valueline = countline
-                valuepos = countpos
+                valuepos = offset - start
             if char == quote_char and (not value or value.isspace()):
-                # for csv: handle new quote value. New quote value only makes sense
-                # for new field (value is empty) or field contains only whitespace
                 mode_quote = 1
                 continue
             if char not in sep:
-                # just a char: append char to value
                 value += char
                 continue
             if char in field_sep:
-                # end of (sub)field. Note: first field of composite is marked as 'field'
-                # write current value to lex_record
-                lex_record.append(
-                    {VALUE: value, SFIELD: sfield, LIN: valueline, POS: valuepos}
-                )
+                lex_record.append(LexToken(value, sfield, valuepos))
                 value = ''
-                sfield = 0  # new token is field
+                sfield = 0
                 continue
             if char == sfield_sep:
-                # end of (sub)field. Note: first field of composite is marked as 'field'
-                # write current value to lex_record
-                lex_record.append(
-                    {VALUE: value, SFIELD: sfield, LIN: valueline, POS: valuepos}
-                )
+                lex_record.append(LexToken(value, sfield, valuepos))
                 value = ''
-                sfield = 1  # new token is sub-field
+                sfield = 1
                 continue
-            if char in record_sep:  # end of record
+            if char in record_sep:
                 if strict_syntax_check and not lex_record:
-                    # check for 'double' record seperator.
+                    countline, countpos = LineIndex(rawinput).linpos(offset)
                     raise InMessageError(
                         _('[A69]: Found double record seperator. Line %(countline)s,'
                           ' position %(pos)s, position %(countpos)s.'),
                         {'countline': countline, 'countpos': countpos})
-                # write current value to lex_record
-                lex_record.append(
-                    {VALUE: value, SFIELD: sfield, LIN: valueline, POS: valuepos}
-                )
-                # write lex_record to self.lex_records
-                self.lex_records.append(lex_record)
-                lex_record = []
-                value = ''
-                # new token is field
-                sfield = 0
-                # we are not in a record
-                mode_inrecord = 0
-                continue
+                lex_record.append(LexToken(value, sfield, valuepos))
+                yield lex_record
+                return offset + 1
             if char == escape:
                 mode_escape = 1
                 continue
             if char == rep_sep:
-                # write current value to lex_record
-                lex_record.append(
-                    {VALUE: value, SFIELD: sfield, LIN: valueline, POS: valuepos}
-                )
+                lex_record.append(LexToken(value, sfield, valuepos))
                 value = ''
-                # new token is repeating
                 sfield = 2
                 continue
-        # end of for-loop. all characters have been processed.
-
-        # in a perfect world, value should always be empty now, but:
-        # it appears a csv record is not always closed properly,
-        # so force the closing of the last record of csv file:
-        if mode_inrecord and self.ta_info.get('allow_lastrecordnotclosedproperly', False):
-            # append element in record
-            lex_record.append(
-                {VALUE: value, SFIELD: sfield, LIN: valueline, POS: valuepos}
-            )
-            # write record to recordlist
-            self.lex_records.append(lex_record)
+        # end of edi file; record is not closed.
+        if self.ta_info.get('allow_lastrecordnotclosedproperly', False):
+            lex_record.append(LexToken(value, sfield, valuepos))
+            yield lex_record
         else:
             leftover = value.strip('\x00\x1a')
             if leftover:
@@ -1236,6 +1579,7 @@ class var(Inmessage):
                     ),
                     {'leftover': leftover},
                 )
+        return len(rawinput)
 
     def _parsefields(self, lex_record, record_definition) -> dict:
         """
@@ -1254,15 +1598,16 @@ class var(Inmessage):
         # ********loop over all fields present in this record of edi file
         # ********identify the lexed fields in grammar, and build a dict with (fieldID:value)
         for lex_field in lex_record:
-            value = lex_field[VALUE].strip() if self.ta_info["strip_value"] else lex_field[VALUE][:]
+            value = lex_field.value.strip() if self.ta_info["strip_value"] else lex_field.value[:]
             # *********use info of lexer: what is preceding separator (field, sub-field, repeat)
-            if not lex_field[SFIELD]:
+            if not lex_field.sfield:
                 # preceded by field-separator
                 try:
                     # use next field
                     tindex += 1
                     field_definition = list_of_fields_in_record_definition[tindex]
                 except IndexError:
+                    line, pos = self._linpos(lex_record, lex_field)
                     self.add2errorlist(
                         _(
                             '[F19] line %(line)s pos %(pos)s: Record "%(record)s"'
@@ -1270,9 +1615,9 @@ class var(Inmessage):
                             ' unknown field "%(content)s".\n'
                         )
                         % {
-                            'content': lex_field[VALUE],
-                            'line': lex_field[LIN],
-                            'pos': lex_field[POS],
+                            'content': lex_field.value,
+                            'line': line,
+                            'pos': pos,
                             'record': self.mpathformat(record_definition[MPATH]),
                         }
                     )
@@ -1309,7 +1654,7 @@ class var(Inmessage):
                         record2build[field_definition[ID]] = [
                             {sub_field_in_record_definition[ID]: value}
                         ]
-            elif lex_field[SFIELD] == 1:
+            elif lex_field.sfield == 1:
                 # preceded by sub-field separator
                 try:
                     tsubindex += 1
@@ -1318,21 +1663,23 @@ class var(Inmessage):
                     ]
                 except (TypeError, UnboundLocalError):
                     # field has no SUBFIELDS, or unexpected subfield
+                    line, pos = self._linpos(lex_record, lex_field)
                     self.add2errorlist(
                         _(
                             '[F17] line %(line)s pos %(pos)s: Record "%(record)s"'
                             ' expect field but "%(content)s" is a subfield.\n'
                         )
                         % {
-                            'content': lex_field[VALUE],
-                            'line': lex_field[LIN],
-                            'pos': lex_field[POS],
+                            'content': lex_field.value,
+                            'line': line,
+                            'pos': pos,
                             'record': self.mpathformat(record_definition[MPATH]),
                         }
                     )
                     continue
                 except IndexError:
                     # tsubindex is not in the subfields
+                    line, pos = self._linpos(lex_record, lex_field)
                     self.add2errorlist(
                         _(
                             '[F18] line %(line)s pos %(pos)s: Record "%(record)s"'
@@ -1340,9 +1687,9 @@ class var(Inmessage):
                             ' unknown subfield "%(content)s".\n'
                         )
                         % {
-                            'content': lex_field[VALUE],
-                            'line': lex_field[LIN],
-                            'pos': lex_field[POS],
+                            'content': lex_field.value,
+                            'line': line,
+                            'pos': pos,
                             'record': self.mpathformat(record_definition[MPATH]),
                         }
                     )
@@ -1365,6 +1712,7 @@ class var(Inmessage):
                         # exception for ISA
                         pass
                     else:
+                        line, pos = self._linpos(lex_record, lex_field)
                         self.add2errorlist(
                             _(
                                 '[F40] line %(line)s pos %(pos)s:'
@@ -1372,9 +1720,9 @@ class var(Inmessage):
                                 ' but "%(content)s" is repeating.\n'
                             )
                             % {
-                                'content': lex_field[VALUE],
-                                'line': lex_field[LIN],
-                                'pos': lex_field[POS],
+                                'content': lex_field.value,
+                                'line': line,
+                                'pos': pos,
                                 'record': self.mpathformat(record_definition[MPATH]),
                             }
                         )
@@ -1422,14 +1770,17 @@ class csv(var):
     """class for ediobjects with Comma Separated Values"""
 
     def _lex(self):
-        super()._lex()
+        if self._use_lexer_bulk():
+            lex_records = self._lex_csvlib()
+        else:
+            lex_records = self._lex_char()
         if self.ta_info['skip_firstline']:
             # if it is an integer, skip that many lines
             # if True, skip just the first line
             if isinstance(self.ta_info['skip_firstline'], bool):
-                del self.lex_records[0]
+                lex_records = itertools.islice(lex_records, 1, None)
             else:
-                del self.lex_records[0:self.ta_info['skip_firstline']]
+                lex_records = itertools.islice(lex_records, self.ta_info['skip_firstline'], None)
 
         noBOTSID = self.ta_info['noBOTSID']
         if noBOTSID:
@@ -1438,13 +1789,131 @@ class csv(var):
             if isinstance(noBOTSID, bool):
                 # add the recordname as BOTSID
                 botsid = self.defmessage.structure[0][ID]
-                for lex_record in self.lex_records:
-                    lex_record[0:0] = [
-                        {VALUE: botsid, POS: 0, LIN: lex_record[0][LIN], SFIELD: False}]
+                for lex_record in lex_records:
+                    lex_record[0:0] = [LexToken(botsid)]
+                    yield lex_record
             else:
-                for lex_record in self.lex_records:
+                for lex_record in lex_records:
                     botsid_record = lex_record.pop(noBOTSID)
                     lex_record[0:0] = [botsid_record]
+                    yield lex_record
+        else:
+            yield from lex_records
+
+    def _lex_csvlib(self):
+        """
+        lexer engine that reads the edi file with the python csv module (also fast for quoted fields).
+        Only for 'plain' csv syntax: one character field_sep, records separated by CR/LF,
+        no escape, skip_char, sfield_sep etc; else _lex_bulk is used.
+        Each row of the csv module is checked against the edi file.
+        Rows that bots lexes differently (eg spaces before quote, chars after end quote,
+        last record not closed) are lexed by _lex_bulk,
+        so lex_records and errors are the same as for _lex_char.
+        """
+        # pylint: disable=too-many-locals
+        rawinput = self.rawinput
+        field_sep = self.ta_info['field_sep']
+        quote_char = self.ta_info['quote_char']
+        if (
+                self.ta_info['strict_syntax_check']
+                or len(field_sep) != 1
+                or field_sep in '\r\n'
+                or len(quote_char) > 1
+                or quote_char in ('\r', '\n', field_sep)
+                or quote_char.isspace()
+                or set(self.ta_info['record_sep']) != {'\r', '\n'}
+                or self.ta_info['escape']
+                or self.ta_info['skip_char']
+                or self.ta_info['sfield_sep']
+                or self.ta_info['reserve']
+                or self.ta_info['record_tag_sep']
+        ):
+            yield from self._lex_bulk()
+            return
+        # offset of end of last line read by the csv module
+        line_end = [0]
+
+        def lines():
+            for match in re.finditer('[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+', rawinput):
+                line_end[0] = match.end()
+                yield match.group()
+
+        reader = csvlib.reader(
+            lines(),
+            delimiter=field_sep,
+            quotechar=quote_char or None,
+            quoting=csvlib.QUOTE_MINIMAL if quote_char else csvlib.QUOTE_NONE,
+            doublequote=True,
+            skipinitialspace=False,
+            strict=False,
+        )
+        quote_char2 = quote_char + quote_char
+        start = 0
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csvlib.Error:
+                # eg field is larger than csv.field_size_limit(): lex rest of edi file with _lex_bulk
+                yield from self._lex_bulk(start)
+                return
+            end = line_end[0]
+            if not row:
+                # empty line
+                start = end
+                continue
+            # check row against edi file (row as it would be in the edi file is the same);
+            # determine position of the fields.
+            lex_record = None
+            if rawinput[end - 1] == '\n' and rawinput[end - 2:end - 1] == '\r' and end - 2 >= start:
+                content_end = end - 2
+            elif rawinput[end - 1] in '\r\n':
+                content_end = end - 1
+            else:
+                # last record is not closed
+                content_end = -1
+            if content_end >= start and not (rawinput[start].isspace() and rawinput[start] != field_sep):
+                lex_record = LexRecord()
+                lex_record.offset = start
+                line = rawinput[start:content_end]
+                pos = 0
+                if not quote_char or quote_char not in line:
+                    # no quotes: csv module splits on field_sep as bots does
+                    for value in row:
+                        lex_record.append(LexToken(value, 0, pos))
+                        pos += len(value) + 1
+                    yield lex_record
+                    start = end
+                    continue
+                raw_fields = []
+                for value in row:
+                    if rawinput.startswith(quote_char, start + pos):
+                        raw = quote_char + value.replace(quote_char, quote_char2) + quote_char
+                        # bots: position of empty quoted value is position of the separator after it
+                        lex_record.append(LexToken(value, 0, pos if value else pos + 2))
+                    else:
+                        if quote_char in value and value.partition(quote_char)[0].isspace():
+                            # bots: quote after spaces starts a quoted value
+                            lex_record = None
+                            break
+                        raw = value
+                        lex_record.append(LexToken(value, 0, pos))
+                    raw_fields.append(raw)
+                    pos += len(raw) + 1
+                else:
+                    if field_sep.join(raw_fields) != line:
+                        lex_record = None
+            if lex_record is None:
+                # lex this row as bots does
+                offset = yield from self._lex_bulk(start, end)
+                if offset != end:
+                    # eg quote is not closed: lex rest of edi file with _lex_bulk
+                    yield from self._lex_bulk(offset)
+                    return
+            else:
+                yield lex_record
+            start = end
 
     def set_syntax_used(self):
         for key in ['record_sep', 'field_sep', 'quote_char', 'escape']:
@@ -1464,7 +1933,6 @@ class excel(csv):
             raise ImportError(
                 _('Dependency failure: editype "excel" requires python library "xlrd".')
             ) from exc
-        import csv as csvlib
         import io
 
         self.messagegrammarread(typeofgrammarfile='grammars')
@@ -1503,13 +1971,12 @@ class excel(csv):
         rawinputfile.close()
         self.rawinput = self.rawinput.decode('utf-8')
         # start lexing and parsing as csv
-        self._lex()
-        if hasattr(self, 'rawinput'):
-            del self.rawinput
+        self._lineindex = LineIndex(self.rawinput)
         # make root Node None.
         self.root = node.Node()
-        self.iternext_lex_record = iter(self.lex_records)
+        self.iternext_lex_record = self._lexstream()
         leftover = self._parse(structure_level=self.defmessage.structure, inode=self.root)
+        del self.rawinput
         if leftover:
             raise InMessageError(
                 _('[A52]: Found non-valid data at end of excel file: "%(leftover)s".'),
@@ -1764,33 +2231,10 @@ class edifact(var):
                     _('[E03]: Count of messages in UNZ is invalid: "%(count)s".\n')
                     % {'count': unzcount}
                 )
-            for nodeunh in UNB.getloop({'BOTSID': 'UNB'}, {'BOTSID': 'UNH'}):
-                unhreference = nodeunh.get({'BOTSID': 'UNH', '0062': None})
-                untreference = nodeunh.get({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0062': None})
-                if unhreference and untreference and unhreference != untreference:
-                    self.add2errorlist(
-                        _(
-                            '[E04]: UNH-reference is "%(unhreference)s";'
-                            ' should be equal to UNT-reference "%(untreference)s".\n'
-                        )
-                        % {'unhreference': unhreference, 'untreference': untreference}
-                    )
-                untcount = nodeunh.get({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0074': None})
-                segmentcount = nodeunh.getcount()
-                try:
-                    if int(untcount) != segmentcount:
-                        self.add2errorlist(
-                            _(
-                                '[E05]: Segmentcount in UNT is %(untcount)s;'
-                                ' should be equal to number of segments %(segmentcount)s.\n'
-                            )
-                            % {'untcount': untcount, 'segmentcount': segmentcount}
-                        )
-                except Exception:
-                    self.add2errorlist(
-                        _('[E06]: Count of segments in UNT is invalid: "%(count)s".\n')
-                        % {'count': untcount}
-                    )
+            if not self.streaming:
+                # for streaming translation messages are checked when parsed
+                for nodeunh in UNB.getloop({'BOTSID': 'UNB'}, {'BOTSID': 'UNH'}):
+                    self._checkmessageenvelope(nodeunh, UNB)
             for nodeung in UNB.getloop({'BOTSID': 'UNB'}, {'BOTSID': 'UNG'}):
                 ungreference = nodeung.get({'BOTSID': 'UNG', '0048': None})
                 unereference = nodeung.get({'BOTSID': 'UNG'}, {'BOTSID': 'UNE', '0048': None})
@@ -1818,34 +2262,69 @@ class edifact(var):
                         _('[E09]: Groupcount in UNE is invalid: "%(count)s".\n')
                         % {'count': unecount}
                     )
-                for nodeunh in nodeung.getloop({'BOTSID': 'UNG'}, {'BOTSID': 'UNH'}):
-                    unhreference = nodeunh.get({'BOTSID': 'UNH', '0062': None})
-                    untreference = nodeunh.get({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0062': None})
-                    if unhreference and untreference and unhreference != untreference:
-                        self.add2errorlist(
-                            _(
-                                '[E10]: UNH-reference is "%(unhreference)s";'
-                                ' should be equal to UNT-reference "%(untreference)s".\n'
-                            )
-                            % {'unhreference': unhreference, 'untreference': untreference}
+                if not self.streaming:
+                    for nodeunh in nodeung.getloop({'BOTSID': 'UNG'}, {'BOTSID': 'UNH'}):
+                        self._checkmessageenvelope(nodeunh, nodeung)
+            botsglobal.logmap.debug('Parsing edifact envelopes is OK')
+
+    def _checkmessageenvelope(self, message_node, envelope_node):
+        """check UNH-UNT counters & references of one message."""
+        nodeunh = message_node
+        if envelope_node.record['BOTSID'] == 'UNB':
+            unhreference = nodeunh.get({'BOTSID': 'UNH', '0062': None})
+            untreference = nodeunh.get({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0062': None})
+            if unhreference and untreference and unhreference != untreference:
+                self.add2errorlist(
+                    _(
+                        '[E04]: UNH-reference is "%(unhreference)s";'
+                        ' should be equal to UNT-reference "%(untreference)s".\n'
+                    )
+                    % {'unhreference': unhreference, 'untreference': untreference}
+                )
+            untcount = nodeunh.get({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0074': None})
+            segmentcount = nodeunh.getcount()
+            try:
+                if int(untcount) != segmentcount:
+                    self.add2errorlist(
+                        _(
+                            '[E05]: Segmentcount in UNT is %(untcount)s;'
+                            ' should be equal to number of segments %(segmentcount)s.\n'
                         )
-                    untcount = nodeunh.get({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0074': None})
-                    segmentcount = nodeunh.getcount()
-                    try:
-                        if int(untcount) != segmentcount:
-                            self.add2errorlist(
-                                _(
-                                    '[E11]: Segmentcount in UNT is %(untcount)s;'
-                                    ' should be equal to number of segments %(segmentcount)s.\n'
-                                )
-                                % {'untcount': untcount, 'segmentcount': segmentcount}
-                            )
-                    except Exception:
-                        self.add2errorlist(
-                            _('[E12]: Count of segments in UNT is invalid: "%(count)s".\n')
-                            % {'count': untcount}
+                        % {'untcount': untcount, 'segmentcount': segmentcount}
+                    )
+            except Exception:
+                self.add2errorlist(
+                    _('[E06]: Count of segments in UNT is invalid: "%(count)s".\n')
+                    % {'count': untcount}
+                )
+        else:
+            # message in UNG group
+            unhreference = nodeunh.get({'BOTSID': 'UNH', '0062': None})
+            untreference = nodeunh.get({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0062': None})
+            if unhreference and untreference and unhreference != untreference:
+                self.add2errorlist(
+                    _(
+                        '[E10]: UNH-reference is "%(unhreference)s";'
+                        ' should be equal to UNT-reference "%(untreference)s".\n'
+                    )
+                    % {'unhreference': unhreference, 'untreference': untreference}
+                )
+            untcount = nodeunh.get({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0074': None})
+            segmentcount = nodeunh.getcount()
+            try:
+                if int(untcount) != segmentcount:
+                    self.add2errorlist(
+                        _(
+                            '[E11]: Segmentcount in UNT is %(untcount)s;'
+                            ' should be equal to number of segments %(segmentcount)s.\n'
                         )
-            botsglobal.logmap.debug('Parsing edifact envelopes is OK')
+                        % {'untcount': untcount, 'segmentcount': segmentcount}
+                    )
+            except Exception:
+                self.add2errorlist(
+                    _('[E12]: Count of segments in UNT is invalid: "%(count)s".\n')
+                    % {'count': untcount}
+                )
 
     def handleconfirm(self, ta_fromfile, routedict, error):
         """
@@ -2018,18 +2497,18 @@ class edifact(var):
         if not hasattr(self, "lex_records"):
             return
         for lex_record in self.lex_records:
-            if lex_record[0][VALUE] == "UNB":
+            if lex_record[0].value == "UNB":
                 count_fields = 0
                 for field in lex_record:
-                    if not field[SFIELD]:
+                    if not field.sfield:
                         # if field (not subfield etc)
                         count_fields += 1
                         if count_fields == 3:
-                            self.ta_info["frompartner"] = field[VALUE]
+                            self.ta_info["frompartner"] = field.value
                         elif count_fields == 4:
-                            self.ta_info["topartner"] = field[VALUE]
+                            self.ta_info["topartner"] = field.value
                         elif count_fields == 6:
-                            self.ta_info["reference"] = field[VALUE]
+                            self.ta_info["reference"] = field.value
                             return
                 return
 
@@ -2194,36 +2673,43 @@ class x12(var):
                         _('[E18]: Count of messages in GE is invalid: "%(count)s".\n')
                         % {'count': gecount}
                     )
-                for nodest in nodegs.getloop({'BOTSID': 'GS'}, {'BOTSID': 'ST'}):
-                    streference = nodest.get({'BOTSID': 'ST', 'ST02': None})
-                    sereference = nodest.get({'BOTSID': 'ST'}, {'BOTSID': 'SE', 'SE02': None})
-                    # referencefields are numerical; should I compare values??
-                    if streference and sereference and streference != sereference:
-                        self.add2errorlist(
-                            _(
-                                '[E19]: ST-reference is "%(streference)s";'
-                                ' should be equal to SE-reference "%(sereference)s".\n'
-                            )
-                            % {'streference': streference, 'sereference': sereference}
-                        )
-                    secount = nodest.get({'BOTSID': 'ST'}, {'BOTSID': 'SE', 'SE01': None})
-                    segmentcount = nodest.getcount()
-                    try:
-                        if int(secount) != segmentcount:
-                            self.add2errorlist(
-                                _(
-                                    '[E20]: Count in SE-SE01 is %(secount)s;'
-                                    ' should be equal to number of segments %(segmentcount)s.\n'
-                                )
-                                % {'secount': secount, 'segmentcount': segmentcount}
-                            )
-                    except Exception:
-                        self.add2errorlist(
-                            _('[E21]: Count of segments in SE is invalid: "%(count)s".\n')
-                            % {'count': secount}
-                        )
+                if not self.streaming:
+                    # for streaming translation messages are checked when parsed
+                    for nodest in nodegs.getloop({'BOTSID': 'GS'}, {'BOTSID': 'ST'}):
+                        self._checkmessageenvelope(nodest, nodegs)
             botsglobal.logmap.debug('Parsing X12 envelopes is OK')
 
+    def _checkmessageenvelope(self, message_node, envelope_node):  # pylint: disable=unused-argument
+        """check ST-SE counters & references of one message."""
+        nodest = message_node
+        streference = nodest.get({'BOTSID': 'ST', 'ST02': None})
+        sereference = nodest.get({'BOTSID': 'ST'}, {'BOTSID': 'SE', 'SE02': None})
+        # referencefields are numerical; should I compare values??
+        if streference and sereference and streference != sereference:
+            self.add2errorlist(
+                _(
+                    '[E19]: ST-reference is "%(streference)s";'
+                    ' should be equal to SE-reference "%(sereference)s".\n'
+                )
+                % {'streference': streference, 'sereference': sereference}
+            )
+        secount = nodest.get({'BOTSID': 'ST'}, {'BOTSID': 'SE', 'SE01': None})
+        segmentcount = nodest.getcount()
+        try:
+            if int(secount) != segmentcount:
+                self.add2errorlist(
+                    _(
+                        '[E20]: Count in SE-SE01 is %(secount)s;'
+                        ' should be equal to number of segments %(segmentcount)s.\n'
+                    )
+                    % {'secount': secount, 'segmentcount': segmentcount}
+                )
+        except Exception:
+            self.add2errorlist(
+                _('[E21]: Count of segments in SE is invalid: "%(count)s".\n')
+                % {'count': secount}
+            )
+
     def try_to_retrieve_info(self):
         """
         when edi-file is not correct, (try to) get info about eg partnerID's in message
@@ -2232,16 +2718,16 @@ class x12(var):
         if not hasattr(self, "lex_records"):
             return
         for lex_record in self.lex_records:
-            if lex_record[0][VALUE] == "ISA":
+            if lex_record[0].value == "ISA":
                 count_fields = 0
                 for field in lex_record:
                     count_fields += 1
                     if count_fields == 7:
-                        self.ta_info["frompartner"] = field[VALUE]
+                        self.ta_info["frompartner"] = field.value
                     elif count_fields == 9:
-                        self.ta_info["topartner"] = field[VALUE]
+                        self.ta_info["topartner"] = field.value
                     elif count_fields == 15:
-                        self.ta_info["reference"] = field[VALUE]
+                        self.ta_info["reference"] = field.value
                         return
                 return
 
@@ -2443,24 +2929,31 @@ class tradacoms(var):
                 if firstmessage:
                     nodestx.queries = {'messagetype': nodemhd.queries['messagetype']}
                     firstmessage = False
-                mtrcount = nodemhd.get({'BOTSID': 'MHD'}, {'BOTSID': 'MTR', 'NOSG': None})
-                segmentcount = nodemhd.getcount()
-                try:
-                    if int(mtrcount) != segmentcount:
-                        self.add2errorlist(
-                            _(
-                                '[E24]: Count in MTR is %(mtrcount)s;'
-                                ' should be equal to number of segments %(segmentcount)s.\n'
-                            )
-                            % {'mtrcount': mtrcount, 'segmentcount': segmentcount}
-                        )
-                except Exception:
-                    self.add2errorlist(
-                        _('[E25]: Count of segments in MTR is invalid: "%(count)s".\n')
-                        % {'count': mtrcount}
-                    )
+                if not self.streaming:
+                    # for streaming translation messages are checked when parsed
+                    self._checkmessageenvelope(nodemhd, nodestx)
             botsglobal.logmap.debug('Parsing tradacoms envelopes is OK')
 
+    def _checkmessageenvelope(self, message_node, envelope_node):  # pylint: disable=unused-argument
+        """check MHD-MTR counter of one message."""
+        nodemhd = message_node
+        mtrcount = nodemhd.get({'BOTSID': 'MHD'}, {'BOTSID': 'MTR', 'NOSG': None})
+        segmentcount = nodemhd.getcount()
+        try:
+            if int(mtrcount) != segmentcount:
+                self.add2errorlist(
+                    _(
+                        '[E24]: Count in MTR is %(mtrcount)s;'
+                        ' should be equal to number of segments %(segmentcount)s.\n'
+                    )
+                    % {'mtrcount': mtrcount, 'segmentcount': segmentcount}
+                )
+        except Exception:
+            self.add2errorlist(
+                _('[E25]: Count of segments in MTR is invalid: "%(count)s".\n')
+                % {'count': mtrcount}
+            )
+
     def set_syntax_used(self):
         for key in ['record_sep', 'field_sep', 'sfield_sep', 'escape', 'record_tag_sep']:
             self.syntax[key] = self.ta_info[key]
@@ -2472,6 +2965,8 @@ class xml(Inmessage):
     def initfromfile(self):
         botsglobal.logger.debug('Read edi file "%(filename)s".', self.ta_info)
         filename = botslib.abspathdata(self.ta_info['filename'])
+        # bots.ini xml_iterparse: build bots-nodes-tree while parsing, no complete etree in memory
+        iterparse = botsglobal.ini.getboolean('settings', 'xml_iterparse', False)
 
         if self.ta_info['messagetype'] == 'mailbag':
             # the messagetype is not know.
@@ -2483,6 +2978,8 @@ class xml(Inmessage):
             # if found, and 'content' in the dict;
             # if 'content' is equal to value found by xpath-search, then set messagetype.
             # if found, and no 'content' in the dict; set messagetype.
+            # if xml_iterparse: xpath is used on the first elements of the xml-file only
+            # (see _firstelements).
             try:
                 module, _grammarname = botslib.botsimport("grammars", "xml", "mailbag")
                 mailbagsearch = getattr(module, 'mailbagsearch')
@@ -2492,18 +2989,18 @@ class xml(Inmessage):
             except BotsImportError:
                 botsglobal.logger.error('Missing mailbag definitions for xml, should be there.')
                 raise
+            # there might be no extra_character_entity in the mailbag definitions, is OK.
+            extra_character_entity = getattr(module, 'extra_character_entity', {})
             parser = ET.XMLParser()
-            try:
-                extra_character_entity = getattr(module, 'extra_character_entity')
-                for key, value in extra_character_entity.items():
-                    parser.entity[key] = value
-            except AttributeError:
-                # there is no extra_character_entity in the mailbag definitions, is OK.
-                pass
+            for key, value in extra_character_entity.items():
+                parser.entity[key] = value
             # ElementTree: lexes, parses, makes etree; etree is quite similar to bots-node trees
             # but conversion is needed
-            etree = ET.ElementTree()
-            etreeroot = etree.parse(filename, parser)
+            if iterparse:
+                etree = ET.ElementTree(self._firstelements(filename, parser))
+            else:
+                etree = ET.ElementTree()
+                etreeroot = etree.parse(filename, parser)
             for item in mailbagsearch:
                 if 'xpath' not in item or 'messagetype' not in item:
                     raise InMessageError(_('Invalid search parameters in xml mailbag.'))
@@ -2520,20 +3017,151 @@ class xml(Inmessage):
             self.messagegrammarread(typeofgrammarfile='grammars')
         else:
             self.messagegrammarread(typeofgrammarfile='grammars')
+            extra_character_entity = self.ta_info['extra_character_entity']
+            if not iterparse:
+                parser = ET.XMLParser()
+                for key, value in extra_character_entity.items():
+                    parser.entity[key] = value
+                # ElementTree: lexes, parses, makes etree; etree is quite similar to bots-node trees
+                # but conversion is needed
+                etree = ET.ElementTree()
+                etreeroot = etree.parse(filename, parser)
+        self.stackinit()
+        if iterparse:
             parser = ET.XMLParser()
-            for key, value in self.ta_info['extra_character_entity'].items():
+            for key, value in extra_character_entity.items():
                 parser.entity[key] = value
-            # ElementTree: lexes, parses, makes etree; etree is quite similar to bots-node trees
-            # but conversion is needed
-            etree = ET.ElementTree()
-            etreeroot = etree.parse(filename, parser)
-        self._handle_empty(etreeroot)
-        self.stackinit()
-        # convert etree to bots-nodes-tree
-        self.root = self._etree2botstree(etreeroot)
+            self.root = self._iterparse2botstree(filename, parser)
+        else:
+            self._handle_empty(etreeroot)
+            # convert etree to bots-nodes-tree
+            self.root = self._etree2botstree(etreeroot)
         self.checkmessage(self.root, self.defmessage)
         self.ta_info.update(self.root.queries)
 
+    @staticmethod
+    def _firstelements(filename, parser):
+        """
+        for mailbag with xml_iterparse: parse the first elements of xml file and return the root.
+        First elements: root, its child elements up to and including the first child element with children.
+        """
+        depth = 0
+        count = 0
+        with open(filename, 'rb') as source:
+            for event, xmlnode in ET.iterparse(source, ('start', 'end'), parser):
+                if event == 'start':
+                    if not depth:
+                        root = xmlnode
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 1:
+                    count += 1
+                    if len(xmlnode):
+                        # parser reads ahead: remove the elements after this one
+                        del root[count:]
+                        break
+        return root
+
+    def _iterparse2botstree(self, filename, parser):
+        """
+        incremental version of _handle_empty and _etree2botstree (bots.ini xml_iterparse):
+        the bots-nodes-tree is build while the xml file is parsed (ElementTree.iterparse).
+        xml elements are cleared and removed as soon as they are converted.
+        For each open xml element is tracked (in xmlstack) what it is:
+        record, field (or: not known yet if field or record), unknown (record not in grammar)
+        or skip (within unknown or field).
+        The bots node of a record is made when its text is complete: at start of first child element or at end.
+        """
+        root = None
+        # entries: [xml element, kind, bots node (None until made)]
+        xmlstack = []
+        with open(filename, 'rb') as source:
+            for event, xmlnode in ET.iterparse(source, ('start', 'end'), parser):
+                if event == 'start':
+                    if not xmlstack:
+                        xmlstack.append([xmlnode, 'record', None])
+                        continue
+                    parent = xmlstack[-1]
+                    if parent[1] == 'field':
+                        # 'field' has child elements: is a record
+                        parent[1] = self._iterparse_entitytype(parent[0], xmlstack[-2][2])
+                    if parent[1] == 'record':
+                        if parent[2] is None:
+                            root = self._iterparse_node(parent, xmlstack[-2][2] if len(xmlstack) > 1 else None) or root
+                        xmlstack.append([xmlnode, self._iterparse_entitytype(xmlnode, parent[2]), None])
+                    else:
+                        xmlstack.append([xmlnode, 'skip', None])
+                    continue
+                # event == 'end'
+                entry = xmlstack.pop()
+                if entry[1] == 'skip':
+                    continue
+                if entry[1] == 'record':
+                    if entry[2] is None:
+                        root = self._iterparse_node(entry, xmlstack[-1][2] if xmlstack else None) or root
+                    if xmlstack:
+                        # handled the xmlnode, so remove it from the stack
+                        self.stack.pop()
+                elif entry[1] == 'field':
+                    record = xmlstack[-1][2].record
+                    if xmlnode.text:
+                        xmlnode.text = xmlnode.text.strip()
+                        if xmlnode.text:
+                            # if xml element has content, add as field
+                            record[xmlnode.tag] = xmlnode.text
+                    # convert the xml-attributes of this 'xml-field'
+                    # to fields in dict with attributemarker.
+                    record.update(
+                        (xmlnode.tag + self.ta_info['attributemarker'] + key, value.strip())
+                        for key, value in xmlnode.items()
+                        if value.strip()
+                    )
+                # xml element is converted; remove it.
+                # earlier siblings are already removed, so it is the first child of its parent.
+                xmlnode.clear()
+                if xmlstack:
+                    del xmlstack[-1][0][0]
+        return root
+
+    def _iterparse_node(self, entry, parentnode):
+        """make bots node for record when text of xml element is complete; return the node if it is the root."""
+        xmlnode = entry[0]
+        if xmlnode.text:
+            xmlnode.text = xmlnode.text.strip()
+        for key, value in xmlnode.items():
+            xmlnode.attrib[key] = value.strip()
+        entry[2] = node.Node(record=self._etreenode2botstreenode(xmlnode))
+        if parentnode is None:
+            return entry[2]
+        parentnode.append(entry[2])
+        return None
+
+    def _iterparse_entitytype(self, xmlchildnode, parentnode):
+        """
+        _entitytype for xml_iterparse. When the xml element starts it is not known if it has children;
+        if no record: 'field', checked again when a child element starts.
+        """
+        entitytype = self._entitytype(xmlchildnode)
+        if entitytype == 1:
+            return 'record'
+        if entitytype == 2:
+            # is a record, but not in grammar
+            if self.ta_info['checkunknownentities']:
+                self.add2errorlist(
+                    _(
+                        '[S02]%(linpos)s: Unknown xml-tag "%(recordunkown)s"'
+                        ' (within "%(record)s") in message.\n'
+                    )
+                    % {
+                        'linpos': parentnode.linpos(),
+                        'recordunkown': xmlchildnode.tag,
+                        'record': parentnode.record['BOTSID'],
+                    }
+                )
+            return 'unknown'
+        return 'field'
+
     def _handle_empty(self, xmlnode):
         if xmlnode.text:
             xmlnode.text = xmlnode.text.strip()
@@ -2641,10 +3269,129 @@ class xmlnocheck(xml):
         self.stack = [0]
 
 
+class JsonReader:
+    """
+    Reads a json file in blocks, for streaming translation of a json list of messages.
+    Json values are decoded one by one from a buffer (JSONDecoder.raw_decode);
+    if a value is not complete in the buffer, more is read and the value is decoded again.
+    Errors are as for json.loads (line, column and char are positions in the file).
+    """
+
+    whitespace = re.compile(r'[ \t\n\r]*')
+    # rest of buffer at an error for a value that might be cut off by the end of the buffer:
+    # nothing, or part of a literal, number or \u-escape (eg 'tru', '-', '1.', '1e', '\\u12').
+    cutoff = re.compile(r'[\w.+\-\\]{0,10}\Z')
+
+    def __init__(self, filename, charset, errors, size=65536):
+        self.filehandler = botslib.opendata_bin(filename)
+        self.decoder = codecs.getincrementaldecoder(charset)(errors)
+        self.jsondecoder = simplejson.JSONDecoder()
+        self.size = size
+        self.buffer = ''
+        # position in buffer
+        self.pos = 0
+        self.eof = False
+        # number of chars and newlines before buffer, offset of last newline before buffer
+        self.offset = 0
+        self.newlines = 0
+        self.lastnewline = -1
+        # number of bytes read; file-position of last decoded block (for charset errors)
+        self.bytesread = 0
+        self.blockoffset = 0
+
+    def close(self):
+        self.filehandler.close()
+
+    def _read(self, size):
+        """remove the decoded part of buffer; read and decode next block."""
+        if self.pos:
+            self.newlines += self.buffer.count('\n', 0, self.pos)
+            index = self.buffer.rfind('\n', 0, self.pos)
+            if index >= 0:
+                self.lastnewline = self.offset + index
+            self.offset += self.pos
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        data = self.filehandler.read(size)
+        # bytes of an incomplete char of previous block are decoded with this block
+        self.blockoffset = self.bytesread - len(self.decoder.getstate()[0])
+        self.bytesread += len(data)
+        self.eof = not data
+        # as codecs reader: incomplete char at end of file is ignored
+        self.buffer += self.decoder.decode(data)
+
+    def nextchar(self):
+        """skip whitespace; return next char (is not consumed); '' at end of file."""
+        while True:
+            self.pos = self.whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return ''
+            self._read(self.size)
+
+    def value(self):
+        """decode next json value."""
+        self.nextchar()
+        size = self.size
+        while True:
+            try:
+                value, end = self.jsondecoder.raw_decode(self.buffer, self.pos)
+            except simplejson.JSONDecodeError as exc:
+                if self.eof or not (
+                        exc.msg.startswith('Unterminated string') or self.cutoff.match(self.buffer, exc.pos)
+                ):
+                    # error is not caused by end of buffer: no need to read the rest of the file
+                    msg, pos = exc.msg, exc.pos
+                    break
+            else:
+                # a number at end of buffer might continue in next block (eg '1.5e' of '1.5e-07')
+                if self.eof or not self.cutoff.match(self.buffer, end):
+                    self.pos = end
+                    return value
+            # value is not complete: read more; larger blocks for large values
+            self._read(size)
+            size *= 2
+        self.error(msg, pos)
+
+    def error(self, msg, pos):
+        """raise error as json.loads does, for position pos in buffer."""
+        index = self.buffer.rfind('\n', 0, pos)
+        raise InMessageError(
+            '%(msg)s: line %(line)s column %(column)s (char %(char)s)',
+            {
+                'msg': msg,
+                'line': self.newlines + self.buffer.count('\n', 0, pos) + 1,
+                'column': pos - index if index >= 0 else self.offset + pos - self.lastnewline,
+                'char': self.offset + pos,
+            },
+        )
+
+
 class json(Inmessage):
     def initfromfile(self):
         self.messagegrammarread(typeofgrammarfile='grammars')
         name_root_dict_according_to_grammar = self._getrootid()
+        if self.ta_info.get('streaming') and not callable(self.ta_info['preprocess_nodes']) \
+                and self.defmessage.nextmessage2 is None and self.defmessage.nextmessageblock is None \
+                and not self.ta_info.get('pass_all', False):
+            # streaming translation: a list of messages is read and converted message by message in nextmessage
+            self._jsonreader = JsonReader(
+                self.ta_info['filename'], self.ta_info['charset'], self.ta_info['checkcharsetin'])
+            try:
+                self._jsonoption = self._streamingoption(name_root_dict_according_to_grammar)
+            except UnicodeError:
+                # no streaming; charset error is reported when reading the whole file
+                self._jsonoption = 0
+            except BaseException:
+                self._jsonreader.close()
+                raise
+            if self._jsonoption:
+                self.streaming = True
+                self.root = node.Node()
+                return
+            self._jsonreader.close()
+            del self._jsonreader
         self._readcontent_edifile()
         jsonobject = simplejson.loads(self.rawinput)
         del self.rawinput
@@ -2711,6 +3458,137 @@ class json(Inmessage):
                 self.ta_info.update(child.queries)
                 break
 
+    def _streamingoption(self, name):
+        """
+        streaming translation: check if json file starts with a list of messages, returns option (see initfromfile):
+        [ -> 1 or 2 (is determined by first message); {"rootdict": [ -> 4; else 0 (no streaming).
+        """
+        reader = self._jsonreader
+        char = reader.nextchar()
+        if char == '[':
+            reader.pos += 1
+            return 1
+        if char != '{':
+            return 0
+        reader.pos += 1
+        if reader.nextchar() != '"':
+            return 0
+        try:
+            key = reader.value()
+        except InMessageError:
+            return 0
+        if key != name or reader.nextchar() != ':':
+            return 0
+        reader.pos += 1
+        if reader.nextchar() != '[':
+            return 0
+        reader.pos += 1
+        return 4
+
+    def _streamingmessages(self, name):
+        """generator: reads the json list of messages message by message; yields each message as node."""
+        reader = self._jsonreader
+        option = self._jsonoption
+        named = None
+        if reader.nextchar() == ']':
+            reader.pos += 1
+        else:
+            while True:
+                jsonobject = reader.value()
+                if option == 4:
+                    # 4. list of messages, named: {rootdict:[{,,,},{,,,},]}
+                    _is_repeating, lijst = self._dojsonlist([jsonobject], name)
+                    yield from lijst
+                else:
+                    if not isinstance(jsonobject, dict):
+                        raise InMessageError(_(
+                            '[J56]: content of json not OK.'
+                            ' Content is expected to be a list of objects,'
+                            ' but is list of something else.'))
+                    if named is None:
+                        # option 1 or 2 is determined by first message
+                        named = len(jsonobject) == 1 and name in jsonobject
+                    if named:
+                        # 1.List of messages, named: [{rootdict:{,,,}},{rootdict:{,,,}},]
+                        yield self._dojsonobject(jsonobject[name], name)
+                    else:
+                        # 2. List of messages, name via grammar: [{,,,},{,,,},].
+                        newnode = self._dojsonobject(jsonobject, name)
+                        if newnode:
+                            yield newnode
+                char = reader.nextchar()
+                reader.pos += 1
+                if char == ']':
+                    break
+                if char != ',':
+                    reader.error("Expecting ',' delimiter", reader.pos - 1)
+        if option == 4:
+            char = reader.nextchar()
+            if char == ',':
+                raise InMessageError(_(
+                    '[J57]: content of json not OK. Streaming translation: object with list of messages'
+                    ' "%(name)s" has other keys.'), {'name': name})
+            if char != '}':
+                reader.error("Expecting ',' delimiter", reader.pos)
+            reader.pos += 1
+        if reader.nextchar():
+            reader.error('Extra data', reader.pos)
+
+    def _nextmessage_streaming(self):
+        """
+        Streaming translation of a json list of messages: the json file is read in blocks;
+        each root record is converted to a node, checked and its messages are passed to the mapping script
+        (messages are split up as in nextmessage).
+        After errors no more messages are passed, but reading goes on to report all errors.
+        """
+        count = 0
+        message_number = 0
+        try:
+            for root_node in self._streamingmessages(self._getrootid()):
+                count += 1
+                if self.ta_info['has_structure']:
+                    self._checkonemessage(root_node, self.defmessage, False)
+                if count == 1:
+                    self.ta_info.update(root_node.queries)
+                if self.errorlist:
+                    continue
+                if self.defmessage.nextmessage is not None:
+                    # nextmessage defined in grammar: split up messages
+                    root_node.processqueries({}, len(self.defmessage.nextmessage) - 1)
+                    for eachmessage in root_node.getloop_including_mpath(*self.defmessage.nextmessage):
+                        # eachmessage is a list: [mpath,mpath, etc, node]
+                        message_number += 1
+                        yield self._streamingmessage(eachmessage[-1], message_number, eachmessage[:-1])
+                else:
+                    message_number += 1
+                    yield self._streamingmessage(root_node, message_number)
+            if self.ta_info['has_structure']:
+                self._checkcountroot(count, self.defmessage)
+        except UnicodeError as exc:
+            self.errorlist.append(_unicodeerrortxt(exc, self._jsonreader.blockoffset))
+            self.errorfatal = True
+        except Exception:
+            # as in parse_edi_file: these are 'fatal errors'
+            txt = txtexc()
+            if not botsglobal.ini.getboolean('settings', 'debug', False):
+                txt = txt.partition(': ')[2]
+            self.errorlist.append(txt)
+            self.errorfatal = True
+        finally:
+            self._jsonreader.close()
+        self.checkforerrorlist()
+
+    def _streamingmessage(self, message_node, message_number, envelope_content=None):
+        """streaming translation: make message object to pass to the mapping script."""
+        ta_info = self.ta_info.copy()
+        ta_info.update(message_node.queries)
+        # number of messages is not known before the whole json file is read
+        ta_info['total_number_of_messages'] = 0
+        ta_info['message_number'] = message_number
+        # give mappingscript access to envelope
+        ta_info['bots_accessenvelope'] = self.root
+        return self._initmessagefromnode(message_node, ta_info, self.syntax, envelope_content)
+
     def _getrootid(self):
         return self.defmessage.structure[0][ID]
 
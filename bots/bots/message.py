@@ -3,28 +3,43 @@ Bots message lib
 """
 # pylint: disable=missing-function-docstring
 
+import collections
+import copy
+from typing import ClassVar
+
 # bots-modules
 from . import botsglobal
 # from . import grammar
 from . import node
 from .botsconfig import (
-    BOTSIDNR,
     ID,
     MPATH,
     MANDATORY,
     MAXREPEAT,
     SUBFIELDS,
     FIELDS,
+    FIELDINDEX,
     SFIELD,
     VALUE,
     MIN,
     MAX,
     ISFIELD,
     LEVEL,
+    LEVELINDEX,
+    NEXTMANDATORY,
 )
 from .botslib import gettext as _
 from .exceptions import MappingFormatError, MappingRootError, MessageError, MessageRootError
 
+# number of checks (checkmessage) with validation_sample, per message class, messagetype and partners.
+_validationcounts = collections.Counter()
+
+
+def _unchanged(message, value, structure_record, node_instance):
+    """compiled formatter (see Message._compileformatfield): value is not changed."""
+    # pylint: disable=unused-argument
+    return value
+
 
 class Message:
     """
@@ -33,6 +48,11 @@ class Message:
     """
     # pylint: disable=too-many-instance-attributes
 
+    # parameters of ta_info used by _compileformatfield; compiled formatters are kept for each value of these.
+    formatparameters = ()
+    # validation profile (syntax parameter 'validation') -> depth of check (see _validationdepth).
+    validationdepths: ClassVar[dict] = {'full': 'full', 'structure': 'structure', 'nooutput': 'full'}
+
     def __init__(self, ta_info):
         self.ta_info = ta_info  # here ta_info is only filled with parameters from db-ta
         self.errorlist = []  # collect non-fatal errors in the edi file; used in reporting errors.
@@ -42,6 +62,10 @@ class Message:
         self.root = None  # Add lwx 20190917
         self.defmessage = None
         self.syntax = {}
+        # compiled formatters of grammar for message being checked; see _formattable, _formatter.
+        self._formatters = {}
+        # depth of check for message being checked: 'full', 'structure' or 'none'; see _validationdepth.
+        self.validation = 'full'
 
     def add2errorlist(self, errortxt):
         """Handle non-fatal parse errors"""
@@ -71,6 +95,21 @@ class Message:
         method is specified in subclasses.
         """
 
+    def cowcopy(self):
+        """
+        copy of message for chained translations (out_as_inn): as deepcopy, but
+        - node tree is copy-on-write (node.CowNode): records and children are shared until changed.
+          self.root is also replaced by a copy-on-write copy: the original tree is not changed anymore.
+        - grammar (defmessage) is shared; grammars are not changed.
+        """
+        root = self.root
+        # memo: deepcopy uses these objects as they are (root is set below)
+        new = copy.deepcopy(self, {id(root): None, id(self.defmessage): self.defmessage})
+        if root is not None:
+            new.root = root.cowcopy()
+            self.root = root.cowcopy()
+        return new
+
     @staticmethod
     def display(lex_records):
         """for debugging: display lexed records."""
@@ -110,9 +149,13 @@ class Message:
         - csv nobotsid: each child is a record. Check all records in one check
         - xml, json:
         root.record filled, root.children filled: outgoing messages.
+
+        Depth of the check is set by the validation profile (see _validationdepth);
+        records are always sorted and fields converted, as needed for writing.
         """
         if not self.ta_info['has_structure']:
             return
+        self.validation = self._validationdepth()
         if node_instance.record:
             # root record contains information; so one message
             count = 1
@@ -122,6 +165,50 @@ class Message:
             for childnode in node_instance.children:
                 count += 1
                 self._checkonemessage(childnode, defmessage, subtranslation)
+        self._checkcountroot(count, defmessage)
+
+    def _validationdepth(self):
+        """
+        Depth of check, from validation profile (syntax parameter 'validation', can be set in grammar,
+        partner syntax, translation or mapping script):
+        - 'full': everything is checked.
+        - 'structure': format of fields (length, dates, times, decimals) is not checked.
+        - 'none': nothing is checked; records and fields not in grammar are dropped without error.
+        Profile 'nooutput' is full for incoming and none for outgoing messages.
+        With syntax parameter 'validation_sample' (n) every nth check (1st, n+1th, etc)
+        of message class, messagetype and partners is full.
+        """
+        validation = self.ta_info.get('validation') or 'full'
+        try:
+            depth = self.validationdepths[validation]
+        except KeyError as exc:
+            raise MessageError(
+                _('Unknown validation "%(validation)s"; use "full", "structure" or "nooutput".'),
+                {'validation': validation},
+            ) from exc
+        try:
+            sample = int(self.ta_info.get('validation_sample') or 0)
+        except (TypeError, ValueError) as exc:
+            raise MessageError(
+                _('Validation sample "%(sample)s" is not a number.'),
+                {'sample': self.ta_info.get('validation_sample')},
+            ) from exc
+        if depth != 'full' and sample > 0:
+            key = (
+                self.__class__,
+                self.ta_info.get('messagetype'),
+                self.ta_info.get('frompartner'),
+                self.ta_info.get('topartner'),
+            )
+            if _validationcounts[key] % sample == 0:
+                depth = 'full'
+            _validationcounts[key] += 1
+        return depth
+
+    def _checkcountroot(self, count, defmessage):
+        """check number of root records (messages) against grammar."""
+        if self.validation == 'none':
+            return
         if count < defmessage.structure[0][MIN]:
             self.add2errorlist(
                 _(
@@ -156,6 +243,7 @@ class Message:
                 },
             )
         self._checkifrecordsingrammar(node_instance, structure[0], defmessage.grammarname)
+        self._formatters = self._formattable(defmessage)
         self._canonicaltree(node_instance, structure[0])
         # should the content of the message (the records read) be logged.
         if not subtranslation and botsglobal.ini.getboolean('settings', 'readrecorddebug', False):
@@ -172,7 +260,7 @@ class Message:
             return
         if node_instance.children and LEVEL not in structure:
             # record has children, but these are not in the grammar
-            if self.ta_info['checkunknownentities']:
+            if self.ta_info['checkunknownentities'] and self.validation != 'none':
                 self.add2errorlist(
                     _(
                         '[S01]%(linpos)s: Record "%(record)s" in message has children,'
@@ -200,7 +288,7 @@ class Message:
                     break
             else:
                 # record/childnode is not in grammar
-                if self.ta_info['checkunknownentities']:
+                if self.ta_info['checkunknownentities'] and self.validation != 'none':
                     self.add2errorlist(
                         _('[S02]%(linpos)s: Unknown record "%(record)s" in message.\n')
                         % {'linpos': node_instance.linpos(), 'record': childnode.record['BOTSID']}
@@ -215,11 +303,22 @@ class Message:
         for inmessage of type (var,fixed,??) this is not needed
         """
         # pylint: disable=too-many-branches, too-many-nested-blocks
+        noderecord = node_instance.record
+        # fields of record_definition: fields, subfields of non-repeating composites, repeating composites
+        fieldindex = record_definition.get(FIELDINDEX)
+        if isinstance(noderecord, node.Record) and noderecord.index is fieldindex:
+            # compact record: fields in slots are in grammar; check other fields
+            fields = list(noderecord.extra or ())
+        else:
+            fields = list(noderecord.keys())
         # check every field in the record
-        for field in list(node_instance.record.keys()):
+        for field in fields:
             if field == 'BOTSIDnr':
                 # BOTSIDnr is not in grammar, so skip check
                 continue
+            # SPEED: lookup in fieldindex of grammar instead of scan of fields
+            if fieldindex is not None and field in fieldindex:
+                continue
             for field_definition in record_definition[FIELDS]:
                 if field_definition[ISFIELD]:
                     # field (no composite)
@@ -248,7 +347,7 @@ class Message:
                         break
             else:
                 # field not found in grammar
-                if self.ta_info['checkunknownentities']:
+                if self.ta_info['checkunknownentities'] and self.validation != 'none':
                     self.add2errorlist(
                         _('[F01]%(linpos)s: Record: "%(mpath)s" has unknown field "%(field)s".\n')
                         % {
@@ -257,7 +356,7 @@ class Message:
                             'mpath': self.mpathformat(record_definition[MPATH]),
                         }
                     )
-                del node_instance.record[field]
+                del node_instance.writablerecord()[field]
 
     def _formatfield(self, value, field_definition, structure_record, node_instance):
         """
@@ -266,80 +365,191 @@ class Message:
         Output: the formatted value (string)
         Parameters of self.ta_info are used: triad, decimaal
         for fixed field: same handling; length is not checked.
+        The format is compiled for each call (with current self.ta_info);
+        checkmessage uses the compiled formatters of the grammar (see _formatter).
+        """
+        return self._compileformatfield(field_definition)(self, value, structure_record, node_instance)
+
+    def _compileformatfield(self, field_definition):
+        """
+        Compile the format of field_definition to function(message, value, structure_record, node_instance)
+        that checks and converts the value (as _formatfield).
+        Field definition and self.ta_info (see formatparameters) are interpreted once, not for each value.
+        Format is only checked for validation 'full' (self.validation); values are always converted.
+        Here: value is not changed.
         """
         # pylint: disable=unused-argument
-        return value
+        return _unchanged
+
+    def _formattable(self, defmessage):
+        """
+        Compiled formatters (id of field/record definition -> (definition, function(s))) for this message class,
+        the formatparameters in self.ta_info and check of format (validation). Kept in the grammar (defmessage),
+        so are shared by all messages using the grammar; grammars not read via grammar.grammarread have no table:
+        compiled for this message only.
+        """
+        formattables = getattr(defmessage, 'formattables', None)
+        if formattables is None:
+            return {}
+        key = (self.__class__, self.validation == 'full') + tuple(
+            self.ta_info.get(parameter) for parameter in self.formatparameters
+        )
+        return formattables.setdefault(key, {})
+
+    def _formatter(self, field_definition):
+        """
+        Compiled formatter for field_definition: function(message, value, structure_record, node_instance).
+        Compiled when first used. If _formatfield is subclassed (eg in user plugin) it is called instead.
+        """
+        try:
+            return self._formatters[id(field_definition)][1]
+        except KeyError:
+            pass
+        for cls in self.__class__.__mro__:
+            if '_compileformatfield' in vars(cls):
+                formatter = self._compileformatfield(field_definition)
+                break
+            if '_formatfield' in vars(cls):
+
+                def formatter(message, value, structure_record, node_instance):
+                    # pylint: disable=protected-access
+                    return message._formatfield(value, field_definition, structure_record, node_instance)
+
+                break
+        # field_definition is kept in table: its id is not reused
+        self._formatters[id(field_definition)] = (field_definition, formatter)
+        return formatter
+
+    def _recordformatters(self, record_definition):
+        """Compiled formatters for the (sub)fields of record_definition: dict (field ID -> function)."""
+        try:
+            return self._formatters[id(record_definition)][1]
+        except KeyError:
+            pass
+        formatters = {}
+        for field_definition in record_definition[FIELDS]:
+            if field_definition[ISFIELD]:
+                formatters[field_definition[ID]] = self._formatter(field_definition)
+            else:
+                for grammarsubfield in field_definition[SUBFIELDS]:
+                    formatters[grammarsubfield[ID]] = self._formatter(grammarsubfield)
+        self._formatters[id(record_definition)] = (record_definition, formatters)
+        return formatters
 
     def _canonicaltree(self, node_instance, structure):
         """
         For nodes: check min and max occurence;
         sort the records conform grammar
         """
-        sortednodelist = []
+        # fields are changed in place (copy-on-write nodes: record is copied first)
+        node_instance.writablerecord()
         # handle fields of this record
         self._canonicalfields(node_instance, structure)
         if node_instance.structure is None:
             node_instance.structure = structure
         if LEVEL in structure:
-            # for every record_definition (in grammar) of this level
-            for record_definition in structure[LEVEL]:
-                # count number of occurences of record
-                count = 0
-                # for every node in mpathtree; SPEED: delete nodes from list when found
-                for childnode in node_instance.children:
-                    # if it is not the right NODE":
-                    if childnode.record['BOTSID'] != record_definition[ID] \
-                            or childnode.record['BOTSIDnr'] != record_definition[BOTSIDNR]:
-                        continue
-                    count += 1
+            level = structure[LEVEL]
+            # SPEED: children per record_definition (index in level) via lookup table of grammar;
+            # each child is looked at once. Children not in grammar are dropped.
+            levelindex = structure[LEVELINDEX]
+            buckets = {}
+            for childnode in node_instance.children:
+                childrecord = childnode.record
+                index = levelindex.get((childrecord['BOTSID'], childrecord.get('BOTSIDnr')))
+                if index is None:
+                    continue
+                if index in buckets:
+                    buckets[index].append(childnode)
+                else:
+                    buckets[index] = [childnode]
+            sortednodelist = []
+            # first mandatory record_definition of level (NEXTMANDATORY: first mandatory one after a record)
+            mandatory = 0 if not level or level[0][MIN] else level[0][NEXTMANDATORY]
+            # record_definitions that occur, in order of grammar
+            for index in sorted(buckets):
+                # mandatory record_definitions before this one do not occur
+                while mandatory < index:
+                    self._checkcount(node_instance, level[mandatory], 0)
+                    mandatory = level[mandatory][NEXTMANDATORY]
+                record_definition = level[index]
+                if mandatory == index:
+                    mandatory = record_definition[NEXTMANDATORY]
+                childnodes = buckets[index]
+                for childnode in childnodes:
                     # use rest of index in deeper level
                     self._canonicaltree(childnode, record_definition)
-                    sortednodelist.append(childnode)
-                if record_definition[MIN] > count:
-                    self.add2errorlist(
-                        _(
-                            '[S03]%(linpos)s: Record "%(mpath)s" occurs %(count)d times,'
-                            ' min is %(mincount)d.\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'mpath': self.mpathformat(record_definition[MPATH]),
-                            'count': count,
-                            'mincount': record_definition[MIN],
-                        }
-                    )
-                if record_definition[MAX] < count:
-                    self.add2errorlist(
-                        _(
-                            '[S04]%(linpos)s: Record "%(mpath)s" occurs %(count)d times,'
-                            ' max is %(maxcount)d.\n'
-                        )
-                        % {
-                            'linpos': node_instance.linpos(),
-                            'mpath': self.mpathformat(record_definition[MPATH]),
-                            'count': count,
-                            'maxcount': record_definition[MAX],
-                        }
-                    )
+                sortednodelist.extend(childnodes)
+                self._checkcount(node_instance, record_definition, len(childnodes))
+            while mandatory < len(level):
+                self._checkcount(node_instance, level[mandatory], 0)
+                mandatory = level[mandatory][NEXTMANDATORY]
             node_instance.children = sortednodelist
 
+    def _checkcount(self, node_instance, record_definition, count):
+        """check number of occurences of record (count) against grammar."""
+        if self.validation == 'none':
+            return
+        if record_definition[MIN] > count:
+            self.add2errorlist(
+                _(
+                    '[S03]%(linpos)s: Record "%(mpath)s" occurs %(count)d times,'
+                    ' min is %(mincount)d.\n'
+                )
+                % {
+                    'linpos': node_instance.linpos(),
+                    'mpath': self.mpathformat(record_definition[MPATH]),
+                    'count': count,
+                    'mincount': record_definition[MIN],
+                }
+            )
+        if record_definition[MAX] < count:
+            self.add2errorlist(
+                _(
+                    '[S04]%(linpos)s: Record "%(mpath)s" occurs %(count)d times,'
+                    ' max is %(maxcount)d.\n'
+                )
+                % {
+                    'linpos': node_instance.linpos(),
+                    'mpath': self.mpathformat(record_definition[MPATH]),
+                    'count': count,
+                    'maxcount': record_definition[MAX],
+                }
+            )
+
     def _canonicalfields(self, node_instance, record_definition):
         """
         For all fields: check M/C, format.
         Fields are not sorted (a dict can not be sorted).
         Fields are never added.
         """
-        # pylint: disable=too-many-branches, too-many-nested-blocks, too-many-statements
+        # pylint: disable=too-many-branches, too-many-nested-blocks, too-many-statements, too-many-locals
         noderecord = node_instance.record
+        # validation 'none': mandatory (sub)fields and repeats are not checked
+        check = self.validation != 'none'
+        # compiled formatters of (sub)fields
+        formatters = self._recordformatters(record_definition)
+        # compact record (node.Record) for this record_definition: use slots for (sub)fields
+        if isinstance(noderecord, node.Record) and noderecord.index is record_definition.get(FIELDINDEX):
+            slots = noderecord.slots
+            size = len(slots)
+        else:
+            slots = None
+        # position of field in slots (BOTSIDnr is first); fields in slots are in order of grammar
+        position = 1
         # loop over fields in grammar
         for field_definition in record_definition[FIELDS]:
+            slot = position
+            position += 1
             if field_definition[ISFIELD]:
                 # field (no composite)
                 if field_definition[MAXREPEAT] == 1:
                     # non-repeating
-                    value = noderecord.get(field_definition[ID])
+                    if slots is None:
+                        value = noderecord.get(field_definition[ID])
+                    else:
+                        value = slots[slot] if slot < size else None
                     if not value:
-                        if field_definition[MANDATORY]:
+                        if check and field_definition[MANDATORY]:
                             self.add2errorlist(
                                 _(
                                     '[F02]%(linpos)s: Record "%(mpath)s" field "%(field)s"'
@@ -352,9 +562,11 @@ class Message:
                                 }
                             )
                         continue
-                    noderecord[field_definition[ID]] = self._formatfield(
-                        value, field_definition, record_definition, node_instance
-                    )
+                    value = formatters[field_definition[ID]](self, value, record_definition, node_instance)
+                    if slots is None:
+                        noderecord[field_definition[ID]] = value
+                    else:
+                        slots[slot] = value
                 else:
                     # repeating field;
                     # a list of values; values can be empty or None;
@@ -362,7 +574,7 @@ class Message:
                     valuelist = noderecord.get(field_definition[ID])
                     if valuelist is None:
                         # empty lists are already catched in node.put()
-                        if field_definition[MANDATORY]:
+                        if check and field_definition[MANDATORY]:
                             self.add2errorlist(
                                 _(
                                     '[F41]%(linpos)s: Record "%(mpath)s" repeating field'
@@ -380,7 +592,7 @@ class Message:
                             _('Repeating field: must be a list: put(%(mpath)s)'),
                             {'mpath': valuelist},
                         )
-                    if len(valuelist) > field_definition[MAXREPEAT]:
+                    if check and len(valuelist) > field_definition[MAXREPEAT]:
                         self.add2errorlist(
                             _(
                                 '[F42]%(linpos)s: Record "%(mpath)s" repeating field "%(field)s"'
@@ -403,13 +615,9 @@ class Message:
                             value = str(value).strip()
                             if value:
                                 repeating_field_has_data = True
-                        newlist.append(
-                            self._formatfield(
-                                value, field_definition, record_definition, node_instance
-                            )
-                        )
+                        newlist.append(formatters[field_definition[ID]](self, value, record_definition, node_instance))
                     if not repeating_field_has_data:
-                        if field_definition[MANDATORY]:
+                        if check and field_definition[MANDATORY]:
                             self.add2errorlist(
                                 _(
                                     '[F43]%(linpos)s: Record "%(mpath)s" repeating field'
@@ -428,14 +636,18 @@ class Message:
                 # composite
                 if field_definition[MAXREPEAT] == 1:
                     # non-repeating compostie
+                    # each subfield has a position in slots
+                    position += len(field_definition[SUBFIELDS]) - 1
                     # first check if there is any data att all in this composite
-                    for grammarsubfield in field_definition[SUBFIELDS]:
-                        if noderecord.get(grammarsubfield[ID]):
-                            # composite has data.
-                            break
+                    if slots is None:
+                        has_data = any(
+                            noderecord.get(grammarsubfield[ID]) for grammarsubfield in field_definition[SUBFIELDS]
+                        )
                     else:
+                        has_data = any(slots[slot:position])
+                    if not has_data:
                         # composite has no data
-                        if field_definition[MANDATORY]:
+                        if check and field_definition[MANDATORY]:
                             self.add2errorlist(
                                 _(
                                     '[F03]%(linpos)s: Record "%(mpath)s" composite "%(field)s"'
@@ -451,10 +663,13 @@ class Message:
                         continue
                     # there is data in the composite!
                     # loop subfields
-                    for grammarsubfield in field_definition[SUBFIELDS]:
-                        value = noderecord.get(grammarsubfield[ID])
+                    for subslot, grammarsubfield in enumerate(field_definition[SUBFIELDS], start=slot):
+                        if slots is None:
+                            value = noderecord.get(grammarsubfield[ID])
+                        else:
+                            value = slots[subslot] if subslot < size else None
                         if not value:
-                            if grammarsubfield[MANDATORY]:
+                            if check and grammarsubfield[MANDATORY]:
                                 self.add2errorlist(
                                     _(
                                         '[F04]%(linpos)s: Record "%(mpath)s" subfield "%(field)s"'
@@ -467,14 +682,16 @@ class Message:
                                     }
                                 )
                             continue
-                        noderecord[grammarsubfield[ID]] = self._formatfield(
-                            value, grammarsubfield, record_definition, node_instance
-                        )
+                        value = formatters[grammarsubfield[ID]](self, value, record_definition, node_instance)
+                        if slots is None:
+                            noderecord[grammarsubfield[ID]] = value
+                        else:
+                            slots[subslot] = value
                 else:  # if repeating composite: list of dicts
                     valuelist = noderecord.get(field_definition[ID])
                     # empty lists are catched in node.put()
                     if valuelist is None:
-                        if field_definition[MANDATORY]:
+                        if check and field_definition[MANDATORY]:
                             self.add2errorlist(
                                 _(
                                     '[F44]%(linpos)s: Record "%(mpath)s" repeating composite'
@@ -492,7 +709,7 @@ class Message:
                             _('Repeating composite: must be a list: put(%(mpath)s)'),
                             {'mpath': valuelist},
                         )
-                    if len(valuelist) > field_definition[MAXREPEAT]:
+                    if check and len(valuelist) > field_definition[MAXREPEAT]:
                         self.add2errorlist(
                             _(
                                 '[F45]%(linpos)s: Record "%(mpath)s" repeating composite'
@@ -546,7 +763,7 @@ class Message:
                             for grammarsubfield in field_definition[SUBFIELDS]:
                                 value = comp.get(grammarsubfield[ID])
                                 if not value:
-                                    if grammarsubfield[MANDATORY]:
+                                    if check and grammarsubfield[MANDATORY]:
                                         self.add2errorlist(
                                             _(
                                                 '[F46]%(linpos)s: Record "%(mpath)s" subfield'
@@ -560,14 +777,14 @@ class Message:
                                             }
                                         )
                                     continue
-                                comp[grammarsubfield[ID]] = self._formatfield(
-                                    value, grammarsubfield, record_definition, node_instance
+                                comp[grammarsubfield[ID]] = formatters[grammarsubfield[ID]](
+                                    self, value, record_definition, node_instance
                                 )
                         else:
                             comp = {}
                         newlist.append(comp)
                     if not repeating_composite_has_data:
-                        if field_definition[MANDATORY]:
+                        if check and field_definition[MANDATORY]:
                             self.add2errorlist(
                                 _(
                                     '[F47]%(linpos)s: Record "%(mpath)s" repeating composite'
@@ -600,6 +817,10 @@ class Message:
     # ***************************************************************************
     # * methods below pass call to node.Node ************************************
     # ***************************************************************************
+    def compile_mpath(self, *mpaths):
+        """compile mpath for get, getloop, put, putloop (see node.Mpath)."""
+        return self.root.compile_mpath(*mpaths)
+
     def getrecord(self, *mpaths):
         if self.root.record is None:
             raise MappingRootError(
@@ -752,7 +973,7 @@ class Message:
             )
         return self.root.putloop(*mpaths)
 
-    def sort(self, *mpaths):
+    def sort(self, *mpaths, **kwargs):
         if self.root.record is None:
             raise MappingRootError(
                 _(
@@ -761,4 +982,15 @@ class Message:
                 ),
                 {'mpath': mpaths},
             )
-        self.root.sort(*mpaths)
+        self.root.sort(*mpaths, **kwargs)
+
+    def group_by(self, *mpaths, **kwargs):
+        """group nodes of getloop(*mpaths) by value of compare (see node.Node.group_by)."""
+        if self.root.record:
+            return self.root.group_by(*mpaths, **kwargs)
+        # self.root is dummy root
+        groups = {}
+        for childnode in self.root.children:
+            for key, nodes in childnode.group_by(*mpaths, **kwargs).items():
+                groups.setdefault(key, []).extend(nodes)
+        return groups
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:52
+
+from django.db import migrations, models
+
+import bots.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bots', '0003_merge'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='translate',
+            name='rsrv1',
+            field=bots.models.StripCharField(blank=True, choices=[('full', 'Full'), ('structure', 'Structure only (no format of fields)'), ('nooutput', 'None for outgoing message')], help_text='Check of outgoing message against grammar. Overrules "validation" in grammar and partner syntax (default: full).', max_length=35, null=True, verbose_name='Validation'),
+        ),
+        migrations.AlterField(
+            model_name='translate',
+            name='rsrv2',
+            field=models.IntegerField(blank=True, help_text='If validation is not full: still check every nth outgoing message full. Overrules "validation_sample" in grammar and partner syntax.', null=True, verbose_name='Validation sample'),
+        ),
+    ]
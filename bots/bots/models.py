@@ -153,6 +153,11 @@ TRANSLATETYPES = (
     (2, _('Pass-through')),
     (3, _('Parse & Pass-through')),
 )
+VALIDATION = (
+    ('full', _('Full')),
+    ('structure', _('Structure only (no format of fields)')),
+    ('nooutput', _('None for outgoing message')),
+)
 CONFIRMTYPELIST = [DEFAULT_ENTRY] + CONFIRMTYPE
 EDITYPESLIST = [DEFAULT_ENTRY] + EDITYPES
 
@@ -942,8 +947,26 @@ class translate(models.Model):
     )
     tomessagetype = StripCharField(max_length=35, help_text=_('Messagetype to translate to.'))
     desc = models.TextField(max_length=256, null=True, blank=True, verbose_name=_('Description'))
-    rsrv1 = StripCharField(max_length=35, blank=True, null=True)  # added 20100501
-    rsrv2 = models.IntegerField(null=True)  # added 20100501
+    rsrv1 = StripCharField(
+        max_length=35,
+        blank=True,
+        null=True,
+        choices=VALIDATION,
+        verbose_name=_('Validation'),
+        help_text=_(
+            'Check of outgoing message against grammar. '
+            'Overrules "validation" in grammar and partner syntax (default: full).'
+        ),
+    )  # added 20100501. 20261017: used as validation
+    rsrv2 = models.IntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_('Validation sample'),
+        help_text=_(
+            'If validation is not full: still check every nth outgoing message full. '
+            'Overrules "validation_sample" in grammar and partner syntax.'
+        ),
+    )  # added 20100501. 20261017: used as validation_sample
 
     @property
     def mappingscript(self) -> str:
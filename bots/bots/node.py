@@ -3,6 +3,7 @@ Bots node lib
 """
 # flake8: noqa:E501
 
+from collections.abc import MutableMapping
 import decimal
 
 # bots-modules
@@ -20,7 +21,14 @@ class Node:
     # slots: python optimalisation to preserve memory. Disadv.: no dynamic attr in this class
     # in tests: for normal translations less memory and faster;
     # no effect fo one-on-one translations.
-    __slots__ = ('record', 'children', '_queries', 'linpos_info', 'structure')
+    __slots__ = ('record', 'children', '_queries', 'linpos_info', 'structure', '_childindex')
+
+    # index of children is used for nodes with at least this number of children; 0: no index (default).
+    # set from bots.ini node_childindex. With an index, children and BOTSID/BOTSIDnr of their records
+    # should only be changed via Node methods or by assigning a new list to children (see _childrenfor).
+    childindex = 0
+    # incoming edi (not xml, json) is parsed to compact records (Record); set from bots.ini compact_records
+    compactrecords = False
 
     def __init__(self, record=None, linpos_info=None):
         if record:
@@ -31,6 +39,8 @@ class Node:
         self.linpos_info = linpos_info
         self._queries = None
         self.structure = None
+        # [children, len(children), {(BOTSID, BOTSIDnr): [childnode, ...]}]; built when needed
+        self._childindex = None
 
     def linpos(self) -> str:
         """Return formated self.linpos_info"""
@@ -44,6 +54,47 @@ class Node:
     def append(self, childnode):
         """append child to node"""
         self.children.append(childnode)
+        index = self._childindex
+        if index is not None:
+            if index[0] is self.children and index[1] == len(self.children) - 1:
+                index[1] += 1
+                index[2].setdefault(self._childkey(childnode), []).append(childnode)
+            else:
+                self._childindex = None
+
+    @staticmethod
+    def _childkey(childnode):
+        """key of child in index of children."""
+        if childnode.record is None:
+            return None
+        return childnode.record.get('BOTSID'), childnode.record.get('BOTSIDnr')
+
+    def _childrenfor(self, mpath):
+        """
+        children that can match mpath (same BOTSID and BOTSIDnr), in order of children.
+        for nodes with many children an index of children is used.
+        the index is built when needed; it is not valid anymore when children is changed
+        (other list or other number of children; in this class: by delete, sort).
+        not detected (index is opt-in for this reason): children replaced or reordered in place,
+        BOTSID or BOTSIDnr of a child record changed.
+        """
+        children = self.children
+        if not Node.childindex or len(children) < Node.childindex:
+            return children
+        key = (mpath.get('BOTSID'), mpath.get('BOTSIDnr'))
+        if None in key:
+            # eg no BOTSID in mpath (get_checklevel 0), get({'BOTSID': None})
+            return children
+        index = self._childindex
+        if index is None or index[0] is not children or index[1] != len(children):
+            index = self._childindex = [children, len(children), {}]
+            for childnode in children:
+                index[2].setdefault(self._childkey(childnode), []).append(childnode)
+        try:
+            return index[2].get(key, ())
+        except TypeError:
+            # value in mpath is not hashable (get_checklevel 0)
+            return children
 
     # ********************************************************
     # *** queries ********************************************
@@ -168,7 +219,7 @@ class Node:
             # replace values with values in 'change'; delete if None
             return self.record
         # go recursive
-        for childnode in self.children:
+        for childnode in self._childrenfor(mpaths[1]):
             terug = childnode._getrecordcore(mpaths[1:])
             if terug:
                 return terug
@@ -229,14 +280,15 @@ class Node:
         if len(where) == 1:
             # mpath is exhausted; so we are there!!!
             # replace values with values in 'change'; delete if None
+            record = self.writablerecord()
             for key, value in change.items():
                 if value is None:
-                    self.record.pop(key, 'nep')
+                    record.pop(key, 'nep')
                 else:
-                    self.record[key] = value
+                    record[key] = value
             return True
         # go recursive
-        for childnode in self.children:
+        for childnode in self._childrenfor(where[1]):
             if childnode._changecore(where[1:], change):
                 return True
         # no child has given a valid return
@@ -269,13 +321,17 @@ class Node:
             # mpath is exhausted; so we are there!!!
             # indicates node should be removed
             return 2
-        for i, childnode in enumerate(self.children):
+        for childnode in self._childrenfor(mpaths[1]):
             # search recursive for rest of mpaths
             terug = childnode._deletecore(mpaths[1:])
             if terug == 2:
                 # indicates node should be removed
                 # remove node
-                del self.children[i]
+                for i, node in enumerate(self.children):
+                    if node is childnode:
+                        del self.children[i]
+                        break
+                self._childindex = None
                 # this indicates: deleted successfull, do not remove anymore (no removal of parents)
                 return 1
             if terug:
@@ -290,7 +346,10 @@ class Node:
         function returns 1 value; return None if nothing found.
         if more than one value can be found: first one is returned
         starts searching in current node, then deeper
+        mpaths can be a compiled mpath (see compile_mpath).
         """
+        if len(mpaths) == 1 and isinstance(mpaths[0], Mpath):
+            return self._getcompiled(mpaths[0])
         if Node.checklevel:
             self._mpath_sanity_check(mpaths[:-1])
             # sanity check of last part of mpaths:
@@ -339,7 +398,7 @@ class Node:
                     # does not match/is not right node
                     return None
             # all items in mpath are matched and OK; recursuve search
-            for childnode in self.children:
+            for childnode in self._childrenfor(mpaths[1]):
                 # recursive search for rest of mpaths
                 terug = childnode._getcore(mpaths[1:])
                 if terug is not None:
@@ -365,6 +424,34 @@ class Node:
         # either the remembered value is returned or 1 (as a boolean, indicated 'found)
         return terug
 
+    def _getcompiled(self, query):
+        """get with compiled mpath: no checks of mpath (except once with grammar)."""
+        if Node.checklevel == 2 and query.checkedstructure is not self.structure:
+            self._mpath_grammar_check(query.mpaths)
+            query.checkedstructure = self.structure
+        terug = self._getcompiledcore(query, 0)
+        botsglobal.logmap.debug('"%(terug)s" for get%(mpaths)s', {"terug": terug, "mpaths": query})
+        return terug
+
+    def _getcompiledcore(self, query, level):
+        """recursive part of _getcompiled()"""
+        record = self.record
+        # values in matchers are strings; record.get() is None if field is not there
+        for key, value in query.matchers[level]:
+            if record.get(key) != value:
+                return None
+        if level == query.lastlevel:
+            if query.target is None:
+                return 1
+            if query.target not in record:
+                return None
+            return record[query.target][:]
+        for childnode in self._childrenfor(query.mpaths[level + 1]):
+            terug = childnode._getcompiledcore(query, level + 1)
+            if terug is not None:
+                return terug
+        return None
+
     def getcount(self):
         """count the number of nodes/records under the node/in whole tree"""
         count = 0
@@ -390,7 +477,10 @@ class Node:
         return str(count)
 
     def getloop(self, *mpaths):
-        """generator. Returns one by one the nodes as indicated in mpath"""
+        """generator. Returns one by one the nodes as indicated in mpath; mpaths can be a compiled mpath."""
+        if len(mpaths) == 1 and isinstance(mpaths[0], Mpath):
+            yield from self._getloopcompiled(mpaths[0])
+            return
         if Node.checklevel:
             self._mpath_sanity_check(mpaths)
         for part in mpaths:
@@ -414,10 +504,37 @@ class Node:
             # found!
             yield self
         else:
-            for childnode in self.children:
+            for childnode in self._childrenfor(mpaths[1]):
                 # search recursive for rest of mpaths
                 yield from childnode._getloopcore(mpaths[1:])
 
+    def _getloopcompiled(self, query):
+        """getloop with compiled mpath."""
+        if query.target is not None:
+            raise MappingFormatError(
+                _('"None" is not allowed in mpath for getloop: %(mpath)s'), {'mpath': query}
+            )
+        if Node.checklevel == 2 and query.checkedstructure is not self.structure:
+            self._mpath_grammar_check(query.mpaths)
+            query.checkedstructure = self.structure
+        for terug in self._getloopcompiledcore(query, 0):
+            botsglobal.logmap.debug(
+                'getloop %(mpaths)s returns "%(record)s".', {'mpaths': query, 'record': terug.record}
+            )
+            yield terug
+
+    def _getloopcompiledcore(self, query, level):
+        """recursive part of _getloopcompiled()"""
+        record = self.record
+        for key, value in query.matchers[level]:
+            if record.get(key) != value:
+                return
+        if level == query.lastlevel:
+            yield self
+        else:
+            for childnode in self._childrenfor(query.mpaths[level + 1]):
+                yield from childnode._getloopcompiledcore(query, level + 1)
+
     def getloop_including_mpath(self, *mpaths):
         """
         generator.
@@ -447,7 +564,7 @@ class Node:
             # found!
             yield [self]
         else:
-            for childnode in self.children:
+            for childnode in self._childrenfor(mpaths[1]):
                 # search recursive for rest of mpaths
                 for terug in childnode._getloopcore_including_mpath(mpaths[1:]):
                     yield [self.record] + terug if terug is not None else None
@@ -475,7 +592,11 @@ class Node:
         it aalwyas return a decimal 0.
         useful eg for when math calculations are needed in mapping.
         """
-        terug = self.get(*mpaths)
+        return self._todecimal(self.get(*mpaths))
+
+    @staticmethod
+    def _todecimal(terug):
+        """value (or None) of getdecimal as decimal."""
         if terug and terug[-1] == '-':
             # minus-sign at the end, put it in front.
             # This is useful for idocs, where fields are never defined as numeric.
@@ -487,9 +608,21 @@ class Node:
 
     def put(self, *mpaths, **kwargs) -> bool:
         """
-        Check mpaths then put value
+        Check mpaths then put value.
+        mpaths can be a compiled mpath (see compile_mpath); its values are put (stripped unless strip=False).
         """
         # pylint: disable=too-many-branches
+        if len(mpaths) == 1 and isinstance(mpaths[0], Mpath):
+            query = mpaths[0]
+            if query.target is not None:
+                botsglobal.logmap.debug('"None" in put %(mpaths)s.', {"mpaths": query})
+                return False
+            mpaths = query.copy(strip=kwargs.get('strip', True))
+            if not self._sameoccurence(mpaths[0]):
+                raise MappingRootError(_('Error in root put "%(mpath)s".'), {'mpath': mpaths[0]})
+            self._putcore(mpaths[1:])
+            botsglobal.logmap.debug('"True" for put %(mpaths)s', {"mpaths": query})
+            return True
         # sanity check of mpaths
         if not mpaths or not isinstance(mpaths, tuple):
             raise MappingFormatError(
@@ -543,7 +676,7 @@ class Node:
         if not mpaths:
             # newmpath is exhausted, stop searching.
             return
-        for childnode in self.children:
+        for childnode in self._childrenfor(mpaths[0]):
             # checking of BOTSID is also done in sameoccurance!->performance!
             if childnode.record['BOTSID'] == mpaths[0]['BOTSID'] \
                     and childnode._sameoccurence(mpaths[0]):
@@ -555,8 +688,19 @@ class Node:
 
     def putloop(self, *mpaths) -> "Node":
         """putloop
-        :param *mpaths:
+        :param *mpaths: mpath; can be a compiled mpath (see compile_mpath)
         """
+        if len(mpaths) == 1 and isinstance(mpaths[0], Mpath):
+            if mpaths[0].target is not None:
+                return False
+            mpaths = mpaths[0].copy(strip=True)
+            if self._sameoccurence(mpaths[0]):
+                if len(mpaths) == 1:
+                    return self
+                return self._putloopcore(mpaths[1:])
+            raise MappingRootError(
+                _('Error in root putloop "%(mpath)s".'), {'mpath': mpaths[0]}
+            )
         # sanity check of mpaths
         if not mpaths or not isinstance(mpaths, tuple):
             raise MappingFormatError(
@@ -593,7 +737,7 @@ class Node:
             # end of mpath reached; always make new child-node
             self.append(Node(mpaths[0]))
             return self.children[-1]
-        for childnode in self.children:
+        for childnode in self._childrenfor(mpaths[0]):
             # if first part of mpaths exists already in children go recursive
             # checking of BOTSID is also done in sameoccurance!->performance!
             if childnode.record['BOTSID'] == mpaths[0]['BOTSID'] \
@@ -612,7 +756,7 @@ class Node:
             if key in mpath and mpath[key] != value:
                 return False
         # all equal keys have same values, thus both are 'equal'.
-        self.record.update(mpath)
+        self.writablerecord().update(mpath)
         # add items to self.record that are new
         return True
 
@@ -631,11 +775,15 @@ class Node:
           also new functionality via **kwargs:
           - reverse - reverse sort as reverse in python's sort
           - sort_if_none: value to use in sorting if if comparekey is not there (eg 'AAAAAAA' is sorted first...).
-          - sort_decimal: numerical sort
+          - sort_decimal: numerical sort (value as getdecimal; sort_if_none is not used)
+          - compare can be a compiled mpath (Mpath), or a list of compare keys: first key is main key, etc;
+            reverse can be a list with a value for each compare key.
+          the compare keys are compiled once; for each node the keys are determined once. Sort is stable.
         """
-        # pylint: disable=too-many-branches
         # use explicit sortfrom, else mpaths[:-1]
         sortfrom = kwargs.get('sortfrom', mpaths[:-1])
+        if isinstance(sortfrom, dict):
+            sortfrom = (sortfrom,)
         # use explicit compare, else mpaths[-1:]
         comparekey = kwargs.get('compare', mpaths[-1:])
         reverse = kwargs.get('reverse', False)
@@ -644,52 +792,109 @@ class Node:
 
         if Node.checklevel:
             self._mpath_sanity_check(sortfrom)
-            # sanity check of last part of mpaths: None only allowed in last section of Mpath; check last part
-            if not isinstance(comparekey[-1], dict):
-                raise MappingFormatError(
-                    _('Must be dicts in tuple: get(%(mpath)s)'), {'mpath': mpaths}
-                )
-            if 'BOTSID' not in comparekey[-1]:
+        queries = self._comparequeries(comparekey)
+        if isinstance(reverse, (list, tuple)):
+            if len(reverse) != len(queries):
                 raise MappingFormatError(
-                    _('Last section without "BOTSID": get(%(mpath)s)'), {'mpath': mpaths}
-                )
-            count = 0
-            for key, value in comparekey[-1].items():
-                if not isinstance(key, str):
-                    raise MappingFormatError(
-                        _('Keys must be strings in last section: get(%(mpath)s)'), {'mpath': mpaths}
-                    )
-                if value is None:
-                    count += 1
-                elif not isinstance(value, str):
-                    raise MappingFormatError(
-                        _('Values must be strings (or none) in last section: get(%(mpath)s)'),
-                        {'mpath': mpaths},
-                    )
-            if count != 1:
-                raise MappingFormatError(
-                    _('Must be one and only one "None" in last section: get(%(mpath)s)'), {'mpath': mpaths}
+                    _('Sort: reverse must be one value for each compare key: %(reverse)s'), {'reverse': reverse}
                 )
+            if len(reverse) == 1:
+                # one compare key: key function returns a value, not a tuple
+                reverse = reverse[0]
         for part in sortfrom:
             part.setdefault('BOTSIDnr', '1')
-        for part in comparekey:
-            part.setdefault('BOTSIDnr', '1')
         if Node.checklevel == 2:
-            self._mpath_grammar_check(sortfrom + comparekey)
+            for query in queries:
+                self._mpath_grammar_check(tuple(sortfrom) + query.mpaths)
+        key = self._keyfunction(queries, sort_decimal, sort_if_none)
+        for n in self._getloopcore(sortfrom):
+            self._sortchildren(n.children, key, reverse)
+            n._childindex = None
 
-        remember_checklevel = Node.checklevel
-        # put this temp on zero....checks do not work.
-        Node.checklevel = 0
-        try:
-            for n in self.getloop(*sortfrom):
-                if sort_decimal:
-                    n.children.sort(
-                        key=lambda s: s.getdecimal(*comparekey) or sort_if_none, reverse=reverse)
-                else:
-                    n.children.sort(
-                        key=lambda s: s.get(*comparekey) or sort_if_none, reverse=reverse)
-        finally:
-            Node.checklevel = remember_checklevel
+    def group_by(self, *mpaths, **kwargs):
+        """
+        Group the nodes of getloop(*mpaths) by the value of compare (mpath from the node, as for sort).
+        Returns dict: value -> list of nodes, values in order of first occurence; nodes without value: None.
+        compare can be a list of mpaths; the value is a tuple of the values.
+        example: lines per delivery date:
+            inn.group_by({'BOTSID':'UNH'},{'BOTSID':'LIN'},
+                         compare=({'BOTSID':'LIN'},{'BOTSID':'DTM','C507.2005':'2','C507.2380':None}))
+        kwargs: compare (required), sort_decimal (group by numerical value).
+        """
+        if 'compare' not in kwargs:
+            raise MappingFormatError(_('group_by%(mpath)s: parameter compare is required.'), {'mpath': mpaths})
+        queries = self._comparequeries(kwargs['compare'])
+        key = self._keyfunction(queries, kwargs.get('sort_decimal', False))
+        groups = {}
+        for n in self.getloop(*mpaths):
+            groups.setdefault(key(n), []).append(n)
+        return groups
+
+    @staticmethod
+    def _comparequeries(comparekey):
+        """
+        compare key(s) of sort/group_by as compiled mpaths:
+        a mpath (tuple of dicts) or compiled mpath; or a list of these for more keys (first is main key).
+        """
+        if isinstance(comparekey, dict):
+            comparekey = (comparekey,)
+        if isinstance(comparekey, Mpath) or (comparekey and isinstance(comparekey[0], dict)):
+            comparekey = [comparekey]
+        if not comparekey:
+            raise MappingFormatError(_('Sort: no compare key: %(compare)s'), {'compare': comparekey})
+        queries = []
+        for compare in comparekey:
+            query = compare if isinstance(compare, Mpath) else Mpath(*compare)
+            if query.target is None:
+                raise MappingFormatError(
+                    _('Must be one and only one "None" in last section: get(%(mpath)s)'), {'mpath': query}
+                )
+            queries.append(query)
+        return queries
+
+    @staticmethod
+    def _keyfunction(queries, sort_decimal=False, if_none=None):
+        """
+        key function for sort/group_by: the value(s) of compiled mpath(s) for a node;
+        no checks or logging for each node.
+        sort_decimal: decimal value (as getdecimal: 0 if no value); else the value, if_none if no value.
+        """
+        def value(n, query):
+            terug = n._getcompiledcore(query, 0)
+            if sort_decimal:
+                return Node._todecimal(terug)
+            return terug or if_none
+
+        if len(queries) == 1:
+            query = queries[0]
+            return lambda n: value(n, query)
+        return lambda n: tuple(value(n, query) for query in queries)
+
+    @staticmethod
+    def _sortchildren(children, key, reverse):
+        """
+        sort (in place, stable) the list children with key function; key is called once for each node.
+        reverse: one value, or a value for each key (key function returns tuple).
+        """
+        if not isinstance(reverse, (list, tuple)):
+            children.sort(key=key, reverse=reverse)
+            return
+        decorated = [(key(n), n) for n in children]
+        # stable sort: sort on last key first
+        for index in range(len(reverse) - 1, -1, -1):
+            decorated.sort(key=lambda d: d[0][index], reverse=reverse[index])
+        children[:] = [n for _, n in decorated]
+
+    def compile_mpath(self, *mpaths):
+        """
+        compile mpath for get, getloop, put, putloop; with get_checklevel 2 mpath is checked with grammar of node.
+        usage in mappingscript: see Mpath.
+        """
+        query = Mpath(*mpaths)
+        if Node.checklevel == 2:
+            self._mpath_grammar_check(query.mpaths)
+            query.checkedstructure = self.structure
+        return query
 
     # ********************************************************
     # *** utility functions **********************************
@@ -799,8 +1004,9 @@ class Node:
         the out-tree has been formatted already, this is not OK for fixed formats (idoc!)
         """
         if self.record is not None:
-            for key, value in self.record.items():
-                self.record[key] = value.strip()
+            record = self.writablerecord()
+            for key, value in record.items():
+                record[key] = value.strip()
         for child in self.children:
             child.stripnode()
 
@@ -831,6 +1037,7 @@ class Node:
                 childnode.collectlines(print_as_row)
                 # go recursive
         self.children = new
+        self._childindex = None
 
     def copynode(self):
         """make a 'safe' copy of node; return the new node"""
@@ -841,3 +1048,249 @@ class Node:
         for childnode in self.children:
             new_node.append(childnode.copynode())
         return new_node
+
+    def cowcopy(self):
+        """
+        make a copy-on-write copy of node (and tree); return the new node (CowNode).
+        record and children are shared until changed, so this is fast and uses little memory.
+        after this the node (tree) itself should not be changed anymore: use copies (eg a copy for each use).
+        """
+        return CowNode(self)
+
+    def writablerecord(self):
+        """
+        record of node, to be changed in place.
+        used where record is changed other than via put/change etc (eg checks and formatting in (out)message).
+        """
+        return self.record
+
+
+class CowNode(Node):
+    """
+    copy-on-write node (see Node.cowcopy): shares record and list of children with the node it is copied from.
+    - children are copied when used, one level at a time: as CowNodes that share record and children.
+    - record is copied when changed via put, putloop, change, stripnode; or via writablerecord
+      (checks and formatting of (out)message).
+    Changing a record directly (eg via getrecord or node.record[...] = ...) is not detected:
+    use writablerecord() for this.
+    """
+
+    __slots__ = ('_sharedrecord', '_sharedchildren')
+
+    def __init__(self, source):
+        # pylint: disable=super-init-not-called
+        # no Node.__init__: record is not changed
+        self.record = source.record
+        # list of children of source, not via property children (source is not changed)
+        Node.children.__set__(self, Node.children.__get__(source))
+        self.linpos_info = source.linpos_info
+        self._queries = source._queries.copy() if source._queries else None
+        self.structure = source.structure
+        self._childindex = None
+        self._sharedrecord = source.record is not None
+        self._sharedchildren = True
+
+    @property
+    def children(self):
+        """children of node; shared children are copied first (as CowNode)."""
+        children = Node.children.__get__(self)
+        if self._sharedchildren:
+            children = [CowNode(childnode) for childnode in children]
+            Node.children.__set__(self, children)
+            self._sharedchildren = False
+        return children
+
+    @children.setter
+    def children(self, children):
+        Node.children.__set__(self, children)
+        self._sharedchildren = False
+
+    def writablerecord(self):
+        """record of node, copied first if shared."""
+        if self._sharedrecord:
+            record = self.record
+            if isinstance(record, Record):
+                self.record = Record(record.index)
+                self.record.slots = record.slots[:]
+                self.record.extra = dict(record.extra) if record.extra else None
+            else:
+                self.record = record.copy()
+            self._sharedrecord = False
+        return self.record
+
+
+class Mpath:
+    """
+    compiled mpath: checked once, used many times without checks in Node.get, getloop, put, putloop
+    (and getnozero, getdecimal, getcountoccurrences; also via inn/out of mappingscript).
+    the dicts of the mpath are copied (with BOTSIDnr), so the dicts passed are not changed.
+    as get: max one None in last part of mpath; this is the field returned by get.
+    usage in mappingscript (eg at module level):
+        LIN = Mpath({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'})
+        ARTICLE = Mpath({'BOTSID': 'LIN'}, {'BOTSID': 'PIA', 'C212.7140': None})
+        for lin in inn.getloop(LIN):
+            article = lin.get(ARTICLE)
+    """
+
+    # pylint: disable=protected-access
+
+    __slots__ = ('mpaths', 'stripped', 'matchers', 'target', 'lastlevel', 'checkedstructure')
+
+    def __init__(self, *mpaths):
+        if not mpaths:
+            raise MappingFormatError(_('Parameter mpath must be dicts in a tuple: %(mpaths)s'), {'mpaths': mpaths})
+        Node._mpath_sanity_check(mpaths[:-1])
+        if not isinstance(mpaths[-1], dict):
+            raise MappingFormatError(_('Must be dicts in tuple: get(%(mpath)s)'), {'mpath': mpaths})
+        if 'BOTSID' not in mpaths[-1]:
+            raise MappingFormatError(_('Last section without "BOTSID": get(%(mpath)s)'), {'mpath': mpaths})
+        self.target = None
+        for key, value in mpaths[-1].items():
+            if not isinstance(key, str):
+                raise MappingFormatError(_('Keys must be strings in last section: get(%(mpath)s)'), {'mpath': mpaths})
+            if value is None:
+                if self.target is not None:
+                    raise MappingFormatError(_('Max one "None" in last section: get(%(mpath)s)'), {'mpath': mpaths})
+                self.target = key
+            elif not isinstance(value, str):
+                raise MappingFormatError(
+                    _('Values must be strings (or none) in last section: get(%(mpath)s)'), {'mpath': mpaths}
+                )
+        self.mpaths = tuple(dict(part) for part in mpaths)
+        for part in self.mpaths:
+            part.setdefault('BOTSIDnr', '1')
+        # per part of mpath: (key, value) to compare with record; not the field to get
+        self.matchers = tuple(
+            tuple((key, value) for key, value in part.items() if value is not None) for part in self.mpaths
+        )
+        self.lastlevel = len(self.mpaths) - 1
+        # for put, putloop
+        self.stripped = tuple(
+            {key: value if value is None else value.strip() for key, value in part.items()} for part in self.mpaths
+        )
+        # structure (grammar) mpath is checked with (get_checklevel 2)
+        self.checkedstructure = None
+
+    def copy(self, strip=True):
+        """copy of the dicts of mpath (for put: dicts become records of nodes)."""
+        return tuple(map(dict, self.stripped if strip else self.mpaths))
+
+    def __repr__(self):
+        return repr(self.mpaths)
+
+
+class _Absent:
+    """marks an empty position in a compact record; false as an empty field."""
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return 'ABSENT'
+
+    def __reduce__(self):
+        # copy and pickle give the same object
+        return 'ABSENT'
+
+
+ABSENT = _Absent()
+
+
+class Record(MutableMapping):
+    """
+    compact record (bots.ini compact_records): the values of the fields are in a list (slots),
+    in the order of the fields in the grammar (grammar FIELDINDEX: field ID -> position).
+    slots is as long as needed for the last field present; absent fields are ABSENT.
+    Fields not in the grammar are in a dict (extra).
+    For mappingscripts a record is used as a dict; copy() gives a dict.
+    message._canonicalfields and outmessage._tree2recordfields use the slots directly.
+    """
+
+    __slots__ = ('index', 'slots', 'extra')
+
+    def __init__(self, index, record=None):
+        self.index = index
+        self.slots = slots = []
+        self.extra = None
+        if record:
+            for key, value in record.items():
+                position = index.get(key)
+                if position is None:
+                    if self.extra is None:
+                        self.extra = {}
+                    self.extra[key] = value
+                    continue
+                if position >= len(slots):
+                    slots.extend([ABSENT] * (position + 1 - len(slots)))
+                slots[position] = value
+
+    def __getitem__(self, key):
+        position = self.index.get(key)
+        if position is None:
+            if self.extra is None:
+                raise KeyError(key)
+            return self.extra[key]
+        if position < len(self.slots):
+            value = self.slots[position]
+            if value is not ABSENT:
+                return value
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        position = self.index.get(key)
+        if position is None:
+            return default if self.extra is None else self.extra.get(key, default)
+        if position < len(self.slots):
+            value = self.slots[position]
+            if value is not ABSENT:
+                return value
+        return default
+
+    def __contains__(self, key):
+        position = self.index.get(key)
+        if position is None:
+            return self.extra is not None and key in self.extra
+        return position < len(self.slots) and self.slots[position] is not ABSENT
+
+    def __setitem__(self, key, value):
+        position = self.index.get(key)
+        if position is None:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+            return
+        slots = self.slots
+        if position >= len(slots):
+            slots.extend([ABSENT] * (position + 1 - len(slots)))
+        slots[position] = value
+
+    def __delitem__(self, key):
+        position = self.index.get(key)
+        if position is None:
+            if self.extra is None:
+                raise KeyError(key)
+            del self.extra[key]
+        elif key in self:
+            self.slots[position] = ABSENT
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        slots = self.slots
+        size = len(slots)
+        for key, position in self.index.items():
+            if position < size and slots[position] is not ABSENT:
+                yield key
+        if self.extra:
+            yield from list(self.extra)
+
+    def __len__(self):
+        return len(self.slots) - self.slots.count(ABSENT) + (len(self.extra) if self.extra else 0)
+
+    def copy(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return repr(dict(self.items()))
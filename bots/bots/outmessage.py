@@ -8,7 +8,7 @@ Bots outmessage lib
 from collections import OrderedDict
 import decimal
 import json as simplejson
-import time
+from typing import ClassVar
 from xml.etree import ElementInclude as ETI
 
 # bots-modules
@@ -32,13 +32,15 @@ from .botsconfig import (
     MAXREPEAT,
     SUBFIELDS,
     FIELDS,
+    FIELDINDEX,
     SFIELD,
     VALUE,
     ISFIELD,
     LEVEL,
+    LEVELINDEX,
 )
 from .botslib import gettext as _
-from .exceptions import BotsImportError, OutMessageError, txtexc
+from .exceptions import OutMessageError, txtexc
 
 try:
     from xml.etree import cElementTree as ET
@@ -63,6 +65,246 @@ def outmessage_init(**ta_info):
     return classtocall(ta_info)
 
 
+def _fielderror(message, value, structure_record, field_definition, **extra):
+    """parameters for error text of field (compiled formatters)."""
+    parameters = {
+        'record': message.mpathformat(structure_record[MPATH]),
+        'field': field_definition[ID],
+        'content': value,
+    }
+    parameters.update(extra)
+    return parameters
+
+
+def _compilealfanumeric(field_definition, fixedlength, checkformat):
+    """compiled formatter for alfanumeric field: align (fixed records) and check length (if checkformat)."""
+    maxlength = field_definition[LENGTH]
+    minlength = field_definition[MINLENGTH]
+    if not fixedlength:
+        align = None
+    elif field_definition[FORMAT] == 'AR':
+        # field format is alfanumeric right aligned
+        align = str.rjust
+    else:
+        # add spaces (left, because A-field is right aligned)
+        align = str.ljust
+
+    def formatfield(message, value, structure_record, node_instance):
+        # pylint: disable=unused-argument
+        if align is not None:
+            value = align(value, minlength)
+        if not checkformat:
+            return value
+        if len(value) > maxlength:
+            message.add2errorlist(
+                _(
+                    '[F20]: Record "%(record)s" field "%(field)s"'
+                    ' too big (max %(max)s): "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, field_definition, max=maxlength)
+            )
+        if len(value) < minlength:
+            message.add2errorlist(
+                _(
+                    '[F21]: Record "%(record)s" field "%(field)s"'
+                    ' too small (min %(min)s): "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, field_definition, min=minlength)
+            )
+        return value
+
+    return formatfield
+
+
+def _compiledate(field_definition):
+    """compiled formatter for date field: check date (YYMMDD or CCYYMMDD) and length."""
+    maxlength = field_definition[LENGTH]
+    minlength = field_definition[MINLENGTH]
+
+    def formatfield(message, value, structure_record, node_instance):
+        # pylint: disable=unused-argument
+        lenght = len(value)
+        if not botslib.validdate(value):
+            message.add2errorlist(
+                _(
+                    '[F22]: Record "%(record)s" date field "%(field)s"'
+                    ' not a valid date: "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, field_definition)
+            )
+        if lenght > maxlength:
+            message.add2errorlist(
+                _(
+                    '[F31]: Record "%(record)s" date field "%(field)s"'
+                    ' too big (max %(max)s): "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, field_definition, max=maxlength)
+            )
+        if lenght < minlength:
+            message.add2errorlist(
+                _(
+                    '[F32]: Record "%(record)s" date field "%(field)s"'
+                    ' too small (min %(min)s): "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, field_definition, min=minlength)
+            )
+        return value
+
+    return formatfield
+
+
+def _compiletime(field_definition):
+    """compiled formatter for time field: check time (HHMM or HHMMSS) and length."""
+    maxlength = field_definition[LENGTH]
+    minlength = field_definition[MINLENGTH]
+
+    def formatfield(message, value, structure_record, node_instance):
+        # pylint: disable=unused-argument
+        lenght = len(value)
+        if not botslib.validtime(value):
+            message.add2errorlist(
+                _(
+                    '[F23]: Record "%(record)s" time field "%(field)s"'
+                    ' not a valid time: "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, field_definition)
+            )
+        if lenght > maxlength:
+            message.add2errorlist(
+                _(
+                    '[F33]: Record "%(record)s" time field "%(field)s"'
+                    ' too big (max %(max)s): "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, field_definition, max=maxlength)
+            )
+        if lenght < minlength:
+            message.add2errorlist(
+                _(
+                    '[F34]: Record "%(record)s" time field "%(field)s"'
+                    ' too small (min %(min)s): "%(content)s".\n'
+                )
+                % _fielderror(message, value, structure_record, field_definition, min=minlength)
+            )
+        return value
+
+    return formatfield
+
+
+def _compilenumeric(field_definition, ta_info, checkformat):
+    """
+    compiled formatter for numeric field (R, N, I): from canonical format to format of field
+    (decimals, alignment/leading zeroes, decimal sign); check length (if checkformat).
+    for some formats (if ta_info['lengthnumericbare']; eg edifact)
+    length is calculated without decimal sign and/or minus sign.
+    """
+    bformat = field_definition[BFORMAT]
+    maxlength = field_definition[LENGTH]
+    minlength = field_definition[MINLENGTH]
+    decimals = field_definition[DECIMALS]
+    decimaal = ta_info['decimaal']
+    lengthnumericbare = ta_info['lengthnumericbare']
+    json_write_numericals = ta_info.get('json_write_numericals')
+    if field_definition[FORMAT] == bformat + 'L':
+        # field format is numeric left aligned (RL, NL)
+        align = str.ljust
+    elif field_definition[FORMAT] == bformat + 'R':
+        # field format is numeric right aligned (RR, NR)
+        align = str.rjust
+    else:
+        align = str.zfill
+
+    def checklength(message, value, structure_record, lengthcorrection):
+        if checkformat and len(value) - lengthcorrection > maxlength:
+            message.add2errorlist(
+                _('[F28]: Record "%(record)s" field "%(field)s" too big: "%(content)s".\n')
+                % _fielderror(message, value, structure_record, field_definition)
+            )
+        return value
+
+    if bformat == 'R':
+
+        def formatfield(message, value, structure_record, node_instance):
+            # pylint: disable=unused-argument
+            # floating point: use all decimals received
+            try:
+                dec_value = decimal.Decimal(value)
+                if json_write_numericals:
+                    if dec_value == dec_value.to_integral_exact():
+                        return int(dec_value)
+                    return float(dec_value)
+                value = str(dec_value)
+            except decimal.InvalidOperation:
+                message.add2errorlist(
+                    _(
+                        '[F25]: Record "%(record)s" field "%(field)s"'
+                        ' numerical format not valid: "%(content)s".\n'
+                    )
+                    % _fielderror(message, value, structure_record, field_definition)
+                )
+            lengthcorrection = 0
+            if lengthnumericbare:
+                if value[0] == '-':
+                    lengthcorrection += 1
+                if '.' in value:
+                    lengthcorrection += 1
+            # replace '.' by required decimal sep.
+            value = align(value, minlength + lengthcorrection).replace('.', decimaal, 1)
+            return checklength(message, value, structure_record, lengthcorrection)
+
+    elif bformat == 'N':
+        quantizer = decimal.Decimal(f'10e-{decimals}')
+
+        def formatfield(message, value, structure_record, node_instance):
+            # pylint: disable=unused-argument
+            # fixed decimals; round
+            try:
+                dec_value = decimal.Decimal(value).quantize(quantizer)
+                if json_write_numericals:
+                    if decimals == 0:
+                        return int(dec_value)
+                    return float(dec_value)
+                value = str(dec_value)
+            except decimal.InvalidOperation:
+                message.add2errorlist(
+                    _(
+                        '[F26]: Record "%(record)s" field "%(field)s"'
+                        ' numerical format not valid: "%(content)s".\n'
+                    )
+                    % _fielderror(message, value, structure_record, field_definition)
+                )
+            lengthcorrection = 0
+            if lengthnumericbare:
+                if value[0] == '-':
+                    lengthcorrection += 1
+                if decimals:
+                    lengthcorrection += 1
+            # replace '.' by required decimal sep.
+            value = align(value, minlength + lengthcorrection).replace('.', decimaal, 1)
+            return checklength(message, value, structure_record, lengthcorrection)
+
+    else:
+        # bformat == 'I'
+
+        def formatfield(message, value, structure_record, node_instance):
+            # pylint: disable=unused-argument
+            # implicit decimals
+            lengthcorrection = 1 if lengthnumericbare and value[0] == '-' else 0
+            try:
+                value = str(decimal.Decimal(value).shift(decimals).quantize(NODECIMAL))
+            except decimal.InvalidOperation:
+                message.add2errorlist(
+                    _(
+                        '[F27]: Record "%(record)s" field "%(field)s"'
+                        ' numerical format not valid: "%(content)s".\n'
+                    )
+                    % _fielderror(message, value, structure_record, field_definition)
+                )
+            value = value.zfill(minlength + lengthcorrection)
+            return checklength(message, value, structure_record, lengthcorrection)
+
+    return formatfield
+
+
 class Outmessage(message.Message):
     """
     abstract class; represents a outgoing edi message.
@@ -82,6 +324,10 @@ class Outmessage(message.Message):
     """
     # pylint: disable=attribute-defined-outside-init
 
+    formatparameters = ('decimaal', 'lengthnumericbare', 'json_write_numericals')
+    # validation profile 'nooutput': outgoing messages are not checked.
+    validationdepths: ClassVar[dict] = {'full': 'full', 'structure': 'structure', 'nooutput': 'none'}
+
     def __init__(self, ta_info):
         super().__init__(ta_info)
         # message tree; build via put()-interface in mappingscript. Initialise with empty dict
@@ -93,42 +339,14 @@ class Outmessage(message.Message):
         read grammar for a message/envelope.
         (try to) read the topartner dependent grammar syntax.
         """
-        # read grammar for message.
+        # read grammar for message, with partner-syntax (frompartner, topartner).
+        # partner-syntax is used to always overrule values in self.ta_info
         self.defmessage = grammar.grammarread(
-            self.ta_info['editype'], self.ta_info['messagetype'], typeofgrammarfile)
-
-        # read partner-syntax. Use this to always overrule values in self.ta_info
-        if self.ta_info.get('frompartner'):
-            try:
-                partnersyntax = grammar.grammarread(
-                    self.ta_info['editype'],
-                    self.ta_info['frompartner'],
-                    typeofgrammarfile='partners',
-                )
-                # partner syntax overrules!
-                self.defmessage.syntax.update(partnersyntax.syntax)
-                botsglobal.logger.debug(
-                    'Partner syntax imported "%(filename)s".', partnersyntax.module.__file__)
-
-            except BotsImportError:
-                # No partner specific syntax found (is not an error).
-                pass
-
-        if self.ta_info.get('topartner'):
-            try:
-                partnersyntax = grammar.grammarread(
-                    self.ta_info['editype'],
-                    self.ta_info['topartner'],
-                    typeofgrammarfile='partners'
-                )
-                # partner syntax overrules!
-                self.defmessage.syntax.update(partnersyntax.syntax)
-                botsglobal.logger.debug(
-                    'Partner syntax imported "%(filename)s".', partnersyntax.module.__file__)
-
-            except BotsImportError:
-                # No partner specific syntax found (is not an error).
-                pass
+            self.ta_info['editype'],
+            self.ta_info['messagetype'],
+            typeofgrammarfile,
+            partners=(self.ta_info.get('frompartner'), self.ta_info.get('topartner')),
+        )
 
         # write values from grammar syntax to self.ta_info
         # unless these values are already set (eg by mappingscript)
@@ -252,19 +470,33 @@ class Outmessage(message.Message):
         # the record build; list (=record) of dicts (=fields).
         lex_record = []
         recordbuffer = []
+        # compact record (node.Record) for this structure_record: use slots for (sub)fields
+        if isinstance(noderecord, node.Record) and noderecord.index is structure_record.get(FIELDINDEX):
+            slots = noderecord.slots
+            size = len(slots)
+        else:
+            slots = None
+        # position of field in slots (BOTSIDnr is first); fields in slots are in order of grammar
+        position = 1
         # loop all fields in grammar-definition
         for field_definition in structure_record[FIELDS]:
+            slot = position
+            position += 1
             if field_definition[ISFIELD]:
                 # field (no composite)
                 if field_definition[MAXREPEAT] == 1:
                     # non-repeating
                     field_has_data = False
-                    if field_definition[ID] in noderecord and noderecord[field_definition[ID]]:
+                    if slots is None:
+                        value = noderecord.get(field_definition[ID])
+                    else:
+                        value = slots[slot] if slot < size else None
+                    if value:
                         # field exists in outgoing message and has data
                         field_has_data = True
                         recordbuffer.append(
                             {
-                                VALUE: noderecord[field_definition[ID]],
+                                VALUE: value,
                                 SFIELD: 0,
                                 FORMATFROMGRAMMAR: field_definition[FORMAT],
                             }
@@ -336,15 +568,19 @@ class Outmessage(message.Message):
                     type_of_field = 0
                     # buffer for this composite.
                     fieldbuffer = []
-                    for grammarsubfield in field_definition[SUBFIELDS]:
+                    # each subfield has a position in slots
+                    position += len(field_definition[SUBFIELDS]) - 1
+                    for subslot, grammarsubfield in enumerate(field_definition[SUBFIELDS], start=slot):
                         # loop subfields
-                        if grammarsubfield[ID] in noderecord and noderecord[grammarsubfield[ID]]:
+                        if slots is None:
+                            value = noderecord.get(grammarsubfield[ID])
+                        else:
+                            value = slots[subslot] if subslot < size else None
+                        if value:
                             # field exists in outgoing message and has data
                             field_has_data = True
                             # append field
-                            fieldbuffer.append(
-                                {VALUE: noderecord[grammarsubfield[ID]], SFIELD: type_of_field}
-                            )
+                            fieldbuffer.append({VALUE: value, SFIELD: type_of_field})
                             recordbuffer += fieldbuffer
                             fieldbuffer = []
                         else:
@@ -417,275 +653,25 @@ class Outmessage(message.Message):
 
         self.lex_records.append(lex_record)
 
-    def _formatfield(self, value, field_definition, structure_record, node_instance):
+    def _compileformatfield(self, field_definition):
         """
-        Input: value (as a string) and field definition.
-        Some parameters of self.syntax are used, eg decimaal
-        Format is checked and converted (if needed).
-
-        :param value:
-        :param field_definition:
-        :param structure_record:
-
-        :return formatted value:
+        Compile the format of field_definition (see message._compileformatfield).
+        Parameters of self.ta_info are used: decimaal, lengthnumericbare, json_write_numericals.
         """
-        # pylint: disable=unused-argument
+        checkformat = self.validation == 'full'
         if field_definition[BFORMAT] == 'A':
-            # check length fields in variable records
-            if isinstance(self, fixed):
-                if field_definition[FORMAT] == 'AR':
-                    # if field format is alfanumeric right aligned
-                    value = value.rjust(field_definition[MINLENGTH])
-                else:
-                    # add spaces (left, because A-field is right aligned)
-                    value = value.ljust(field_definition[MINLENGTH])
-            if len(value) > field_definition[LENGTH]:
-                self.add2errorlist(
-                    _(
-                        '[F20]: Record "%(record)s" field "%(field)s"'
-                        ' too big (max %(max)s): "%(content)s".\n'
-                    )
-                    % {
-                        'record': self.mpathformat(structure_record[MPATH]),
-                        'field': field_definition[ID],
-                        'content': value,
-                        'max': field_definition[LENGTH],
-                    }
-                )
-            if len(value) < field_definition[MINLENGTH]:
-                self.add2errorlist(
-                    _(
-                        '[F21]: Record "%(record)s" field "%(field)s"'
-                        ' too small (min %(min)s): "%(content)s".\n'
-                    )
-                    % {
-                        'record': self.mpathformat(structure_record[MPATH]),
-                        'field': field_definition[ID],
-                        'content': value,
-                        'min': field_definition[MINLENGTH],
-                    }
-                )
-        elif field_definition[BFORMAT] in 'DT':
-            lenght = len(value)
-            if field_definition[BFORMAT] == 'D':
-                try:
-                    if lenght == 6:
-                        time.strptime(value, '%y%m%d')
-                    elif lenght == 8:
-                        time.strptime(value, '%Y%m%d')
-                    else:
-                        raise ValueError('To be catched')
-                except ValueError:
-                    self.add2errorlist(
-                        _(
-                            '[F22]: Record "%(record)s" date field "%(field)s"'
-                            ' not a valid date: "%(content)s".\n'
-                        )
-                        % {
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-                if lenght > field_definition[LENGTH]:
-                    self.add2errorlist(
-                        _(
-                            '[F31]: Record "%(record)s" date field "%(field)s"'
-                            ' too big (max %(max)s): "%(content)s".\n'
-                        )
-                        % {
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                            'max': field_definition[LENGTH],
-                        }
-                    )
-                if lenght < field_definition[MINLENGTH]:
-                    self.add2errorlist(
-                        _(
-                            '[F32]: Record "%(record)s" date field "%(field)s"'
-                            ' too small (min %(min)s): "%(content)s".\n'
-                        )
-                        % {
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                            'min': field_definition[MINLENGTH],
-                        }
-                    )
-            else:  # if field_definition[BFORMAT] == 'T':
-                try:
-                    if lenght == 4:
-                        time.strptime(value, '%H%M')
-                    elif lenght == 6:
-                        time.strptime(value, '%H%M%S')
-                    else:
-                        raise ValueError('To be catched')
-                except ValueError:
-                    self.add2errorlist(
-                        _(
-                            '[F23]: Record "%(record)s" time field "%(field)s"'
-                            ' not a valid time: "%(content)s".\n'
-                        )
-                        % {
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                        }
-                    )
-                if lenght > field_definition[LENGTH]:
-                    self.add2errorlist(
-                        _(
-                            '[F33]: Record "%(record)s" time field "%(field)s"'
-                            ' too big (max %(max)s): "%(content)s".\n'
-                        )
-                        % {
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                            'max': field_definition[LENGTH],
-                        }
-                    )
-                if lenght < field_definition[MINLENGTH]:
-                    self.add2errorlist(
-                        _(
-                            '[F34]: Record "%(record)s" time field "%(field)s"'
-                            ' too small (min %(min)s): "%(content)s".\n'
-                        )
-                        % {
-                            'record': self.mpathformat(structure_record[MPATH]),
-                            'field': field_definition[ID],
-                            'content': value,
-                            'min': field_definition[MINLENGTH],
-                        }
-                    )
-        else:
-            # numerics
-
-            # if value[0] == "-":
-            #     minussign = "-"
-            #     absvalue = value[1:]
-            # else:
-            #     minussign = ""
-            #     absvalue = value
-            # digits, decimalsign, decimals = absvalue.partition(".")
-            # if not digits:
-            #     digits = "0"
-            #     if not decimals:# and decimalsign:
-            #         self.add2errorlist(_(
-            #              '[F24]: Record "%(record)s" field "%(field)s" '
-            #              ' numerical format not valid: "%(content)s".\n') % {
-            #              "field": field_definition[ID], "content": value,
-            #              "record": self.mpathformat(structure_record[MPATH])})
-
-            # for some formats (if self.ta_info['lengthnumericbare']=True; eg edifact)
-            # length is calculated without decimal sing and/or minus sign.
-            lengthcorrection = 0
-            if field_definition[BFORMAT] == 'R':
-                # floating point: use all decimals received
-                try:
-                    dec_value = decimal.Decimal(value)
-                    if self.ta_info.get("json_write_numericals"):
-                        if dec_value == dec_value.to_integral_exact():
-                            return int(dec_value)
-                        return float(dec_value)
-                    value = str(dec_value)
-                except decimal.InvalidOperation:
-                    self.add2errorlist(
-                        _(
-                            '[F25]: Record "%(record)s" field "%(field)s"'
-                            ' numerical format not valid: "%(content)s".\n'
-                        )
-                        % {
-                            'field': field_definition[ID],
-                            'content': value,
-                            'record': self.mpathformat(structure_record[MPATH]),
-                        }
-                    )
-                if self.ta_info["lengthnumericbare"]:
-                    if value[0] == "-":
-                        lengthcorrection += 1
-                    if "." in value:
-                        lengthcorrection += 1
-                if field_definition[FORMAT] == 'RL':
-                    # field format is numeric left aligned
-                    value = value.ljust(field_definition[MINLENGTH] + lengthcorrection)
-                elif field_definition[FORMAT] == 'RR':
-                    # field format is numeric right aligned
-                    value = value.rjust(field_definition[MINLENGTH] + lengthcorrection)
-                else:
-                    value = value.zfill(field_definition[MINLENGTH] + lengthcorrection)
-                # replace '.' by required decimal sep.
-                value = value.replace('.', self.ta_info['decimaal'], 1)
-            elif field_definition[BFORMAT] == 'N':
-                # fixed decimals; round
-                try:
-                    dec_value = decimal.Decimal(value)
-                    dec_value = dec_value.quantize(decimal.Decimal(f"10e-{field_definition[DECIMALS]}"))
-                    if self.ta_info.get("json_write_numericals"):
-                        if field_definition[DECIMALS] == 0:
-                            return int(dec_value)
-                        return float(dec_value)
-                    value = str(dec_value)
-                except decimal.InvalidOperation:
-                    self.add2errorlist(
-                        _(
-                            '[F26]: Record "%(record)s" field "%(field)s"'
-                            ' numerical format not valid: "%(content)s".\n'
-                        )
-                        % {
-                            'field': field_definition[ID],
-                            'content': value,
-                            'record': self.mpathformat(structure_record[MPATH]),
-                        }
-                    )
-                if self.ta_info["lengthnumericbare"]:
-                    if value[0] == "-":
-                        lengthcorrection += 1
-                    if field_definition[DECIMALS]:
-                        lengthcorrection += 1
-                if field_definition[FORMAT] == 'NL':
-                    # field format is numeric left aligned
-                    value = value.ljust(field_definition[MINLENGTH] + lengthcorrection)
-                elif field_definition[FORMAT] == 'NR':
-                    # field format is numeric right aligned
-                    value = value.rjust(field_definition[MINLENGTH] + lengthcorrection)
-                else:
-                    value = value.zfill(field_definition[MINLENGTH] + lengthcorrection)
-                value = value.replace('.', self.ta_info['decimaal'], 1)
-                # replace '.' by required decimal sep.
-            elif field_definition[BFORMAT] == 'I':
-                # implicit decimals
-                if self.ta_info['lengthnumericbare']:
-                    if value[0] == '-':
-                        lengthcorrection += 1
-                try:
-                    dec_value = decimal.Decimal(value).shift(field_definition[DECIMALS])
-                    value = str(dec_value.quantize(NODECIMAL))
-                except decimal.InvalidOperation:
-                    self.add2errorlist(
-                        _(
-                            '[F27]: Record "%(record)s" field "%(field)s"'
-                            ' numerical format not valid: "%(content)s".\n'
-                        )
-                        % {
-                            'field': field_definition[ID],
-                            'content': value,
-                            'record': self.mpathformat(structure_record[MPATH]),
-                        }
-                    )
-                value = value.zfill(field_definition[MINLENGTH] + lengthcorrection)
-
-            if len(value) - lengthcorrection > field_definition[LENGTH]:
-                self.add2errorlist(
-                    _('[F28]: Record "%(record)s" field "%(field)s" too big: "%(content)s".\n')
-                    % {
-                        'record': self.mpathformat(structure_record[MPATH]),
-                        'field': field_definition[ID],
-                        'content': value,
-                    }
-                )
-        return value
+            if not checkformat and not isinstance(self, fixed):
+                return super()._compileformatfield(field_definition)
+            return _compilealfanumeric(field_definition, isinstance(self, fixed), checkformat)
+        if field_definition[BFORMAT] in ('D', 'T') and not checkformat:
+            # date and time are not converted
+            return super()._compileformatfield(field_definition)
+        if field_definition[BFORMAT] == 'D':
+            return _compiledate(field_definition)
+        if field_definition[BFORMAT] == 'T':
+            return _compiletime(field_definition)
+        # numerics (R, N, I)
+        return _compilenumeric(field_definition, self.ta_info, checkformat)
 
     def _initfield(self, field_definition):
         """
@@ -1031,7 +1017,8 @@ class xml(Outmessage):
 
     def _node2xml(self, node_instance):
         """recursive method."""
-        newnode = self._node2xmlfields(node_instance.record)
+        # fields are popped from record
+        newnode = self._node2xmlfields(node_instance.writablerecord())
         for childnode in node_instance.children:
             newnode.append(self._node2xml(childnode))
         return newnode
@@ -1179,20 +1166,20 @@ class json(Outmessage):
         if node_instance.structure is None:
             node_instance.structure = structure
         if LEVEL in structure:
-            # for every record_definition (in grammar) of this level
-            for record_definition in structure[LEVEL]:
-                # for every node in mpathtree; SPEED: delete nodes from list when found
-                for childnode in node_instance.children:
-                    # if it is not the right NODE":
-                    if childnode.record['BOTSID'] != record_definition[ID] \
-                            or childnode.record.get("BOTSIDnr") != record_definition[BOTSIDNR]:
-                        continue
-                    if record_definition[MAX] == 1:
-                        # misuse linpos_info to indicate this node occurs only once -> dict in json,
-                        # not a list of dicts
-                        childnode.linpos_info = 'OK'
-                    # use rest of index in deeper level
-                    self.correct_max_one_occurence(childnode, record_definition)
+            # SPEED: record_definition of child via lookup table of grammar (as in _canonicaltree)
+            level = structure[LEVEL]
+            levelindex = structure[LEVELINDEX]
+            for childnode in node_instance.children:
+                index = levelindex.get((childnode.record['BOTSID'], childnode.record.get('BOTSIDnr')))
+                if index is None:
+                    continue
+                record_definition = level[index]
+                if record_definition[MAX] == 1:
+                    # misuse linpos_info to indicate this node occurs only once -> dict in json,
+                    # not a list of dicts
+                    childnode.linpos_info = 'OK'
+                # use rest of index in deeper level
+                self.correct_max_one_occurence(childnode, record_definition)
 
     def _canonicalfields(self, node_instance, record_definition):
         """
@@ -1207,7 +1194,7 @@ class json(Outmessage):
         for field_definition in record_definition[FIELDS]:
             value = noderecord.get(field_definition[ID])
             if not value:
-                if field_definition[MANDATORY]:
+                if field_definition[MANDATORY] and self.validation != 'none':
                     self.add2errorlist(
                         _('[F02]%(linpos)s: Record "%(mpath)s" field "%(field)s" is mandatory.\n')
                         % {
@@ -1219,8 +1206,8 @@ class json(Outmessage):
                 if value is None:
                     # None-values are not used
                     continue
-            new_noderecord[field_definition[ID]] = self._formatfield(
-                value, field_definition, record_definition, node_instance
+            new_noderecord[field_definition[ID]] = self._formatter(field_definition)(
+                self, value, record_definition, node_instance
             )
         node_instance.record = new_noderecord
 
@@ -21,6 +21,8 @@ from django.db.models import Min
 
 from . import botsglobal
 from . import botslib
+from . import grammarcache
+from . import grammarmanifest
 from . import models
 from .botsinit import LOG_LEVELS
 from .botslib import gettext as _
@@ -257,6 +259,9 @@ def read_plugin(pathzipfile: str) -> dict[str, list]:
         ) from exc
 
     botsglobal.logger.info(_('Writing files to filesystem is OK.'))
+    # grammars in memory can be overwritten by plugin
+    grammarcache.clear()
+    grammarmanifest.clear()
     return plugreport
 
 
@@ -1244,6 +1249,8 @@ def delete(**kwargs):
             for bestand in files:
                 if bestand != '__init__.py':
                     os.remove(os.path.join(root, bestand))
+        grammarcache.clear()
+        grammarmanifest.clear()
 
         notification = _('User scripts are deleted (in usersys).')
         botsglobal.logger.log(LOG_LEVELS['DONE'], notification)
@@ -3,9 +3,10 @@ Bots preprocess lib
 """
 # pylint: disable=broad-exception-caught
 
+import concurrent.futures
+import mmap
 import os
 import re
-import string
 import zipfile
 
 # bots-modules
@@ -121,10 +122,18 @@ def postprocess(routedict, function, status=FILEOUT, rootidta=None, **kwargs):
     return nr_files
 
 
+# whitespace of regular expression \s for iso-8859-1 chars.
+# mailbag searches the bytes of the edi file; \s of a bytes pattern matches only ascii whitespace.
+WHITESPACE = r"[\t\n\x0b\x0c\r\x1c-\x1f\x20\x85\xa0]"
+# trailing chars after the last interchange that are not content.
+NOCONTENT = re.compile(rb"[\t\n\x0b\x0c\r\x20\x1a\x00]*\Z")
+# interchanges are written to file in blocks of this size.
+MAILBAG_BLOCKSIZE = 1048576
+
 # regular expression for mailbag.
 HEADER = re.compile(
-    r"\s*"
-    """
+    (WHITESPACE + "*"
+     """
     (
         (?P<edifact>
             (?P<UNA>
@@ -150,11 +159,16 @@ HEADER = re.compile(
             I[\n\r]*S[\n\r]*A
         )
     )
-    """,
+    """).encode('iso-8859-1'),
     re.DOTALL | re.VERBOSE,
 )
 
 
+def _mailbagsearch(pattern, edifile, pos):
+    """search pattern (unicode string) in the bytes of the edi file from pos."""
+    return re.compile(pattern.encode('iso-8859-1'), re.DOTALL | re.VERBOSE).search(edifile, pos)
+
+
 def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
     """
     2 main functions:
@@ -166,15 +180,129 @@ def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
      - handle multiple UNA in one file, including different charsets.
      - handle multiple ISA's with different separators in one file
     in bots > 3.0.0 all mailbag, edifact, x12 and tradacoms go via mailbag.
+    the edi file is not read in memory: interchanges are searched in a mmap of the edi file.
     """
-    # pylint: disable=unused-argument, too-many-locals, too-many-statements, too-many-branches, consider-using-f-string
-    edifile = botslib.readdata(filename=ta_from.filename, charset='iso-8859-1')
+    # pylint: disable=unused-argument
+    with botslib.opendata_bin(ta_from.filename) as filehandler:
+        try:
+            edifile = mmap.mmap(filehandler.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file can not be mmap'ed
+            edifile = b''
+        try:
+            if botsglobal.ini.getboolean('settings', 'mailbag_batch', False):
+                _mailbag_batch(ta_from, endstatus, frommessagetype, edifile)
+                return
+            for editype, headpos, endpos in mailbag_interchanges(edifile, frommessagetype):
+                if editype == 'xml':
+                    _mailbag_xml(ta_from, endstatus, filesize=endpos)
+                    return
+                # make transaction for translated message; gets ta_info of ta_frommes
+                ta_to = ta_from.copyta(status=endstatus)
+                tofilename = str(ta_to.idta)
+                _mailbag_write(edifile, tofilename, headpos, endpos)
+                # update outmessage transaction with ta_info;
+                ta_to.update(
+                    statust=OK,
+                    filename=tofilename,
+                    editype=editype,
+                    messagetype=_mailbag_messagetype(frommessagetype, editype),
+                    filesize=endpos - headpos,
+                )
+                botsglobal.logger.debug(
+                    _('        File written: "%(tofilename)s".'), {'tofilename': tofilename}
+                )
+        finally:
+            if isinstance(edifile, mmap.mmap):
+                edifile.close()
+
+
+def _mailbag_batch(ta_from, endstatus, frommessagetype, edifile):
+    """
+    batched mailbag (bots.ini mailbag_batch):
+    first all interchanges are searched; new transactions are made with one commit,
+    interchanges are written by a pool of threads (bots.ini mailbag_threads),
+    new transactions are updated with one commit.
+    """
+    interchanges = list(mailbag_interchanges(edifile, frommessagetype))
+    if interchanges[0][0] == 'xml':
+        _mailbag_xml(ta_from, endstatus, filesize=interchanges[0][2])
+        return
+    # make transactions for translated messages; gets ta_info of ta_frommes
+    tas_to = ta_from.copytas(status=endstatus, number=len(interchanges))
+    tofilenames = [str(ta_to.idta) for ta_to in tas_to]
+    max_workers = max(1, botsglobal.ini.getint('settings', 'mailbag_threads', 4))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_mailbag_write, edifile, tofilename, headpos, endpos)
+            for tofilename, (editype, headpos, endpos) in zip(tofilenames, interchanges)
+        ]
+        for future in futures:
+            # raises error of writing
+            future.result()
+    # update outmessage transactions with ta_info;
+    botslib.updatetas([
+        {
+            'idta': ta_to.idta,
+            'statust': OK,
+            'filename': tofilename,
+            'editype': editype,
+            'messagetype': _mailbag_messagetype(frommessagetype, editype),
+            'filesize': endpos - headpos,
+        }
+        for ta_to, tofilename, (editype, headpos, endpos) in zip(tas_to, tofilenames, interchanges)
+    ])
+    botsglobal.logger.debug(
+        _('        %(nr)s files written.'), {'nr': len(tofilenames)}
+    )
+
+
+def _mailbag_xml(ta_from, endstatus, filesize):
+    """is a xml file; inmessage.py can determine the right xml messagetype via xpath."""
+    ta_from.copyta(
+        status=endstatus,
+        statust=OK,
+        filename=ta_from.filename,
+        editype='xml',
+        messagetype='mailbag',
+        filesize=filesize,
+    )
+
+
+def _mailbag_write(edifile, tofilename, headpos, endpos):
+    """write interchange (edifile[headpos:endpos]) to file in blocks."""
+    with botslib.opendata_bin(tofilename, 'wb') as tofile:
+        for pos in range(headpos, endpos, MAILBAG_BLOCKSIZE):
+            tofile.write(edifile[pos:min(pos + MAILBAG_BLOCKSIZE, endpos)])
+
+
+def _mailbag_messagetype(frommessagetype, editype):
+    """
+    editype is now either edifact, x12 or tradacoms
+    frommessagetype is the original frommessagetype (from route).
+    frommessagetype would normally be edifact, x12, tradacoms or mailbag,
+    but could also be eg ORDERSD96AUNEAN007.
+    If so, we want to preserve that.
+    """
+    if frommessagetype not in ['mailbag', editype]:
+        return frommessagetype
+    return editype
+
+
+def mailbag_interchanges(edifile, frommessagetype):
+    """
+    generator: find the interchanges in edifile (bytes or mmap, iso-8859-1);
+    yields (editype, start position, end position) for each interchange.
+    a xml file (frommessagetype 'mailbag') yields ('xml', 0, filesize).
+    searches use positions in edifile, so the remainder of edifile is never copied.
+    """
+    # pylint: disable=too-many-locals, too-many-statements, too-many-branches, consider-using-f-string
     startpos = 0
     nr_interchanges = 0
     while True:
-        found = HEADER.match(edifile[startpos:])
+        found = HEADER.match(edifile, startpos)
         if found is None:
-            if edifile[startpos:].strip(string.whitespace + '\x1A\x00'):
+            if not NOCONTENT.match(edifile, startpos):
                 # there is content...but not valid
                 if nr_interchanges:
                     # found interchanges, but remainder is not valid
@@ -185,21 +313,11 @@ def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
                 # no interchanges found, content is not a valid edifact/x12/tradacoms interchange
                 if frommessagetype == 'mailbag':
                     # if indicated 'mailbag': guess if this is an xml file.....
-                    sniffxml = edifile[:25]
+                    sniffxml = edifile[:25].decode('iso-8859-1')
                     # to find first ' real' data; some char are because of BOM, UTF-16 etc
                     sniffxml = sniffxml.lstrip(' \t\n\r\f\v\xFF\xFE\xEF\xBB\xBF\x00')
                     if sniffxml and sniffxml[0] == '<':
-                        # is a xml file;
-                        # inmessage.py can determine the right xml messagetype via xpath.
-                        filesize = len(edifile)
-                        ta_to = ta_from.copyta(
-                            status=endstatus,
-                            statust=OK,
-                            filename=ta_from.filename,
-                            editype='xml',
-                            messagetype='mailbag',
-                            filesize=filesize,
-                        )
+                        yield 'xml', 0, len(edifile)
                         return
                 raise InMessageError(
                     _('[M51]: Edi file does not start with a valid interchange.')
@@ -212,10 +330,10 @@ def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
             raise InMessageError(_('[M52]: Edi file contains only whitespace.'))
         if found.group("x12"):
             editype = 'x12'
-            headpos = startpos + found.start('x12')
+            headpos = found.start('x12')
             # determine field_sep and record_sep
             count = 0
-            for char in edifile[headpos:headpos + 120]:
+            for char in edifile[headpos:headpos + 120].decode('iso-8859-1'):
                 # search first 120 characters to determine separators
                 if char in '\r\n' and count != 105:
                     continue
@@ -241,22 +359,22 @@ def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
                 elif count == 106:
                     record_sep = char
                     break
-            foundtrailer = re.search(
+            foundtrailer = _mailbagsearch(
                 f"{record_sep}"
-                r"\s*"
+                f"{WHITESPACE}*"
                 "I[\n\r]*E[\n\r]*A"
                 ".+?"
                 f"{re.escape(record_sep)}",
-                edifile[headpos:],
-                re.DOTALL | re.VERBOSE,
+                edifile,
+                headpos,
             )
             if not foundtrailer:
-                foundtrailer2 = re.search(
+                foundtrailer2 = _mailbagsearch(
                     f"{re.escape(record_sep)}"
-                    r"\s*"
+                    f"{WHITESPACE}*"
                     "I[\n\r]*E[\n\r]*A",
-                    edifile[headpos:],
-                    re.DOTALL | re.VERBOSE,
+                    edifile,
+                    headpos,
                 )
                 if foundtrailer2:
                     raise InMessageError(
@@ -264,7 +382,7 @@ def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
                             '[M60]: Found no segment terminator for IEA trailer'
                             ' at position %(pos)s.'
                         ),
-                        {'pos': foundtrailer2.start()},
+                        {'pos': foundtrailer2.start() - headpos},
                     )
                 raise InMessageError(
                     _(
@@ -275,11 +393,12 @@ def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
                 )
         elif found.group('edifact'):
             editype = 'edifact'
-            headpos = startpos + found.start('edifact')
+            headpos = found.start('edifact')
             # parse UNA. valid UNA: UNA:+.? '
             if found.group('UNA'):
+                unastring = found.group('UNAstring').decode('iso-8859-1')
                 count = 0
-                for char in found.group('UNAstring'):
+                for char in unastring:
                     if char in '\r\n':
                         continue
                     count += 1
@@ -289,7 +408,7 @@ def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
                         escape = char
                     elif count == 6:
                         record_sep = char
-                if count != 6 and len(found.group('UNAstring').rstrip()) != 6:
+                if count != 6 and len(unastring.rstrip()) != 6:
                     raise InMessageError(
                         _(
                             '[M55]: Non-valid UNA-segment at position %(pos)s.'
@@ -297,7 +416,7 @@ def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
                         ),
                         {'pos': headpos},
                     )
-                if found.group('field_sep') != field_sep:
+                if found.group('field_sep').decode('iso-8859-1') != field_sep:
                     raise InMessageError(
                         _(
                             '[M56]: Data element separator used in edifact file'
@@ -305,10 +424,10 @@ def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
                         )
                     )
             else:  # no UNA, interpret UNB
-                if found.group('field_sep') == '+':
+                if found.group('field_sep') == b'+':
                     record_sep = "'"
                     escape = "?"
-                elif found.group('field_sep') == '\x1D':
+                elif found.group('field_sep') == b'\x1D':
                     # according to std this was preffered way...
                     # probably quite theoretic...but does no harm
                     record_sep = "\x1C"
@@ -321,18 +440,18 @@ def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
                         )
                     )
             # search trailer
-            foundtrailer = re.search(
+            foundtrailer = _mailbagsearch(
                 f"[^{escape}\n\r]"           # char that is not escape or cr/lf
                 " [\n\r]*?"                  # maybe some cr/lf's
                 f"{record_sep}"              # segment separator
-                r"\s*"                       # whitespace between segments
+                f"{WHITESPACE}*"             # whitespace between segments
                 "U[\n\r]*N[\n\r]*Z"          # UNZ
                 ".+?"                        # any chars
                 f"[^{escape}\n\r]"           # char that is not escape or cr/lf
                 "[\n\r]*?"                   # maybe some cr/lf's
                 f"{re.escape(record_sep)}",  # segment separator
-                edifile[headpos:],
-                re.DOTALL | re.VERBOSE,
+                edifile,
+                headpos,
             )
             if not foundtrailer:
                 raise InMessageError(
@@ -344,19 +463,19 @@ def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
             # ~ field_sep = '='  # the tradacoms 'after-segment-tag-separator'
             record_sep = "'"
             escape = '?'
-            headpos = startpos + found.start('STX')
-            foundtrailer = re.search(
+            headpos = found.start('STX')
+            foundtrailer = _mailbagsearch(
                 f"[^{escape}\n\r]"           # char that is not escape or cr/lf
                 "[\n\r]*?"                   # maybe some cr/lf's
                 f"{record_sep}"              # segment separator
-                r"\s*"                       # whitespace between segments
+                f"{WHITESPACE}*"             # whitespace between segments
                 "E[\n\r]*N[\n\r]*D"
                 ".+?"
                 "[^{escape}\n\r]"            # char that is not escape or cr/lf
                 "[\n\r]*?"                   # maybe some cr/lf's
                 f"{re.escape(record_sep)}",  # segment separator
-                edifile[headpos:],
-                re.DOTALL | re.VERBOSE,
+                edifile,
+                headpos,
             )
             if not foundtrailer:
                 raise InMessageError(
@@ -364,35 +483,10 @@ def mailbag(ta_from, endstatus, frommessagetype, **kwargs):
                     {'pos': headpos},
                 )
         # so: found an interchange (from headerpos until endpos)
-        endpos = headpos + foundtrailer.end()
-        # make transaction for translated message; gets ta_info of ta_frommes
-        ta_to = ta_from.copyta(status=endstatus)
-        tofilename = str(ta_to.idta)
-        filesize = len(edifile[headpos:endpos])
-        with botslib.opendata(tofilename, "w", charset="iso-8859-1") as tofile:
-            tofile.write(edifile[headpos:endpos])
-        # editype is now either edifact, x12 or tradacoms
-        # frommessagetype is the original frommessagetype (from route).
-        # frommessagetype would normally be edifact, x12, tradacoms or mailbag,
-        # but could also be eg ORDERSD96AUNEAN007.
-        # If so, we want to preserve that.
-        if frommessagetype not in ['mailbag', editype]:
-            messagetype = frommessagetype
-        else:
-            messagetype = editype
-        # update outmessage transaction with ta_info;
-        ta_to.update(
-            statust=OK,
-            filename=tofilename,
-            editype=editype,
-            messagetype=messagetype,
-            filesize=filesize,
-        )
+        endpos = foundtrailer.end()
+        yield editype, headpos, endpos
         startpos = endpos
         nr_interchanges += 1
-        botsglobal.logger.debug(
-            _('        File written: "%(tofilename)s".'), {'tofilename': tofilename}
-        )
 
 
 def botsunzip(ta_from, endstatus, password=None, pass_non_zip=False, **kwargs):
@@ -112,7 +112,12 @@ def _translate_one_file(row, routedict, endstatus, userscript, scriptname):
     try:
         ta_fromfile = botslib.OldTransaction(row['idta'])
         ta_parsed = ta_fromfile.copyta(status=PARSED)
-        if row['filesize'] > botsglobal.ini.getint('settings', 'maxfilesizeincoming', 5000000):
+        # streaming translation: messages are parsed and mapped one by one (not for parse & passthrough)
+        streaming_translation = botsglobal.ini.get('settings', 'streaming_translation', None)
+        streaming = bool(streaming_translation) and int(routedict['translateind']) != 3 \
+            and row['editype'] in [editype.strip() for editype in streaming_translation.split(',')]
+        if not streaming \
+                and row['filesize'] > botsglobal.ini.getint('settings', 'maxfilesizeincoming', 5000000):
             ta_parsed.update(filesize=row['filesize'])
             raise FileTooLargeError(
                 _(
@@ -149,6 +154,7 @@ def _translate_one_file(row, routedict, endstatus, userscript, scriptname):
             tomail=row['tomail'],
             idroute=routedict['idroute'],
             command=routedict['command'],
+            streaming=streaming,
         )
         # no exception if infile has been lexed and parsed OK else raises an error
         edifile.checkforerrorlist()
@@ -179,13 +185,16 @@ def _translate_one_file(row, routedict, endstatus, userscript, scriptname):
                     # more than one translation can be done via 'alt';
                     # there is an explicit break if no more translation need to be done.
                     # find/lookup the translation************************
-                    tscript, toeditype, tomessagetype = botslib.lookup_translation(
+                    translation = botslib.lookup_translation_info(
                         fromeditype=inn_splitup.ta_info['editype'],
                         frommessagetype=inn_splitup.ta_info['messagetype'],
                         frompartner=inn_splitup.ta_info['frompartner'],
                         topartner=inn_splitup.ta_info['topartner'],
                         alt=inn_splitup.ta_info['alt'],
-                    )
+                    ) or {}
+                    tscript = translation.get('tscript')
+                    toeditype = translation.get('toeditype')
+                    tomessagetype = translation.get('tomessagetype')
                     if not tscript:
                         # no translation found in translate table;
                         # check if can find translation via user script
@@ -215,6 +224,12 @@ def _translate_one_file(row, routedict, endstatus, userscript, scriptname):
                         status=endstatus, frommail='', tomail='', cc=''
                     )
                     filename_translated = str(ta_translated.idta)
+                    # validation profile set in translation overrules grammar and partner syntax
+                    validation = {
+                        key: translation[key]
+                        for key in ('validation', 'validation_sample')
+                        if translation.get(key) is not None
+                    }
                     # make outmessage object
                     out_translated = outmessage.outmessage_init(
                         editype=toeditype,
@@ -227,6 +242,7 @@ def _translate_one_file(row, routedict, endstatus, userscript, scriptname):
                         statust=OK,
                         divtext=tscript,
                         alt=inn_splitup.ta_info['alt'],
+                        **validation,
                     )
 
                     # run mapping script************************
@@ -288,7 +304,8 @@ def _translate_one_file(row, routedict, endstatus, userscript, scriptname):
                             # use the out-object as inn-object, new out-object
                             # use case: detected error in incoming file;
                             # use out-object to generate warning email
-                            copy_out_message = copy.deepcopy(out_translated)
+                            # copy-on-write copy of tree: shared until changed
+                            copy_out_message = out_translated.cowcopy()
                             handle_out_message(copy_out_message, ta_translated)
                             # out-object is now inn-object
                             inn_splitup = out_translated
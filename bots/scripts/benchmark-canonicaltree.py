@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Benchmark of message._canonicaltree (check of min/max occurences, sort of records conform grammar).
+INVOIC D96A (structure of bots-grammars) with 5000 LIN (each with PIA, QTY, DTM, MOA, PRI);
+fields are not checked.
+Compared with the linear scan of all children for each record in the grammar (bots <= 4.0).
+
+usage: python scripts/benchmark-canonicaltree.py [number of LIN] [path of bots-grammars]
+"""
+import os
+import sys
+import time
+
+from bots import message
+from bots import node
+from bots.botsconfig import BOTSIDNR, ID, LEVEL, MAX, MIN
+
+# structure is compiled with the helper of the tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests'))
+from utilsunit import compilestructure  # noqa: E402  # pylint: disable=wrong-import-position,import-error
+
+
+class Bucketed(message.Message):
+    """_canonicaltree as it is (children in buckets via LEVELINDEX of grammar); fields are not checked."""
+
+    def _canonicalfields(self, node_instance, record_definition):
+        pass
+
+    def add2errorlist(self, errortxt):
+        raise AssertionError(errortxt)
+
+
+class LinearScan(Bucketed):
+    """_canonicaltree with linear scan of children for each record_definition."""
+
+    def _canonicaltree(self, node_instance, structure):
+        sortednodelist = []
+        self._canonicalfields(node_instance, structure)
+        if LEVEL in structure:
+            for record_definition in structure[LEVEL]:
+                count = 0
+                for childnode in node_instance.children:
+                    if childnode.record['BOTSID'] != record_definition[ID] \
+                            or childnode.record['BOTSIDnr'] != record_definition[BOTSIDNR]:
+                        continue
+                    count += 1
+                    self._canonicaltree(childnode, record_definition)
+                    sortednodelist.append(childnode)
+                if record_definition[MIN] > count or record_definition[MAX] < count:
+                    self.add2errorlist(record_definition[ID])
+            node_instance.children = sortednodelist
+
+
+def readstructure(grammarsdir):
+    """structure of INVOIC D96A, processed as by grammar.py (MPATH, BOTSIDnr, lookup tables)."""
+    filename = os.path.join(grammarsdir, 'edifact', 'D96A', 'INVOICD96AUN.py')
+    with open(filename, encoding='utf-8') as handle:
+        # relative imports (recorddefs, syntax) are not needed
+        source = ''.join(line for line in handle if not line.startswith('from .'))
+    namespace = {}
+    exec(compile(source, filename, 'exec'), namespace)  # pylint: disable=exec-used
+    return compilestructure(namespace['structure'], 'INVOICD96AUN')
+
+
+def maketree(numberoflin):
+    """node tree of INVOIC; records of LIN groups in other order than grammar."""
+    root = node.Node({'BOTSID': 'UNH', '0062': '1'})
+    for recordid in ('BGM', 'DTM', 'NAD', 'NAD', 'CUX'):
+        root.append(node.Node({'BOTSID': recordid}))
+    for linenr in range(numberoflin):
+        lin = node.Node({'BOTSID': 'LIN', '1082': str(linenr)})
+        for recordid in ('PRI', 'MOA', 'DTM', 'QTY', 'PIA'):
+            lin.append(node.Node({'BOTSID': recordid}))
+        root.append(lin)
+    for recordid, botsidnr in (('UNT', '1'), ('UNS', '1'), ('MOA', '1'), ('TAX', '2'), ('MOA', '1')):
+        root.append(node.Node({'BOTSID': recordid, 'BOTSIDnr': botsidnr}))
+    return root
+
+
+def timeit(messageclass, structure, numberoflin):
+    root = maketree(numberoflin)
+    messageobject = messageclass({})
+    start = time.perf_counter()
+    messageobject._canonicaltree(root, structure[0])
+    result = time.perf_counter() - start
+    return result, [childnode.record['BOTSID'] for childnode in root.children]
+
+
+def main():
+    numberoflin = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    grammarsdir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'bots-grammars'
+    )
+    structure = readstructure(grammarsdir)
+    results = {}
+    for messageclass in (LinearScan, Bucketed):
+        times = []
+        for _ in range(5):
+            duration, order = timeit(messageclass, structure, numberoflin)
+            times.append(duration)
+        results[messageclass.__name__] = (min(times), order)
+    if results['LinearScan'][1] != results['Bucketed'][1]:
+        raise AssertionError('Order of records is not the same.')
+    print(f'INVOIC D96A with {numberoflin} LIN, _canonicaltree (best of 5):')
+    for name, (duration, _) in results.items():
+        print(f'    {name:12} {duration * 1000:8.1f} ms')
+    print(f'    speedup      {results["LinearScan"][0] / results["Bucketed"][0]:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
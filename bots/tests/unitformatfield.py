@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+compiled formatters of fields (message._compileformatfield, message._formatter):
+same results and error texts as _formatfield; compiled once per grammar, message class and ta_info parameters.
+"""
+
+import types
+import unittest
+
+from bots.botsconfig import FIELDS, MPATH
+from bots.node import Node
+
+try:
+    from utilsunit import STRUCTURE_RECORD, Edifact, EdifactOut, Fixed, FixedOut, field
+except ImportError:
+    from .utilsunit import STRUCTURE_RECORD, Edifact, EdifactOut, Fixed, FixedOut, field
+
+
+def node_instance():
+    node_instance = Node({'BOTSID': 'LIN'})
+    node_instance.linpos_info = (3, 4)
+    return node_instance
+
+
+class Upper(Edifact):
+    def _formatfield(self, value, field_definition, structure_record, node_instance):
+        return super()._formatfield(value, field_definition, structure_record, node_instance).upper()
+
+
+def messageobject(messageclass, defmessage=None, **ta_info):
+    messageobject = messageclass(ta_info)
+    messageobject.defmessage = defmessage
+    return messageobject
+
+
+class TestFormatField(unittest.TestCase):
+
+    def check(self, messageobject, field_definition, value, expect, errors=()):
+        formatter = messageobject._formatter(field_definition)
+        del messageobject.errorlist[:]
+        self.assertEqual(formatter(messageobject, value, STRUCTURE_RECORD, node_instance()), expect)
+        self.assertEqual(messageobject.errorlist, list(errors))
+        # same as _formatfield
+        del messageobject.errorlist[:]
+        self.assertEqual(
+            messageobject._formatfield(value, field_definition, STRUCTURE_RECORD, node_instance()), expect
+        )
+        self.assertEqual(messageobject.errorlist, list(errors))
+
+    def testinmessage(self):
+        inn = messageobject(Edifact, triad='', decimaal=',', lengthnumericbare=True)
+        self.check(inn, field('A', 3), 'abc', 'abc')
+        self.check(
+            inn, field('A', 3), 'abcd', 'abcd',
+            ['[F05] line 3 pos 4: Record "UNH-LIN" field "TEST" too big (max 3): "abcd".\n'],
+        )
+        self.check(
+            inn, field('A', 3, 2), 'a', 'a',
+            ['[F06] line 3 pos 4: Record "UNH-LIN" field "TEST" too small (min 2): "a".\n'],
+        )
+        self.check(inn, field('D'), '20240229', '20240229')
+        self.check(
+            inn, field('D'), '20230229', '20230229',
+            ['[F07] line 3 pos 4: Record "UNH-LIN" date field "TEST" not a valid date: "20230229".\n'],
+        )
+        self.check(inn, field('T'), '2359591', '2359591')
+        self.check(
+            inn, field('T'), '2360', '2360',
+            ['[F08] line 3 pos 4: Record "UNH-LIN" time field "TEST" not a valid time: "2360".\n'],
+        )
+        # length without minus sign and decimal sign
+        self.check(inn, field('R', 3), '1,25-', '-1.25')
+        self.check(
+            inn, field('R', 3), '1,2345', '1.2345',
+            ['[F10] line 3 pos 4: Record "UNH-LIN" field "TEST" too big (max 3): "1,2345".\n'],
+        )
+        self.check(
+            inn, field('R'), '1E5', '1E5',
+            ['[F09] line 3 pos 4: Record "UNH-LIN" field "TEST" has non-numerical content: "1E5".\n'],
+        )
+        self.check(inn, field('N', decimals=2), '0,50', '0.50')
+        self.check(
+            inn, field('N', decimals=2), '0,5', '0.5',
+            ['[F14] line 3 pos 4: Record "UNH-LIN" numeric field "TEST" has invalid nr of decimals: "0.5".\n'],
+        )
+        self.check(inn, field('I', decimals=2), '125', '1.25')
+        self.check(
+            inn, field('I', decimals=2), '1,25', '1.25',
+            [
+                '[F12] line 3 pos 4: Record "UNH-LIN" field "TEST" has format "I"'
+                ' but contains decimal sign: "1.25".\n'
+            ],
+        )
+
+    def testinmessagefixed(self):
+        inn = messageobject(Fixed, triad=',', decimaal='.')
+        # length is not checked
+        self.check(inn, field('A', 3), 'abcd', 'abcd')
+        self.check(inn, field('R', 3), '1,234.5', '1234.5')
+        self.check(
+            inn, field('R'), '1E5', '1E5',
+            ['[F09] line 3 pos 4: Record "UNH-LIN" field "TEST" contains exponent: "1E5".\n'],
+        )
+
+    def testoutmessage(self):
+        out = messageobject(EdifactOut, decimaal=',', lengthnumericbare=True)
+        self.check(out, field('A', 3), 'abc', 'abc')
+        self.check(
+            out, field('A', 3), 'abcd', 'abcd', ['[F20]: Record "UNH-LIN" field "TEST" too big (max 3): "abcd".\n']
+        )
+        self.check(out, field('R', 3), '-1.25', '-1,25')
+        self.check(
+            out, field('R', 3), '-1.255', '-1,255', ['[F28]: Record "UNH-LIN" field "TEST" too big: "-1,255".\n']
+        )
+        self.check(out, field('N', decimals=2), '1.255', '1,26')
+        self.check(out, field('I', decimals=2), '-1.25', '-125')
+        self.check(
+            out, field('N'), 'abc', 'abc',
+            ['[F26]: Record "UNH-LIN" field "TEST" numerical format not valid: "abc".\n'],
+        )
+        self.check(
+            out, field('T', 6), '236000', '236000',
+            ['[F23]: Record "UNH-LIN" time field "TEST" not a valid time: "236000".\n'],
+        )
+        out = messageobject(EdifactOut, decimaal='.', lengthnumericbare=False, json_write_numericals=True)
+        self.check(out, field('R'), '2.50', 2.5)
+        self.check(out, field('N'), '2', 2)
+
+    def testoutmessagefixed(self):
+        out = messageobject(FixedOut, decimaal='.', lengthnumericbare=False)
+        self.check(out, field('A', 5, 5), 'ab', 'ab   ')
+        self.check(out, field('A', 5, 5, fmt='AR'), 'ab', '   ab')
+        self.check(out, field('R', 6, 6), '1.5', '0001.5')
+        self.check(out, field('N', 6, 6, 2, fmt='NR'), '1.5', '  1.50')
+        self.check(out, field('N', 6, 6, 2, fmt='NL'), '1.5', '1.50  ')
+
+    def testshared(self):
+        defmessage = types.SimpleNamespace(formattables={})
+        field_definition = field('R')
+        formatters = []
+        for messageclass, decimaal in [(Edifact, '.'), (Edifact, '.'), (Edifact, ','), (Fixed, '.')]:
+            inn = messageobject(messageclass, defmessage, triad='', decimaal=decimaal, lengthnumericbare=True)
+            inn._formatters = inn._formattable(defmessage)
+            formatters.append(inn._formatter(field_definition))
+        # compiled once for each message class and ta_info parameters
+        self.assertIs(formatters[0], formatters[1])
+        self.assertIsNot(formatters[0], formatters[2])
+        self.assertIsNot(formatters[0], formatters[3])
+        self.assertEqual(len(defmessage.formattables), 3)
+        # grammar without table of compiled formatters: for this message only
+        inn = messageobject(Edifact, types.SimpleNamespace(), triad='', decimaal='.', lengthnumericbare=True)
+        self.assertEqual(inn._formattable(inn.defmessage), {})
+
+    def testcanonicalfields(self):
+        subfields = [field('A', 3, name='C186.6063'), field('N', 15, decimals=2, name='C186.6060')]
+        record_definition = {
+            MPATH: ['UNH', 'LIN'],
+            FIELDS: [
+                field('A', 3, name='BOTSID'),
+                ['C186', False, subfields, None, False, None, None, None, 1],
+                field('D', name='2380'),
+            ],
+        }
+        inn = messageobject(Edifact, triad='', decimaal=',', lengthnumericbare=True)
+        node_instance = Node({'BOTSID': 'LIN', 'C186.6063': '47', 'C186.6060': '12,50', '2380': '20241301'})
+        inn._canonicalfields(node_instance, record_definition)
+        self.assertEqual(node_instance.record['C186.6060'], '12.50')
+        self.assertEqual(
+            inn.errorlist, ['[F07]: Record "UNH-LIN" date field "2380" not a valid date: "20241301".\n']
+        )
+        # compiled once for each record definition
+        self.assertIs(inn._recordformatters(record_definition), inn._recordformatters(record_definition))
+
+    def testtainfo(self):
+        # _formatfield uses current ta_info
+        out = messageobject(EdifactOut, decimaal='.', lengthnumericbare=True)
+        self.check(out, field('R'), '1.5', '1.5')
+        out.ta_info['decimaal'] = ','
+        self.assertEqual(out._formatfield('1.5', field('R'), STRUCTURE_RECORD, node_instance()), '1,5')
+
+    def testsubclassed(self):
+        # subclassed _formatfield is used (and can use compiled format via super)
+        inn = messageobject(Upper, triad='', decimaal='.', lengthnumericbare=True)
+        formatter = inn._formatter(field('A', 3))
+        self.assertEqual(formatter(inn, 'abc', STRUCTURE_RECORD, node_instance()), 'ABC')
+        self.assertEqual(inn.errorlist, [])
+        self.assertEqual(formatter(inn, 'abcd', STRUCTURE_RECORD, node_instance()), 'ABCD')
+        self.assertEqual(len(inn.errorlist), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
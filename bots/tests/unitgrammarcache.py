@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+grammar cache: grammar read from cache is the same as grammar read from grammar file;
+cache is not valid after change of a grammar file.
+grammars in memory: least recently used grammars are dropped; partner syntax.
+grammar manifest: grammars in subdirectories; manifest is updated for changed directories.
+shared record definitions: equal records/fields in grammars of other directories are the same object.
+bulk grammarcheck: report; grammars that are not changed are not checked again.
+"""
+
+import contextlib
+import csv
+import importlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from bots import botsglobal
+from bots import grammar
+from bots import grammarcache
+from bots import grammarcheck
+from bots import grammarmanifest
+from bots.exceptions import BotsImportError
+
+
+RECORDS = '''
+from bots.botsconfig import *
+recorddefs = {
+    'orders': [['BOTSID', 'M', 20, 'A'], ['id', 'M', 20, 'A'], ['date', 'C', 8, 'D']],
+    'line': [['BOTSID', 'M', 20, 'A'], ['num', 'M', 5, 'N'], ['qty', 'C', 8.2, 'N']],
+}
+'''
+ORDERS = '''
+from bots.botsconfig import *
+from .records import recorddefs
+syntax = {'charset': 'latin-1', 'envelope': 'myenvelope'}
+structure = [
+    {ID: 'orders', MIN: 1, MAX: 1, LEVEL: [
+        {ID: 'line', MIN: 0, MAX: 999},
+    ]},
+]
+'''
+
+
+class UsersysTestCase(unittest.TestCase):
+    """usersys with grammars in temporary directory."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.importpath = 'botsunitgrammarcache'
+        os.makedirs(os.path.join(self.tmpdir, self.importpath, 'grammars', 'json'))
+        for filename, content in [('records.py', RECORDS), ('orders.py', ORDERS)]:
+            with open(os.path.join(self.tmpdir, self.importpath, 'grammars', 'json', filename), 'w') as handle:
+                handle.write(content)
+        sys.path.insert(0, self.tmpdir)
+        self.saved = (
+            botsglobal.usersysimportpath,
+            botsglobal.ini.get('directories', 'usersysabs'),
+            botsglobal.ini.get('settings', 'grammar_cache', None),
+            botsglobal.ini.get('settings', 'grammar_cache_dir', None),
+        )
+        botsglobal.usersysimportpath = self.importpath
+        botsglobal.ini.set('directories', 'usersysabs', os.path.join(self.tmpdir, self.importpath))
+        botsglobal.ini.set('settings', 'grammar_cache', 'True')
+        botsglobal.ini.set('settings', 'grammar_cache_dir', os.path.join(self.tmpdir, 'cache'))
+        grammarcache.clear()
+        grammarmanifest.clear()
+
+    def tearDown(self):
+        (
+            botsglobal.usersysimportpath,
+            usersysabs,
+            grammar_cache,
+            grammar_cache_dir,
+        ) = self.saved
+        botsglobal.ini.set('directories', 'usersysabs', usersysabs)
+        for option, value in [('grammar_cache', grammar_cache), ('grammar_cache_dir', grammar_cache_dir)]:
+            if value is None:
+                botsglobal.ini.remove_option('settings', option)
+            else:
+                botsglobal.ini.set('settings', option, value)
+        grammarcache.clear()
+        grammarmanifest.clear()
+        self.forgetmodules()
+        sys.path.remove(self.tmpdir)
+        shutil.rmtree(self.tmpdir)
+
+    def forgetmodules(self):
+        """as in a new process: modules are not imported."""
+        for modulename in list(sys.modules):
+            if modulename.split('.')[0] == self.importpath:
+                del sys.modules[modulename]
+        botsglobal.not_import.clear()
+        importlib.invalidate_caches()
+
+    def writegrammar(self, filename, content):
+        filename = os.path.join(self.tmpdir, self.importpath, filename)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'w') as handle:
+            handle.write(content)
+
+
+class TestGrammarCache(UsersysTestCase):
+
+    def testcache(self):
+        grammarobject = grammar.grammarread('json', 'orders', 'grammars')
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.tmpdir, 'cache')))[0].split('.')[0], 'json'
+        )
+        # new process: grammar is read from cache, without import
+        grammarcache.clear()
+        self.forgetmodules()
+        cachedgrammar = grammar.grammarread('json', 'orders', 'grammars')
+        self.assertNotIn(self.importpath + '.grammars.json.orders', sys.modules)
+        self.assertIsInstance(cachedgrammar, grammar.json)
+        for name in ['syntax', 'structure', 'recorddefs', 'nextmessage', 'grammarname']:
+            self.assertEqual(getattr(cachedgrammar, name), getattr(grammarobject, name), name)
+        # recorddefs are shared by structure and recorddefs
+        self.assertIs(cachedgrammar.structure[0][grammar.FIELDS], cachedgrammar.recorddefs['orders'])
+        # each read gets its own syntax
+        self.assertIsNot(grammar.grammarread('json', 'orders', 'grammars').syntax, cachedgrammar.syntax)
+        # module is imported when used
+        self.assertEqual(cachedgrammar.module.syntax, {'charset': 'latin-1', 'envelope': 'myenvelope'})
+
+    def testchanged(self):
+        grammar.grammarread('json', 'orders', 'grammars')
+        grammarcache.clear()
+        self.assertIsNotNone(grammarcache.load('json', 'orders', 'grammars'))
+        grammarcache.clear()
+        with open(os.path.join(self.tmpdir, self.importpath, 'grammars', 'json', 'records.py'), 'a') as handle:
+            handle.write('# changed\n')
+        self.assertIsNone(grammarcache.load('json', 'orders', 'grammars'))
+        grammar.grammarread('json', 'orders', 'grammars')
+        grammarcache.clear()
+        self.assertIsNotNone(grammarcache.load('json', 'orders', 'grammars'))
+        # no grammar file for envelope 'myenvelope': cache is not valid when this grammar file is added
+        grammarcache.clear()
+        with open(os.path.join(self.tmpdir, self.importpath, 'grammars', 'json', 'myenvelope.py'), 'w') as handle:
+            handle.write("syntax = {'indented': True}\n")
+        self.assertIsNone(grammarcache.load('json', 'orders', 'grammars'))
+        self.forgetmodules()
+        self.assertTrue(grammar.grammarread('json', 'orders', 'grammars').syntax['indented'])
+
+    def testmemory(self):
+        grammarcache.stats.clear()
+        botsglobal.ini.set('settings', 'grammar_memory_size', '2')
+        try:
+            grammarobject = grammar.grammarread('json', 'orders', 'grammars')
+            grammarobject.syntax['indented'] = True
+            grammarobject2 = grammar.grammarread('json', 'orders', 'grammars')
+            self.assertIs(grammarobject2.structure, grammarobject.structure)
+            self.assertFalse(grammarobject2.syntax['indented'])
+            self.assertEqual(grammarcache.stats, {'misses': 1, 'hits': 1})
+            # partner syntax overrules; topartner after frompartner
+            os.makedirs(os.path.join(self.tmpdir, self.importpath, 'partners', 'json'))
+            for partner, content in [
+                    ('from', "{'indented': True, 'charset': 'utf-8'}"),
+                    ('to', "{'charset': 'cp1252'}"),
+            ]:
+                filename = os.path.join(self.tmpdir, self.importpath, 'partners', 'json', partner + '.py')
+                with open(filename, 'w') as handle:
+                    handle.write(f'syntax = {content}\n')
+            self.forgetmodules()
+            grammarobject = grammar.grammarread('json', 'orders', 'grammars', partners=('from', 'to'))
+            self.assertTrue(grammarobject.syntax['indented'])
+            self.assertEqual(grammarobject.syntax['charset'], 'cp1252')
+            grammarobject = grammar.grammarread('json', 'orders', 'grammars', partners=('', 'none'))
+            self.assertEqual(grammarobject.syntax['charset'], 'latin-1')
+            # size is 2: grammar without partners is dropped
+            self.assertEqual(grammarcache.stats['evictions'], 1)
+            grammar.grammarread('json', 'orders', 'grammars')
+            self.assertEqual(grammarcache.stats, {'misses': 4, 'hits': 1, 'evictions': 2})
+            grammarcache.clear()
+            grammar.grammarread('json', 'orders', 'grammars')
+            self.assertEqual(grammarcache.stats['misses'], 5)
+        finally:
+            botsglobal.ini.remove_option('settings', 'grammar_memory_size')
+
+
+class TestGrammarManifest(UsersysTestCase):
+
+    def setUp(self):
+        super().setUp()
+        botsglobal.ini.set('settings', 'grammar_cache', 'False')
+        botsglobal.ini.set('settings', 'grammar_manifest', 'True')
+        self.writegrammar('grammars/json/D1/records.py', RECORDS)
+        self.writegrammar('grammars/json/D1/invoice.py', ORDERS)
+
+    def tearDown(self):
+        botsglobal.ini.remove_option('settings', 'grammar_manifest')
+        super().tearDown()
+
+    def testmanifest(self):
+        self.assertEqual(grammarmanifest.modulename('json', 'orders'), 'orders')
+        self.assertEqual(grammarmanifest.modulename('json', 'invoice'), 'D1.invoice')
+        self.assertEqual(grammarmanifest.modulename('json', 'D1.invoice'), 'D1.invoice')
+        grammarobject = grammar.grammarread('json', 'invoice', 'grammars')
+        self.assertEqual(grammarobject.module.__name__, self.importpath + '.grammars.json.D1.invoice')
+        entry = grammarmanifest.get('json')['grammars']['D1.invoice']
+        self.assertEqual((entry['recorddefs'], entry['envelope']), ('D1.records', 'myenvelope'))
+        self.assertEqual(grammarmanifest.check('json', 'invoice', grammarobject), [])
+        with self.assertRaises(BotsImportError):
+            grammar.grammarread('json', 'desadv', 'grammars')
+        # same process: grammar added in subdirectory is found (manifest is updated)
+        self.writegrammar('grammars/json/D1/desadv.py', ORDERS)
+        self.assertEqual(grammarmanifest.modulename('json', 'desadv'), 'D1.desadv')
+        self.assertIn('D1.desadv', grammarmanifest.get('json')['grammars'])
+        # new process: manifest file is updated
+        grammarmanifest.clear()
+        self.forgetmodules()
+        self.assertEqual(grammarmanifest.modulename('json', 'desadv'), 'D1.desadv')
+        # grammar with same name in directory above is used
+        self.writegrammar('grammars/json/desadv.py', ORDERS)
+        grammarmanifest.clear()
+        self.assertEqual(grammarmanifest.modulename('json', 'desadv'), 'desadv')
+
+    def testcheck(self):
+        self.writegrammar('grammars/json/D1/records2.py', RECORDS)
+        grammarobject = grammar.grammarread('json', 'invoice', 'grammars')
+        # grammar file is changed, directory is not changed: found by check
+        self.writegrammar('grammars/json/D1/invoice.py', ORDERS.replace('.records', '.records2'))
+        grammarmanifest.clear()
+        self.assertEqual(grammarmanifest.get('json')['grammars']['D1.invoice']['recorddefs'], 'D1.records')
+        errors = grammarmanifest.check('json', 'invoice', grammarobject)
+        self.assertEqual(len(errors), 2, errors)
+        self.assertIn('out of date', errors[0])
+        self.assertIn('recorddefs', errors[1])
+        self.assertEqual(grammarmanifest.get('json')['grammars']['D1.invoice']['recorddefs'], 'D1.records2')
+
+
+class TestInternRecorddefs(UsersysTestCase):
+
+    def setUp(self):
+        super().setUp()
+        botsglobal.ini.set('settings', 'grammar_cache', 'False')
+        botsglobal.ini.set('settings', 'grammar_intern', 'True')
+        grammarcache.internstats.clear()
+        for directory in ['D1', 'D2']:
+            self.writegrammar(f'grammars/json/{directory}/records.py', RECORDS)
+            self.writegrammar(f'grammars/json/{directory}/orders.py', ORDERS)
+
+    def tearDown(self):
+        botsglobal.ini.remove_option('settings', 'grammar_intern')
+        grammarcache.internstats.clear()
+        super().tearDown()
+
+    def testintern(self):
+        grammar1 = grammar.grammarread('json', 'D1.orders', 'grammars')
+        grammar2 = grammar.grammarread('json', 'D2.orders', 'grammars')
+        self.assertIsNot(grammar1.module.recorddefs, grammar2.module.recorddefs)
+        self.assertIs(grammar1.recorddefs['line'], grammar2.recorddefs['line'])
+        self.assertIs(grammar1.structure[0][grammar.FIELDS], grammar2.recorddefs['orders'])
+        # same field in other records
+        self.assertIs(grammar1.recorddefs['line'][0], grammar1.recorddefs['orders'][0])
+        self.assertIsInstance(grammar1.recorddefs['line'], tuple)
+        self.assertGreater(grammarcache.internstats['json/D2'], grammarcache.internstats['json/D1'])
+        grammarobject = grammar.grammarread('json', 'orders', 'grammars')
+        self.assertIs(grammarobject.recorddefs['line'], grammar1.recorddefs['line'])
+        # equal but not the same type (3 == 3.0): not shared
+        recorddefs1 = {'A': [['BOTSID', 1, 3, 'A', True, 0, 0, 'A', 1], ['f', 0, 3, 'A', True, 0, 0, 'A', 1]]}
+        recorddefs2 = {'A': [['BOTSID', 1, 3, 'A', True, 0, 0, 'A', 1], ['f', 0, 3.0, 'A', True, 0, 0, 'A', 1]]}
+        grammarcache.internrecorddefs(recorddefs1, 'json/X1')
+        grammarcache.internrecorddefs(recorddefs2, 'json/X2')
+        self.assertEqual(recorddefs1['A'], recorddefs2['A'])
+        self.assertIsNot(recorddefs1['A'], recorddefs2['A'])
+        self.assertIs(recorddefs1['A'][0], recorddefs2['A'][0])
+        self.assertIsInstance(recorddefs2['A'][1][2], float)
+
+
+class TestGrammarcheckMulti(UsersysTestCase):
+
+    def setUp(self):
+        super().setUp()
+        botsglobal.ini.set('settings', 'grammar_cache', 'False')
+        self.writegrammar('grammars/json/D1/records.py', RECORDS)
+        self.writegrammar('grammars/json/D1/invoice.py', ORDERS)
+        # no MAX in structure
+        self.writegrammar('grammars/json/bad.py', ORDERS.replace(', MAX: 999', ''))
+        self.grammardir = os.path.join(self.tmpdir, self.importpath, 'grammars', 'json', '**', '*.py')
+
+    def checkmulti(self, processes, report):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return grammarcheck.checkmulti(self.grammardir, 'json', processes, os.path.join(self.tmpdir, report))
+
+    def testcheckmulti(self):
+        self.assertEqual(self.checkmulti(1, 'report.csv'), 1)
+        with open(os.path.join(self.tmpdir, 'report.csv'), newline='') as handle:
+            rows = {row['grammar']: row for row in csv.DictReader(handle)}
+        self.assertEqual(sorted(rows), ['D1.invoice', 'bad', 'orders'])
+        self.assertEqual(
+            [rows['D1.invoice'][field] for field in ('status', 'cached', 'depth', 'records')], ['OK', 'False', '2', '2']
+        )
+        self.assertEqual(rows['bad']['status'], 'error')
+        self.assertIn('MAX', rows['bad']['errors'])
+        # grammars that are OK and not changed are not checked again; check in 2 processes
+        grammarcache.clear()
+        self.forgetmodules()
+        with open(os.path.join(self.tmpdir, self.importpath, 'grammars', 'json', 'records.py'), 'a') as handle:
+            handle.write('# changed\n')
+        self.assertEqual(self.checkmulti(2, 'report.json'), 1)
+        with open(os.path.join(self.tmpdir, 'report.json')) as handle:
+            rows = {row['grammar']: row for row in json.load(handle)}
+        self.assertEqual([rows[name]['cached'] for name in ('D1.invoice', 'bad', 'orders')], [True, False, False])
+        self.assertEqual(rows['orders']['status'], 'OK')
+        self.assertGreater(rows['orders']['loadtime'], 0)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+lexers for var editypes: bulk lexer (and csv module lexer for csv) gives same lex_records and errors as the character lexer.
+fixed: edi file is read in blocks, gives same lines as reading line by line.
+"""
+
+import codecs
+import gc
+import os
+import tempfile
+import unittest
+
+from bots import inmessage
+from bots.exceptions import InMessageError
+from bots.botsconfig import VALUE, SFIELD, FIXEDLINE
+
+
+EDIFACT = dict(
+    record_sep="'", field_sep='+', record_tag_sep='', sfield_sep=':', reserve='*',
+    escape='?', quote_char='', skip_char='\r\n',
+)
+X12 = dict(
+    record_sep='~', field_sep='*', record_tag_sep='', sfield_sep='>', reserve='^',
+    escape='', quote_char='', skip_char='\r\n',
+)
+X12_NEWLINE = dict(
+    record_sep='\n', field_sep='*', record_tag_sep='', sfield_sep=':', reserve='',
+    escape='', quote_char='', skip_char='\r',
+)
+TRADACOMS = dict(
+    record_sep="'", field_sep='+', record_tag_sep='=', sfield_sep=':', reserve='',
+    escape='?', quote_char='', skip_char='\r\n',
+)
+CSV = dict(
+    record_sep='\r\n', field_sep=',', record_tag_sep='', sfield_sep='', reserve='',
+    escape='', quote_char='"', skip_char='',
+)
+CSV_TAB = dict(
+    record_sep='\r\n', field_sep='\t', record_tag_sep='', sfield_sep='', reserve='',
+    escape='', quote_char='"', skip_char='',
+)
+
+
+def makeobject(classtocall, syntax, rawinput, **kwargs):
+    ediobject = classtocall({'editype': classtocall.__name__, 'messagetype': ''})
+    ediobject.ta_info.update(syntax, strict_syntax_check=False, allow_lastrecordnotclosedproperly=False)
+    ediobject.ta_info.update(kwargs)
+    ediobject.rawinput = rawinput
+    return ediobject
+
+
+def lex(classtocall, syntax, rawinput, engine, **kwargs):
+    """lex rawinput with lexer engine; return lex_records as tuples, or the error."""
+    ediobject = makeobject(classtocall, syntax, rawinput, **kwargs)
+    try:
+        lex_records = list(getattr(ediobject, engine)())
+    except Exception as exc:
+        return str(exc)
+    lineindex = inmessage.LineIndex(rawinput)
+    return [
+        [(token.value, token.sfield) + lineindex.linpos(lex_record.offset + token.pos) for token in lex_record]
+        for lex_record in lex_records
+    ]
+
+
+class TestLexer(unittest.TestCase):
+
+    def assertsame(self, classtocall, syntax, rawinput, **kwargs):
+        expect = lex(classtocall, syntax, rawinput, '_lex_char', **kwargs)
+        result = lex(classtocall, syntax, rawinput, '_lex_bulk', **kwargs)
+        self.assertEqual(expect, result, repr(rawinput))
+        return result
+
+    def testedifact(self):
+        result = self.assertsame(
+            inmessage.edifact, EDIFACT,
+            "UNB+UNOA:2+SENDER+RECEIVER'\r\nUNH+1+ORDERS:D:96A:UN'\r\nFTX+AAI+++text?'quoted?+more'\r\nUNT+2+1'",
+        )
+        self.assertEqual(result[0][1:3], [('UNOA', 0, 1, 5), ('2', 1, 1, 10)])
+        self.assertEqual(result[2][4], ("text'quoted+more", 0, 3, 11))
+        self.assertsame(inmessage.edifact, EDIFACT, "UNH+1'FTX+A*B*:C+++D'\r\n'UNT+1'")
+        # wrapped to lines of fixed length
+        self.assertsame(inmessage.edifact, EDIFACT, "UNH+1+OR\r\nDERS'FTX+AA\r\nI'")
+        # last record not closed
+        self.assertsame(inmessage.edifact, EDIFACT, "UNH+1'UNT+1")
+        self.assertsame(inmessage.edifact, EDIFACT, "UNH+1'UNT+1", allow_lastrecordnotclosedproperly=True)
+        self.assertsame(inmessage.edifact, EDIFACT, "UNH+1'UNT+\x1a")
+
+    def testx12(self):
+        self.assertsame(inmessage.x12, X12, 'ISA*00*  *00~\nGS*PO*S*R~\nN1*ST*NAME>A^B*~\n\nSE*2*1~   \n')
+        self.assertsame(inmessage.x12, X12_NEWLINE, 'ISA*00*  *00\r\nGS*PO*S*R\n\nN1*ST**\nSE*2*1*\n')
+        self.assertsame(inmessage.x12, X12, 'ST*850~  BEG*00~')
+
+    def testtradacoms(self):
+        self.assertsame(inmessage.tradacoms, TRADACOMS, "STX=ANA:1+5000000000000:SENDER'MHD=1+ORDHDR:9'OTR=?+1'\n")
+
+    def testcsv(self):
+        self.assertsame(inmessage.csv, CSV, 'HEAD,1,2\r\nLIN,"quoted, with sep",3\r\n,,\r\nLIN,"multi\r\nline",""""\r\n')
+        self.assertsame(inmessage.csv, CSV_TAB, '\tB\tC\r\n\t\t\r\nA\tB', allow_lastrecordnotclosedproperly=True)
+
+    def testcsvlib(self):
+        # csv module engine gives same lex_records as the character lexer
+        for rawinput in (
+                'HEAD,1,2\r\nLIN,"quoted, with sep",3\r\n\r\n,,\r\nLIN,"multi\r\nline",""""\r\n',
+                'LIN,"",""\r\n"only"\nLIN,a"b,c\r',
+                # lexed as bots does: spaces before record or quote, chars after end quote
+                '  LIN,1\r\n   \r\nLIN,  "A",B\r\nLIN,"A"B,C\r\nLIN,""x,y\r\n',
+                # quote not closed
+                'LIN,"A\r\nLIN,B\r\n',
+                # last record not closed
+                'LIN,1\r\nLIN,"2"',
+        ):
+            expect = lex(inmessage.csv, CSV, rawinput, '_lex_char')
+            self.assertEqual(lex(inmessage.csv, CSV, rawinput, '_lex_csvlib'), expect, repr(rawinput))
+        rawinput = 'A\tB\r\n\t\tC\r\n"A"\t"B"\r\nA\tB'
+        expect = lex(inmessage.csv, CSV_TAB, rawinput, '_lex_char', allow_lastrecordnotclosedproperly=True)
+        self.assertEqual(
+            lex(inmessage.csv, CSV_TAB, rawinput, '_lex_csvlib', allow_lastrecordnotclosedproperly=True), expect
+        )
+        self.assertEqual(expect[-1], [('A', 0, 4, 1), ('B', 0, 4, 3)])
+
+    def testerrors(self):
+        # space between records
+        result = self.assertsame(inmessage.x12, X12, 'ST*850~ BEG*00~', strict_syntax_check=True)
+        self.assertTrue(result.startswith('[A67]'), result)
+        # double record separator
+        result = self.assertsame(inmessage.edifact, EDIFACT, "UNH+1''UNT+1'", strict_syntax_check=True)
+        self.assertTrue(result.startswith('[A69]'), result)
+        # data after last record
+        result = self.assertsame(inmessage.edifact, EDIFACT, "UNH+1'UNT+1")
+        self.assertTrue(result.startswith('[A51]'), result)
+        result = self.assertsame(inmessage.edifact, EDIFACT, "UNH+1'UNT+1?'")
+        self.assertTrue(result.startswith('[A51]'), result)
+
+    def teststreaming(self):
+        # lex_records are yielded one by one; error at end of edi file comes after the first lex_records
+        for engine in ('_lex_char', '_lex_bulk'):
+            lex_records = getattr(makeobject(inmessage.edifact, EDIFACT, "UNH+1'UNT+1"), engine)()
+            self.assertEqual(next(lex_records)[0].value, 'UNH')
+            self.assertRaises(InMessageError, list, lex_records)
+
+
+class TestFixed(unittest.TestCase):
+
+    def testreadlines(self):
+        # lines are read in blocks; same lines as reading the file line by line
+        content = 'HEA1\r\nLIN\x0c2\rLIN3\n\nLIN\u20ac4\r\n\r\nTRL'
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'fixed.txt')
+            with open(filename, 'w', encoding='utf-8', newline='') as filehandler:
+                filehandler.write(content)
+            with codecs.open(filename, 'r', 'utf-8') as filehandler:
+                expect = list(filehandler)
+            for size in (1, 2, 5, 65536):
+                ediobject = inmessage.fixed({'editype': 'fixed', 'messagetype': ''})
+                with codecs.open(filename, 'r', 'utf-8') as ediobject.filehandler:
+                    self.assertEqual(list(ediobject._readlines(size)), expect)
+
+
+class TestLexToken(unittest.TestCase):
+
+    def testindex(self):
+        token = inmessage.LexToken('ABC', 1, 7, '0123')
+        self.assertEqual((token[VALUE], token[SFIELD], token[FIXEDLINE]), ('ABC', 1, '0123'))
+        token[VALUE] = 'XYZ'
+        self.assertEqual(token.value, 'XYZ')
+        self.assertRaises(KeyError, token.__getitem__, 9)
+
+    def testfromdict(self):
+        token = inmessage.LexToken.fromdict({VALUE: 'BOTSID', 2: 2, 3: 0})
+        self.assertEqual((token.value, token.sfield, token.pos, token.fixedline), ('BOTSID', 0, 0, None))
+
+
+    def testgarbagecollection(self):
+        # garbage collection is set back as it was
+        self.assertTrue(gc.isenabled())
+        with inmessage._nogarbagecollection():
+            self.assertFalse(gc.isenabled())
+        self.assertTrue(gc.isenabled())
+        gc.disable()
+        try:
+            with inmessage._nogarbagecollection():
+                pass
+            self.assertFalse(gc.isenabled())
+        finally:
+            gc.enable()
+
+class TestLineIndex(unittest.TestCase):
+
+    def testlinpos(self):
+        lineindex = inmessage.LineIndex('AB\nCD\n\nE')
+        self.assertEqual(lineindex.linpos(0), (1, 1))
+        self.assertEqual(lineindex.linpos(1), (1, 2))
+        # a newline itself counts as position 0 of the next line (as the lexers always did)
+        self.assertEqual(lineindex.linpos(2), (2, 0))
+        self.assertEqual(lineindex.linpos(4), (2, 2))
+        self.assertEqual(lineindex.linpos(7), (4, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+mailbag: split up interchanges (edifact, x12, tradacoms) in bytes of edi file; errors M50-M60.
+mailbag_batch: new transactions with one commit (sqlite database in memory).
+"""
+
+import os
+import unittest
+
+from bots import botsglobal
+from bots import botslib
+from bots import botssqlite
+from bots import preprocess
+from bots.exceptions import InMessageError
+
+
+EDIFACT = b"UNB+UNOA:1+SENDER+RECEIVER+200101:1253+1'UNH+1+ORDERS:D:96A:UN'UNT+2+1'UNZ+1+1'"
+EDIFACT_UNA = b"UNA:*.? ~UNB*UNOA:1*SENDER*RECEIVER~UNZ*1*1~"
+X12 = (
+    b'ISA*00*          *00*          *ZZ*SENDER         *ZZ*RECEIVER       '
+    b'*200101*1253*U*00401*000000001*0*P*>~GS*PO*S*R~IEA*1*000000001~'
+)
+TRADACOMS = b"STX=ANA:1+SENDER+RECEIVER'MHD=1+ORDHDR:9'END=1'"
+
+
+def interchanges(edifile, frommessagetype='mailbag'):
+    """return list of (editype, interchange)."""
+    return [
+        (editype, edifile[headpos:endpos])
+        for editype, headpos, endpos in preprocess.mailbag_interchanges(edifile, frommessagetype)
+    ]
+
+
+class TestMailbag(unittest.TestCase):
+
+    def testsplit(self):
+        edifile = b' \r\n' + EDIFACT + b'\n' + X12 + b'\r\n' + TRADACOMS + EDIFACT_UNA + b'\r\n\x1a'
+        self.assertEqual(
+            interchanges(edifile),
+            [('edifact', EDIFACT), ('x12', X12), ('tradacoms', TRADACOMS), ('edifact', EDIFACT_UNA)],
+        )
+        # many interchanges; positions are in the complete edi file
+        self.assertEqual(interchanges(EDIFACT * 1000), [('edifact', EDIFACT)] * 1000)
+        # whitespace as for unicode \s (not only ascii whitespace)
+        self.assertEqual(interchanges(b'\x85\xa0' + X12), [('x12', X12)])
+
+    def testxml(self):
+        edifile = b'\xef\xbb\xbf<?xml version="1.0"?><root/>'
+        self.assertEqual(list(preprocess.mailbag_interchanges(edifile, 'mailbag')), [('xml', 0, len(edifile))])
+
+    def testerrors(self):
+        for edifile, errorcode in [
+                (EDIFACT + b'XXX', '[M50]: Found data not in a valid interchange at position 79.'),
+                (b'XXX', '[M51]'),
+                (b'<root/>', '[M51]'),          # only for frommessagetype mailbag
+                (b' \r\n\x00', '[M52]'),
+                (X12[:6] + b'|' + X12[7:], '[M53]: Non-valid ISA header at position 0; position 7 of ISA is "|"'),
+                (X12[:-len(b'IEA*1*000000001~')], '[M54]'),
+                (b"UNA:+.? UNB+X'UNZ+1'", '[M55]'),
+                (b"UNA:+.? 'UNB*X'UNZ*1'", '[M56]'),
+                (b"UNB*X'UNZ*1'", '[M57]'),
+                (EDIFACT[:-len(b"UNZ+1+1'")], '[M58]'),
+                (TRADACOMS[:-len(b"END=1'")], '[M59]'),
+                (X12[:-1], '[M60]'),
+        ]:
+            with self.assertRaises(InMessageError) as context:
+                interchanges(edifile, 'edifact' if edifile == b'<root/>' else 'mailbag')
+            self.assertTrue(str(context.exception).startswith(errorcode), str(context.exception))
+
+
+class TestMailbagBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.db = botsglobal.db
+        botsglobal.db = botssqlite.connect(':memory:')
+        sqlfile = os.path.join(os.path.dirname(botslib.__file__), 'sql', 'ta.sqlite.sql')
+        with open(sqlfile, encoding='utf-8') as handle:
+            botsglobal.db.executescript(handle.read())
+
+    def tearDown(self):
+        botsglobal.db.close()
+        botsglobal.db = self.db
+
+    def testcopytas(self):
+        ta_from = botslib.NewTransaction(filename='in', status=200, editype='mailbag', idroute='route')
+        tas_to = ta_from.copytas(status=210, number=3)
+        self.assertEqual(len({ta_to.idta for ta_to in tas_to}), 3)
+        botslib.updatetas([
+            {'idta': ta_to.idta, 'editype': 'edifact', 'filename': str(ta_to.idta), 'filesize': count, 'unknown': 1}
+            for count, ta_to in enumerate(tas_to)
+        ])
+        rows = botslib.query(
+            'SELECT idta,parent,status,editype,idroute,filename,filesize FROM ta WHERE parent=%(idta)s ORDER BY idta',
+            {'idta': ta_from.idta},
+        )
+        self.assertEqual(
+            [tuple(row) for row in rows],
+            [
+                (ta_to.idta, ta_from.idta, 210, 'edifact', 'route', str(ta_to.idta), count)
+                for count, ta_to in enumerate(tas_to)
+            ],
+        )
+        self.assertEqual(botslib.updatetas([]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+compiled mpath (node.Mpath): same results as mpath of dicts for get, getloop, put, putloop;
+checks are done when compiled; dicts of mpath are not changed.
+"""
+
+import unittest
+
+from bots.botsconfig import BOTSIDNR, FIELDS, ID, LEVEL
+from bots.exceptions import MappingFormatError
+from bots.node import Mpath, Node
+
+try:
+    from utilsunit import field
+except ImportError:
+    from .utilsunit import field
+
+
+def tree():
+    root = Node({'BOTSID': 'UNH', '0062': '1'})
+    root.put({'BOTSID': 'UNH'}, {'BOTSID': 'BGM', '1004': 'ORDER1'})
+    for i in range(3):
+        lin = root.putloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'})
+        lin.put({'BOTSID': 'LIN', '1082': str(i + 1)})
+        lin.put({'BOTSID': 'LIN'}, {'BOTSID': 'QTY', 'C186.6063': '21', 'C186.6060': f'{i}.5'})
+    return root
+
+
+STRUCTURE = {
+    ID: 'UNH',
+    BOTSIDNR: '1',
+    FIELDS: [field('A', name='BOTSID'), field('A', name='0062')],
+    LEVEL: [
+        {ID: 'BGM', BOTSIDNR: '1', FIELDS: [field('A', name='BOTSID'), field('A', name='1004')]},
+        {ID: 'LIN', BOTSIDNR: '1', FIELDS: [field('A', name='BOTSID'), field('A', name='1082')]},
+    ],
+}
+
+
+class TestMpath(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = Node.checklevel
+        Node.checklevel = 1
+
+    def tearDown(self):
+        Node.checklevel = self.saved
+
+    def testget(self):
+        root = tree()
+        for mpaths in [
+            ({'BOTSID': 'UNH'}, {'BOTSID': 'BGM', '1004': None}),
+            ({'BOTSID': 'UNH'}, {'BOTSID': 'BGM'}),
+            ({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '2'}, {'BOTSID': 'QTY', 'C186.6060': None}),
+            ({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '2'}, {'BOTSID': 'QTY', 'C186.6061': None}),
+            ({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '9'}),
+            ({'BOTSID': 'UNH', '0062': '2'}, {'BOTSID': 'BGM'}),
+        ]:
+            query = Mpath(*mpaths)
+            self.assertEqual(root.get(query), root.get(*mpaths), mpaths)
+        self.assertEqual(root.get(Mpath({'BOTSID': 'UNH'}, {'BOTSID': 'BGM', '1004': None})), 'ORDER1')
+        # dicts passed are not changed
+        mpath = {'BOTSID': 'LIN'}
+        lin = Mpath({'BOTSID': 'UNH'}, mpath)
+        self.assertEqual(mpath, {'BOTSID': 'LIN'})
+        self.assertEqual(
+            [node.get(Mpath({'BOTSID': 'LIN', '1082': None})) for node in root.getloop(lin)], ['1', '2', '3']
+        )
+        self.assertEqual(root.getcountoccurrences(lin), 3)
+        qty = Mpath({'BOTSID': 'LIN'}, {'BOTSID': 'QTY', 'C186.6060': None})
+        self.assertEqual([str(node.getdecimal(qty)) for node in root.getloop(lin)], ['0.5', '1.5', '2.5'])
+
+    def testput(self):
+        bgm = Mpath({'BOTSID': 'UNH'}, {'BOTSID': 'BGM', '1004': ' ORDER1 '})
+        lin = Mpath({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'})
+        root1 = Node({'BOTSID': 'UNH'})
+        root2 = Node({'BOTSID': 'UNH'})
+        self.assertTrue(root1.put(bgm))
+        self.assertTrue(root2.put(bgm))
+        self.assertEqual(root1.children[0].record, {'BOTSID': 'BGM', 'BOTSIDnr': '1', '1004': 'ORDER1'})
+        self.assertIsNot(root1.children[0].record, root2.children[0].record)
+        # other value: other BGM (as with mpath of dicts)
+        root1.put(bgm, strip=False)
+        self.assertEqual([node.record['1004'] for node in root1.children], ['ORDER1', ' ORDER1 '])
+        # putloop: new node every time
+        node1 = root1.putloop(lin)
+        node2 = root1.putloop(lin)
+        self.assertIsNot(node1, node2)
+        self.assertIsNot(node1.record, node2.record)
+        node1.put(Mpath({'BOTSID': 'LIN', '1082': '1'}))
+        self.assertEqual(node2.record, {'BOTSID': 'LIN', 'BOTSIDnr': '1'})
+        self.assertFalse(root1.put(Mpath({'BOTSID': 'UNH'}, {'BOTSID': 'BGM', '1004': None})))
+
+    def testerrors(self):
+        for mpaths in [
+            (),
+            ({'BOTSID': 'UNH', '0062': None}, {'BOTSID': 'BGM'}),
+            ({'BOTSID': 'UNH'}, {'BOTSID': 'BGM', '1004': None, '1225': None}),
+            ({'BOTSID': 'UNH'}, {'1004': None}),
+            ({'BOTSID': 'UNH'}, {'BOTSID': 'BGM', '1004': 9}),
+            ({'BOTSID': 'UNH'}, 'BGM'),
+        ]:
+            with self.assertRaises(MappingFormatError, msg=mpaths):
+                Mpath(*mpaths)
+        with self.assertRaises(MappingFormatError):
+            list(tree().getloop(Mpath({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': None})))
+
+    def testgrammar(self):
+        Node.checklevel = 2
+        root = tree()
+        root.structure = STRUCTURE
+        self.assertEqual(root.compile_mpath({'BOTSID': 'UNH'}, {'BOTSID': 'BGM', '1004': None}).target, '1004')
+        with self.assertRaises(MappingFormatError):
+            root.compile_mpath({'BOTSID': 'UNH'}, {'BOTSID': 'BGM', '4343': None})
+        # compiled without node: checked with grammar when used
+        query = Mpath({'BOTSID': 'UNH'}, {'BOTSID': 'DTM'})
+        with self.assertRaises(MappingFormatError):
+            root.get(query)
+
+
+if __name__ == '__main__':
+    unittest.main()
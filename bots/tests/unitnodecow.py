@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+copy-on-write node trees (node.cowcopy, CowNode, message.cowcopy):
+records and children are shared until changed via put, putloop, change, delete, stripnode, writablerecord.
+"""
+
+import unittest
+
+from bots.message import Message
+from bots.node import CowNode, Node, Record
+
+
+def tree():
+    root = Node({'BOTSID': 'UNH', '0062': 'MSG1'})
+    for linenr in ('1', '2', '3'):
+        lin = root.putloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'})
+        lin.put({'BOTSID': 'LIN', '1082': linenr})
+        lin.put({'BOTSID': 'LIN'}, {'BOTSID': 'QTY', 'C186.6060': linenr + '0'})
+    return root
+
+
+def content(node_instance):
+    return (dict(node_instance.record), [content(childnode) for childnode in node_instance.children])
+
+
+class TestNodeCow(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = Node.checklevel
+        Node.checklevel = 1
+
+    def tearDown(self):
+        Node.checklevel = self.saved
+
+    def testshared(self):
+        root = tree()
+        expect = content(root)
+        copy1 = root.cowcopy()
+        copy2 = root.cowcopy()
+        self.assertIsInstance(copy1, CowNode)
+        self.assertIs(copy1.record, root.record)
+        # reading does not copy records
+        self.assertEqual(copy1.get({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '3'}, {'BOTSID': 'QTY', 'C186.6060': None}), '30')
+        self.assertEqual(content(copy1), expect)
+        self.assertIs(copy1.children[0].record, root.children[0].record)
+        self.assertIsNot(copy1.children[0], root.children[0])
+        self.assertIsInstance(copy1.children[0].children[0], CowNode)
+        # changes in one copy are not in other copy or original
+        copy1.put({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '1', 'C212.7140': 'ART1'})
+        copy1.change(where=({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '2'}), change={'1082': '22'})
+        copy1.delete({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '3'})
+        copy1.putloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '4'})
+        self.assertEqual(content(root), expect)
+        self.assertEqual(content(copy2), expect)
+        self.assertEqual(
+            [lin.get({'BOTSID': 'LIN', '1082': None}) for lin in copy1.getloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'})],
+            ['1', '22', '4'],
+        )
+        self.assertEqual(copy1.get({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '1', 'C212.7140': None}), 'ART1')
+        # not changed: record still shared
+        self.assertIs(copy1.children[0].children[0].record, root.children[0].children[0].record)
+
+    def testcopyofcopy(self):
+        root = tree()
+        copy1 = root.cowcopy()
+        lin = next(copy1.getloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '1'}))
+        lin.put({'BOTSID': 'LIN', '7140': 'X'})
+        copy2 = copy1.cowcopy()
+        copy3 = copy1.cowcopy()
+        copy2.change(where=({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '1'}), change={'7140': 'Y'})
+        self.assertEqual(copy3.get({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '1', '7140': None}), 'X')
+        self.assertEqual(copy2.get({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '1', '7140': None}), 'Y')
+        self.assertNotIn('7140', root.children[0].record)
+
+    def teststripnode(self):
+        root = Node({'BOTSID': 'HEA', 'F1': ' a '})
+        root.put({'BOTSID': 'HEA'}, {'BOTSID': 'LIN', 'F2': 'b'})
+        root.children[0].record['F2'] = ' b '
+        copy1 = root.cowcopy()
+        copy1.stripnode()
+        self.assertEqual(content(copy1), ({'BOTSID': 'HEA', 'BOTSIDnr': '1', 'F1': 'a'}, [({'BOTSID': 'LIN', 'BOTSIDnr': '1', 'F2': 'b'}, [])]))
+        self.assertEqual(root.record['F1'], ' a ')
+        self.assertEqual(root.children[0].record['F2'], ' b ')
+
+    def testwritablerecord(self):
+        root = Node({'BOTSID': 'UNH'})
+        self.assertIs(root.writablerecord(), root.record)
+        copy1 = root.cowcopy()
+        record = copy1.writablerecord()
+        self.assertIsNot(record, root.record)
+        self.assertIs(copy1.writablerecord(), record)
+        record['0062'] = '1'
+        self.assertNotIn('0062', root.record)
+        # compact record stays compact record
+        index = {'BOTSIDnr': 0, 'BOTSID': 1, '0062': 2}
+        root = Node(Record(index, {'BOTSID': 'UNH', '0062': '1', 'XX': 'y'}))
+        copy1 = root.cowcopy()
+        record = copy1.writablerecord()
+        self.assertIsInstance(record, Record)
+        self.assertIs(record.index, index)
+        del record['XX']
+        record['0062'] = '2'
+        self.assertEqual(dict(root.record), {'BOTSIDnr': '1', 'BOTSID': 'UNH', '0062': '1', 'XX': 'y'})
+        self.assertEqual(dict(record), {'BOTSIDnr': '1', 'BOTSID': 'UNH', '0062': '2'})
+
+    def testchildren(self):
+        root = tree()
+        copy1 = root.cowcopy()
+        copy1.children = copy1.children[::-1]
+        copy1.children.remove(copy1.children[0])
+        self.assertEqual(len(root.children), 3)
+        self.assertEqual([lin.record['1082'] for lin in copy1.children], ['2', '1'])
+        copy1.sort({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': None})
+        self.assertEqual([lin.record['1082'] for lin in copy1.children], ['1', '2'])
+        self.assertEqual([lin.record['1082'] for lin in root.children], ['1', '2', '3'])
+
+    def testmessage(self):
+        inn = Message({'editype': 'edifact', 'messagetype': 'ORDERS'})
+        inn.root = tree()
+        original = inn.root
+        expect = content(original)
+        inn.defmessage = object()
+        out = inn.cowcopy()
+        self.assertIsNot(out.ta_info, inn.ta_info)
+        self.assertEqual(out.ta_info, inn.ta_info)
+        self.assertIs(out.defmessage, inn.defmessage)
+        self.assertIsInstance(out.root, CowNode)
+        self.assertIsInstance(inn.root, CowNode)
+        self.assertIsNot(out.root, inn.root)
+        out.root.put({'BOTSID': 'UNH', '0062': 'MSG1'}, {'BOTSID': 'LIN', '1082': '1', '7140': 'X'})
+        inn.root.put({'BOTSID': 'UNH', '0062': 'MSG1'}, {'BOTSID': 'LIN', '1082': '1', '7140': 'Y'})
+        self.assertEqual(out.root.get({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '1', '7140': None}), 'X')
+        self.assertEqual(inn.root.get({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '1', '7140': None}), 'Y')
+        self.assertEqual(content(original), expect)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+index of children of node (bots.ini node_childindex): get, getloop, put, putloop, delete, sort, change
+give the same results as without index; index is not used after children is changed.
+"""
+
+import unittest
+
+from bots.node import Node
+
+
+def tree(lines=20):
+    root = Node({'BOTSID': 'UNH', '0062': '1'})
+    root.put({'BOTSID': 'UNH'}, {'BOTSID': 'BGM', '1004': 'ORDER1'})
+    root.put({'BOTSID': 'UNH'}, {'BOTSID': 'DTM', 'BOTSIDnr': '2', 'C507.2380': '20240101'})
+    for i in range(lines):
+        lin = root.putloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'})
+        lin.put({'BOTSID': 'LIN', '1082': str(i), 'C212.7140': f'{(i * 7) % lines:04d}'})
+        lin.put({'BOTSID': 'LIN'}, {'BOTSID': 'QTY', 'C186.6060': str(i * 10)})
+    root.put({'BOTSID': 'UNH'}, {'BOTSID': 'UNS', '0081': 'S'})
+    root.put({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0074': str(lines + 4)})
+    return root
+
+
+def records(node):
+    return [node.record] + [records(childnode) for childnode in node.children]
+
+
+def operations(root):
+    """do operations on tree; return results."""
+    results = [
+        root.get({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0074': None}),
+        root.get({'BOTSID': 'UNH'}, {'BOTSID': 'DTM', 'BOTSIDnr': '2', 'C507.2380': None}),
+        root.get({'BOTSID': 'UNH'}, {'BOTSID': 'DTM', 'C507.2380': None}),
+        root.get({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '7'}, {'BOTSID': 'QTY', 'C186.6060': None}),
+        root.get({'BOTSID': 'UNH'}, {'BOTSID': 'FTX', '4451': None}),
+        root.getrecord({'BOTSID': 'UNH'}, {'BOTSID': 'UNS'}),
+        [lin.get({'BOTSID': 'LIN', '1082': None}) for lin in root.getloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'})],
+        len(list(root.getloop_including_mpath({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'}, {'BOTSID': 'QTY'}))),
+        root.change(where=({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '3'}), change={'1229': '1'}),
+        root.delete({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '5'}),
+        root.delete({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '5'}),
+    ]
+    # put in existing LIN; putloop appends
+    root.put({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '6'}, {'BOTSID': 'QTY', 'C186.6063': '21'})
+    root.putloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '99'})
+    results.append(root.get({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '99'}))
+    root.sort({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', 'C212.7140': None})
+    results.append(root.get({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': None}))
+    # children changed directly (as in message.py, inmessage.py)
+    root.children.remove(root.children[1])
+    results.append(root.get({'BOTSID': 'UNH'}, {'BOTSID': 'DTM', 'BOTSIDnr': '2', 'C507.2380': None}))
+    root.children = root.children[:10]
+    results.append(root.get({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0074': None}))
+    results.append(root.get({'BOTSID': 'UNH'}, {'BOTSID': None}))
+    results.append(records(root))
+    return results
+
+
+def directchanges(root, inplace):
+    """replace a LIN, reverse children, change BOTSID of a LIN (in place or via new list); return results."""
+    lin0 = {'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '0'}
+    root.get(*lin0)
+    position = root.children.index(next(root.getloop(*lin0)))
+    if inplace:
+        root.children[position] = Node({'BOTSID': 'XXX'})
+        root.children.reverse()
+    else:
+        root.children = root.children[:position] + [Node({'BOTSID': 'XXX'})] + root.children[position + 1:]
+        root.children = root.children[::-1]
+    results = [
+        root.get(*lin0),
+        next(root.getloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'})).get({'BOTSID': 'LIN', '1082': None}),
+    ]
+    lin5 = next(root.getloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '5'}))
+    lin5.record['BOTSID'] = 'ALI'
+    if not inplace:
+        root.children = list(root.children)
+    results.append(root.get({'BOTSID': 'UNH'}, {'BOTSID': 'ALI', '1082': None}))
+    return results
+
+
+class TestNodeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = Node.childindex
+
+    def tearDown(self):
+        Node.childindex = self.saved
+
+    def testsameresults(self):
+        Node.childindex = 0
+        expected = operations(tree())
+        Node.childindex = 2
+        root = tree()
+        self.assertEqual(operations(root), expected)
+        self.assertIsNotNone(root._childindex)
+        self.assertEqual(expected[0], '24')
+        self.assertEqual(expected[2], None)
+        self.assertEqual(expected[3], '70')
+        self.assertEqual(expected[9:11], [True, False])
+        self.assertEqual(expected[-2], 'LIN')
+
+    def testindex(self):
+        Node.childindex = 0
+        root = tree(3)
+        self.assertIsNone(root._childindex)
+        Node.childindex = 2
+        root.get({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0074': None})
+        self.assertEqual(
+            [node.record['1082'] for node in root._childindex[2][('LIN', '1')]], ['0', '1', '2']
+        )
+        # append keeps index
+        root.putloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '3'})
+        self.assertEqual(root._childindex[1], len(root.children))
+        self.assertEqual(len(root._childindex[2][('LIN', '1')]), 4)
+        root.delete({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', '1082': '0'})
+        self.assertIsNone(root._childindex)
+        # few children: no index
+        Node.childindex = 100
+        root.get({'BOTSID': 'UNH'}, {'BOTSID': 'UNT', '0074': None})
+        self.assertIsNone(root._childindex)
+
+    def testdirectchanges(self):
+        # index is opt-in: children replaced or reordered in place and BOTSID of a record changed are not
+        # detected by the index. Without index (default) the results are right.
+        self.assertEqual(self.saved, 0)
+        self.assertEqual(directchanges(tree(), inplace=True), [None, '19', '5'])
+        # with index: assign a new list to children
+        Node.childindex = 2
+        self.assertEqual(directchanges(tree(), inplace=False), [None, '19', '5'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+node.sort with compiled compare keys: one or more keys, reverse per key, stable, sort_decimal;
+node.group_by: nodes grouped by value(s) of compare.
+"""
+
+import unittest
+
+from bots.exceptions import MappingFormatError
+from bots.node import Mpath, Node
+
+LINES = [
+    # 1082, article, qty, date
+    ('1', 'B', '10', '20240102'),
+    ('2', 'A', '2.5', '20240101'),
+    ('3', 'B', '0', '20240101'),
+    ('4', None, '100', '20240102'),
+    ('5', 'A', None, '20240101'),
+]
+
+
+def tree():
+    root = Node({'BOTSID': 'UNH'})
+    for linenr, article, qty, date in LINES:
+        lin = root.putloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'})
+        lin.put({'BOTSID': 'LIN', '1082': linenr})
+        if article:
+            lin.put({'BOTSID': 'LIN', 'C212.7140': article})
+        if qty:
+            lin.put({'BOTSID': 'LIN'}, {'BOTSID': 'QTY', 'C186.6060': qty})
+        lin.put({'BOTSID': 'LIN'}, {'BOTSID': 'DTM', 'C507.2380': date})
+    return root
+
+
+def linenrs(nodes):
+    return [node.record['1082'] for node in nodes]
+
+
+ARTICLE = ({'BOTSID': 'LIN', 'C212.7140': None},)
+QTY = ({'BOTSID': 'LIN'}, {'BOTSID': 'QTY', 'C186.6060': None})
+DATE = ({'BOTSID': 'LIN'}, {'BOTSID': 'DTM', 'C507.2380': None})
+
+
+class TestNodeSort(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = Node.checklevel
+        Node.checklevel = 1
+
+    def tearDown(self):
+        Node.checklevel = self.saved
+
+    def testsort(self):
+        root = tree()
+        root.sort({'BOTSID': 'UNH'}, {'BOTSID': 'LIN', 'C212.7140': None})
+        # no value: sort_if_none ('AAAAAAAAAAA'); stable
+        self.assertEqual(linenrs(root.children), ['2', '5', '4', '1', '3'])
+        root = tree()
+        root.sort(sortfrom={'BOTSID': 'UNH'}, compare={'BOTSID': 'LIN', 'C212.7140': None}, reverse=True)
+        self.assertEqual(linenrs(root.children), ['1', '3', '4', '2', '5'])
+        root = tree()
+        root.sort(sortfrom=({'BOTSID': 'UNH'},), compare=Mpath(*QTY), sort_decimal=True)
+        self.assertEqual(linenrs(root.children), ['3', '5', '2', '1', '4'])
+
+    def testmultikey(self):
+        root = tree()
+        root.sort(sortfrom=({'BOTSID': 'UNH'},), compare=[DATE, QTY], sort_decimal=True)
+        self.assertEqual(linenrs(root.children), ['3', '5', '2', '1', '4'])
+        root = tree()
+        root.sort(sortfrom=({'BOTSID': 'UNH'},), compare=[DATE, ARTICLE], reverse=[True, False])
+        self.assertEqual(linenrs(root.children), ['4', '1', '2', '5', '3'])
+        # sort on secondary key after sort on main key (stable)
+        root = tree()
+        root.sort(sortfrom=({'BOTSID': 'UNH'},), compare=ARTICLE)
+        root.sort(sortfrom=({'BOTSID': 'UNH'},), compare=DATE)
+        self.assertEqual(linenrs(root.children), ['2', '5', '3', '4', '1'])
+
+    def testreverselist(self):
+        # one compare key with reverse as list
+        root = Node({'BOTSID': 'UNH'})
+        for linenr in ('12', '9', '100', '2'):
+            root.putloop({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'}).put({'BOTSID': 'LIN', '1082': linenr})
+        root.sort(sortfrom=({'BOTSID': 'UNH'},), compare=({'BOTSID': 'LIN', '1082': None},), reverse=[False])
+        self.assertEqual(linenrs(root.children), ['100', '12', '2', '9'])
+        root.sort(
+            sortfrom=({'BOTSID': 'UNH'},), compare=({'BOTSID': 'LIN', '1082': None},), reverse=[True],
+            sort_decimal=True,
+        )
+        self.assertEqual(linenrs(root.children), ['100', '12', '9', '2'])
+
+    def testgroupby(self):
+        root = tree()
+        groups = root.group_by({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'}, compare=DATE)
+        self.assertEqual(list(groups), ['20240102', '20240101'])
+        self.assertEqual(linenrs(groups['20240101']), ['2', '3', '5'])
+        groups = root.group_by(Mpath({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'}), compare=[DATE, ARTICLE])
+        self.assertEqual(linenrs(groups[('20240101', 'A')]), ['2', '5'])
+        self.assertEqual(linenrs(groups[('20240102', None)]), ['4'])
+
+    def testerrors(self):
+        root = tree()
+        with self.assertRaises(MappingFormatError):
+            root.sort(sortfrom=({'BOTSID': 'UNH'},), compare=({'BOTSID': 'LIN', 'C212.7140': 'A'},))
+        with self.assertRaises(MappingFormatError):
+            root.sort(sortfrom=({'BOTSID': 'UNH'},), compare=[DATE, ARTICLE], reverse=[True])
+        with self.assertRaises(MappingFormatError):
+            root.group_by({'BOTSID': 'UNH'}, {'BOTSID': 'LIN'})
+
+
+if __name__ == '__main__':
+    unittest.main()
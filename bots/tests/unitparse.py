@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+parsing of lex_records with the lookup tables compiled by grammar: position of records, errors S50/S51.
+check of node tree (message._canonicaltree) with lookup tables of grammar: sort of records, errors S03/S04.
+"""
+
+import types
+import unittest
+
+from bots import inmessage
+from bots import message
+from bots import node
+from bots.botsconfig import ID, MIN, MAX, LEVEL, LEVELINDEX, BOTSIDNR, NEXTINDEX, NEXTMANDATORY
+
+try:
+    from utilsunit import compilestructure
+except ImportError:
+    from .utilsunit import compilestructure
+
+
+def makestructure():
+    structure = [
+        {ID: 'ST', MIN: 1, MAX: 1, LEVEL: [
+            {ID: 'BEG', MIN: 1, MAX: 1},
+            {ID: 'REF', MIN: 0, MAX: 9},
+            {ID: 'DTM', MIN: 0, MAX: 9},
+            {ID: 'N1', MIN: 0, MAX: 9, LEVEL: [
+                {ID: 'N3', MIN: 0, MAX: 2},
+                {ID: 'N4', MIN: 1, MAX: 1},
+            ]},
+            {ID: 'REF', MIN: 0, MAX: 9},
+            {ID: 'CTT', MIN: 0, MAX: 1},
+            {ID: 'SE', MIN: 1, MAX: 1},
+        ]},
+    ]
+    return compilestructure(structure)
+
+
+class x12(inmessage.x12):
+    """only record ID and BOTSIDnr are parsed."""
+
+    def _parsefields(self, lex_record, record_definition):
+        return {'BOTSID': lex_record[ID].value, 'BOTSIDnr': record_definition[BOTSIDNR]}
+
+
+def parse(structure, recordids):
+    """parse records (only record ID) in level of ST; return the parsed records or the error."""
+    ediobject = x12({'editype': 'x12', 'messagetype': 'x12'})
+    ediobject.defmessage = types.SimpleNamespace(structure=structure)
+    ediobject._lineindex = inmessage.LineIndex('X\n' * len(recordids))
+    lex_records = []
+    for count, recordid in enumerate(recordids):
+        lex_record = inmessage.LexRecord([inmessage.LexToken(recordid, 0, 0, None)])
+        lex_record.offset = count * 2
+        lex_records.append(lex_record)
+    ediobject.iternext_lex_record = iter(lex_records)
+    inode = node.Node()
+    try:
+        leftover = ediobject._parse(structure_level=structure[0][LEVEL], inode=inode)
+    except inmessage.InMessageError as exc:
+        return str(exc)
+    result = []
+    for childnode in inode.children:
+        result.append((childnode.record['BOTSID'], childnode.record['BOTSIDnr']))
+        for grandchildnode in childnode.children:
+            result.append((grandchildnode.record['BOTSID'], grandchildnode.record['BOTSIDnr']))
+    return result, leftover and leftover[ID].value
+
+
+class Checktree(message.Message):
+    """only records are checked, not fields."""
+
+    def _canonicalfields(self, node_instance, record_definition):
+        pass
+
+
+def maketree(*records):
+    """node tree; a record is (BOTSID, BOTSIDnr) or (BOTSID, BOTSIDnr, [records of children])."""
+    root = node.Node({'BOTSID': 'ST'})
+    for record in records:
+        childnode = node.Node({'BOTSID': record[0], 'BOTSIDnr': record[1]})
+        for childrecord in record[2] if len(record) > 2 else ():
+            childnode.append(node.Node({'BOTSID': childrecord[0], 'BOTSIDnr': childrecord[1]}))
+        root.append(childnode)
+    return root
+
+
+def checktree(structure, root):
+    """check tree; return the records of tree and the errors."""
+    messageobject = Checktree({})
+    messageobject._canonicaltree(root, structure[0])
+    result = []
+    for childnode in root.children:
+        result.append(childnode.record['BOTSID'] + childnode.record['BOTSIDnr'])
+        result.extend('-' + grandchildnode.record['BOTSID'] for grandchildnode in childnode.children)
+    return result, [error.split(' min')[0].split(' max')[0] for error in messageobject.errorlist]
+
+
+class TestParse(unittest.TestCase):
+
+    def testtables(self):
+        level = makestructure()[0][LEVEL]
+        self.assertEqual(level[0][NEXTINDEX], {'REF': 1, 'DTM': 2, 'N1': 3, 'CTT': 5, 'SE': 6})
+        self.assertEqual(level[1][NEXTINDEX], {'DTM': 2, 'N1': 3, 'REF': 4, 'CTT': 5, 'SE': 6})
+        self.assertEqual(level[6][NEXTINDEX], {})
+        self.assertEqual([i[NEXTMANDATORY] for i in level], [6, 6, 6, 6, 6, 6, 7])
+        self.assertEqual([i[NEXTMANDATORY] for i in level[3][LEVEL]], [1, 2])
+
+    def testparse(self):
+        structure = makestructure()
+        self.assertEqual(
+            parse(structure, ['BEG', 'REF', 'N1', 'N3', 'N4', 'REF', 'SE', 'ST']),
+            ([('BEG', '1'), ('REF', '1'), ('N1', '1'), ('N3', '1'), ('N4', '1'), ('REF', '2'), ('SE', '1')], 'ST'),
+        )
+        # REF repeats in first position; after DTM the second position is used
+        self.assertEqual(
+            parse(structure, ['BEG', 'REF', 'REF', 'DTM', 'REF', 'SE']),
+            ([('BEG', '1'), ('REF', '1'), ('REF', '1'), ('DTM', '1'), ('REF', '2'), ('SE', '1')], None),
+        )
+
+    def testerrors(self):
+        structure = makestructure()
+        # mandatory first record is missing
+        result = parse(structure, ['DTM', 'SE'])
+        self.assertTrue(result.startswith('[S50]: Line:1 pos:1 record:"DTM"'), result)
+        self.assertIn('mandatory record: "ST-BEG"', result)
+        # record is not in level after CTT: skips mandatory SE
+        result = parse(structure, ['BEG', 'CTT', 'DTM', 'SE'])
+        self.assertTrue(result.startswith('[S50]: Line:3 pos:1 record:"DTM"'), result)
+        self.assertIn('mandatory record: "ST-SE"', result)
+        # mandatory record in segment group is skipped
+        result = parse(structure, ['BEG', 'N1', 'REF', 'SE'])
+        self.assertTrue(result.startswith('[S50]: Line:3 pos:1 record:"REF"'), result)
+        self.assertIn('mandatory record: "ST-N1-N4"', result)
+        # no more records
+        result = parse(structure, ['BEG', 'REF'])
+        self.assertTrue(result.startswith('[S51]: Missing mandatory record "ST-SE"'), result)
+        result = parse(structure, [])
+        self.assertTrue(result.startswith('[S51]: Missing mandatory record "ST-BEG"'), result)
+
+    def testlevelindex(self):
+        structure = makestructure()
+        self.assertEqual(
+            structure[0][LEVELINDEX],
+            {('BEG', '1'): 0, ('REF', '1'): 1, ('DTM', '1'): 2, ('N1', '1'): 3, ('REF', '2'): 4, ('CTT', '1'): 5, ('SE', '1'): 6},
+        )
+        self.assertEqual(structure[0][LEVEL][3][LEVELINDEX], {('N3', '1'): 0, ('N4', '1'): 1})
+        self.assertNotIn(LEVELINDEX, structure[0][LEVEL][0])
+
+    def testcanonicaltree(self):
+        structure = makestructure()
+        # records are sorted as in grammar; in order of tree for same record; unknown records are dropped
+        root = maketree(
+            ('SE', '1'), ('REF', '2'), ('N1', '1', [('N4', '1'), ('N3', '1')]), ('BEG', '1'), ('XXX', '1'),
+            ('REF', '1'), ('REF', '3'), ('DTM', '1'), ('N1', '1', [('N4', '1')]),
+        )
+        self.assertEqual(
+            checktree(structure, root),
+            (['BEG1', 'REF1', 'DTM1', 'N11', '-N3', '-N4', 'N11', '-N4', 'REF2', 'SE1'], []),
+        )
+        self.assertIs(root.children[0].structure, structure[0][LEVEL][0])
+
+    def testcanonicaltreeerrors(self):
+        structure = makestructure()
+        # errors in order of grammar; errors of children before error of record
+        root = maketree(
+            ('CTT', '1'), ('N1', '1', [('N3', '1'), ('N3', '1'), ('N3', '1')]), ('CTT', '1'), ('DTM', '1'),
+        )
+        self.assertEqual(
+            checktree(structure, root),
+            (
+                ['DTM1', 'N11', '-N3', '-N3', '-N3', 'CTT1', 'CTT1'],
+                [
+                    '[S03]: Record "ST-BEG" occurs 0 times,',
+                    '[S04]: Record "ST-N1-N3" occurs 3 times,',
+                    '[S03]: Record "ST-N1-N4" occurs 0 times,',
+                    '[S04]: Record "ST-CTT" occurs 2 times,',
+                    '[S03]: Record "ST-SE" occurs 0 times,',
+                ],
+            ),
+        )
+        self.assertEqual(checktree(structure, maketree())[1], ['[S03]: Record "ST-BEG" occurs 0 times,', '[S03]: Record "ST-SE" occurs 0 times,'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+compact record (node.Record, bots.ini compact_records): used as a dict;
+_canonicalfields and _tree2recordfields give the same results for compact record and dict.
+"""
+
+import copy
+import unittest
+
+from bots import message, outmessage
+from bots.botsconfig import FIELDINDEX, FIELDS, ID, MPATH
+from bots.grammar import Grammar
+from bots.node import Node, Record
+
+try:
+    from utilsunit import field
+except ImportError:
+    from .utilsunit import field
+
+
+def composite(name, subfields, maxrepeat=1):
+    return [name, False, subfields, None, False, None, None, None, maxrepeat]
+
+
+STRUCTURE_RECORD = {
+    ID: 'NAD',
+    MPATH: ['NAD'],
+    FIELDS: [
+        field('A', 35, name='BOTSID', mandatory=True),
+        field('A', 35, name='3035', mandatory=True),
+        composite(
+            'C082',
+            [
+                field('A', 35, name='C082.3039', mandatory=True),
+                field('A', 35, name='C082.1131'),
+                field('A', 35, name='C082.3055'),
+            ],
+        ),
+        field('A', 35, name='3164', maxrepeat=3),
+        composite('C080', [field('A', 35, name='C080.3036'), field('A', 35, name='C080.3045')], maxrepeat=2),
+        field('A', 35, name='3251'),
+    ],
+}
+STRUCTURE_RECORD[FIELDINDEX] = Grammar._fieldindex(STRUCTURE_RECORD[FIELDS])
+
+
+def nadrecord():
+    return {
+        'BOTSID': 'NAD',
+        'BOTSIDnr': '1',
+        '3035': 'by',
+        'C082.3039': '8712345000004',
+        'C082.3055': '9',
+        '3164': ['amsterdam', '', 'rotterdam'],
+        'C080.3036': 'x',
+    }
+
+
+class Formatting(message.Message):
+    def _formatfield(self, value, field_definition, structure_record, node_instance):
+        return value.upper()
+
+
+class Writing(outmessage.Outmessage):
+    def _formatfield(self, value, field_definition, structure_record, node_instance):
+        return value
+
+
+class TestRecord(unittest.TestCase):
+
+    def testfieldindex(self):
+        self.assertEqual(
+            STRUCTURE_RECORD[FIELDINDEX],
+            {'BOTSIDnr': 0, 'BOTSID': 1, '3035': 2, 'C082.3039': 3, 'C082.1131': 4, 'C082.3055': 5, '3164': 6,
+             'C080': 7, '3251': 8},
+        )
+
+    def testdict(self):
+        record = Record(STRUCTURE_RECORD[FIELDINDEX], nadrecord())
+        self.assertEqual(record, nadrecord())
+        self.assertEqual(nadrecord(), record)
+        self.assertEqual(len(record), 7)
+        # slots only up to last field present
+        self.assertEqual(len(record.slots), 7)
+        self.assertEqual(list(record)[:3], ['BOTSIDnr', 'BOTSID', '3035'])
+        self.assertEqual(record['C082.3039'], '8712345000004')
+        self.assertNotIn('C082.1131', record)
+        self.assertNotIn('3251', record)
+        self.assertIsNone(record.get('3251'))
+        self.assertEqual(record.get('C082.1131', 'default'), 'default')
+        with self.assertRaises(KeyError):
+            record['3251']
+        with self.assertRaises(KeyError):
+            del record['C082.1131']
+        record['3251'] = 'nl'
+        self.assertEqual(len(record.slots), 9)
+        del record['3035']
+        self.assertNotIn('3035', record)
+        self.assertEqual(record.pop('3251'), 'nl')
+        self.assertEqual(record.setdefault('3035', 'su'), 'su')
+        # field not in grammar
+        record['UNKNOWN'] = '1'
+        self.assertEqual(record.extra, {'C080.3036': 'x', 'UNKNOWN': '1'})
+        self.assertEqual(list(record)[-1], 'UNKNOWN')
+        record.update({'UNKNOWN': '2', 'C082.1131': '160'})
+        self.assertEqual(record['UNKNOWN'], '2')
+        self.assertIs(type(record.copy()), dict)
+        self.assertEqual(record.copy(), dict(record))
+        # deepcopy (eg out.root = copy.deepcopy(inn.root))
+        self.assertEqual(copy.deepcopy(record), record)
+        self.assertEqual(Node(Record(STRUCTURE_RECORD[FIELDINDEX], {'BOTSID': 'NAD'})).record['BOTSIDnr'], '1')
+
+    def testcanonicalfields(self):
+        for record in [nadrecord(), Record(STRUCTURE_RECORD[FIELDINDEX], nadrecord())]:
+            node_instance = Node(record)
+            Formatting({})._canonicalfields(node_instance, STRUCTURE_RECORD)
+            self.assertEqual(
+                dict(node_instance.record),
+                {
+                    'BOTSID': 'NAD',
+                    'BOTSIDnr': '1',
+                    '3035': 'BY',
+                    'C082.3039': '8712345000004',
+                    'C082.3055': '9',
+                    '3164': ['AMSTERDAM', '', 'ROTTERDAM'],
+                    'C080.3036': 'x',
+                },
+            )
+
+    def testtree2recordfields(self):
+        results = []
+        for record in [nadrecord(), Record(STRUCTURE_RECORD[FIELDINDEX], nadrecord())]:
+            out = Writing({'stripfield_sep': True})
+            out.lex_records = []
+            out._tree2recordfields(record, STRUCTURE_RECORD)
+            results.append(out.lex_records)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual([lex_field[0] for lex_field in results[0][0]][:5], ['NAD', 'by', '8712345000004', '', '9'])
+
+
+if __name__ == '__main__':
+    unittest.main()
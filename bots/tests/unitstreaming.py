@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+streaming translation: which messages can be streamed, envelope and queries of a streamed message.
+json: reading a list of messages in blocks.
+"""
+
+import json
+import os
+import tempfile
+import types
+import unittest
+
+from bots import inmessage
+from bots import node
+from bots.botsconfig import ID, MIN, MAX, LEVEL, QUERIES, SUBTRANSLATION
+
+
+ST = {ID: 'ST', MIN: 0, MAX: 99999,
+      QUERIES: {'reference': {'BOTSID': 'ST', 'ST02': None}},
+      SUBTRANSLATION: [{'BOTSID': 'ST', 'ST01': None}]}
+GS = {ID: 'GS', MIN: 0, MAX: 99999,
+      QUERIES: {'version': {'BOTSID': 'GS', 'GS08': None}},
+      LEVEL: [ST, {ID: 'GE', MIN: 1, MAX: 1}]}
+ISA = {ID: 'ISA', MIN: 0, MAX: 99999,
+       QUERIES: {'frompartner': {'BOTSID': 'ISA', 'ISA06': None}, 'version': {'BOTSID': 'ISA', 'ISA12': None}},
+       LEVEL: [GS, {ID: 'IEA', MIN: 1, MAX: 1}]}
+
+
+def makeobject(structure, nextmessage, nextmessage2=None):
+    ediobject = inmessage.x12({'editype': 'x12', 'messagetype': 'x12'})
+    ediobject.defmessage = types.SimpleNamespace(
+        structure=structure, nextmessage=nextmessage, nextmessage2=nextmessage2)
+    return ediobject
+
+
+class TestStreaming(unittest.TestCase):
+
+    def testmessagedefinitions(self):
+        ediobject = makeobject([ISA], ({'BOTSID': 'ISA'}, {'BOTSID': 'GS'}, {'BOTSID': 'ST'}))
+        self.assertEqual(ediobject._streaming_messagedefinitions(), {id(ST)})
+        # message is whole interchange (eg tradacoms STX): nothing to stream
+        ediobject = makeobject([ISA], ({'BOTSID': 'ISA'},))
+        self.assertIsNone(ediobject._streaming_messagedefinitions())
+        # message is not a SUBTRANSLATION
+        ediobject = makeobject([ISA], ({'BOTSID': 'ISA'}, {'BOTSID': 'GS'}))
+        self.assertIsNone(ediobject._streaming_messagedefinitions())
+        # no split up in messages
+        ediobject = makeobject([ISA], None)
+        self.assertIsNone(ediobject._streaming_messagedefinitions())
+
+    def testenvelopeofmessage(self):
+        ediobject = makeobject([ISA], ({'BOTSID': 'ISA'}, {'BOTSID': 'GS'}, {'BOTSID': 'ST'}))
+        ediobject.root = node.Node()
+        nodeisa = node.Node({'BOTSID': 'ISA', 'ISA06': 'SENDER   ', 'ISA12': '00401'})
+        nodegs = node.Node({'BOTSID': 'GS', 'GS08': '004010'})
+        nodest1 = node.Node({'BOTSID': 'ST', 'ST01': '850', 'ST02': '0001'})
+        nodest2 = node.Node({'BOTSID': 'ST', 'ST01': '850', 'ST02': '0002'})
+        nodest2.queries = {'messagetype': '850004010'}
+        ediobject.root.append(nodeisa)
+        nodeisa.append(nodegs)
+        nodegs.append(nodest1)
+        nodegs.append(nodest2)
+        envelope_nodes, queries = ediobject._envelopeofmessage(nodest2)
+        self.assertEqual(envelope_nodes, [nodeisa, nodegs])
+        # queries of message have priority over queries of GS, GS over ISA
+        self.assertEqual(
+            queries,
+            {'messagetype': '850004010', 'reference': '0002', 'version': '004010', 'frompartner': 'SENDER'},
+        )
+
+
+class TestJsonStreaming(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def write(self, content):
+        with open(self.filename, 'w', encoding='utf-8') as filehandler:
+            filehandler.write(content)
+
+    def testreader(self):
+        values = [{'a': 'é€\n', 'b': [1, 2.5, None]}, 12345, 'text', [], True, -1.5e-07, False, None, 'tru']
+        self.write(' [\n' + ' ,\n '.join(json.dumps(value) for value in values) + ']  \n')
+        for size in (1, 2, 5, 65536):
+            reader = inmessage.JsonReader(self.filename, 'utf-8', 'strict', size)
+            self.assertEqual(reader.nextchar(), '[')
+            reader.pos += 1
+            result = []
+            while True:
+                result.append(reader.value())
+                char = reader.nextchar()
+                reader.pos += 1
+                if char == ']':
+                    break
+            self.assertEqual(reader.nextchar(), '')
+            reader.close()
+            self.assertEqual(result, values)
+
+    def testreadererror(self):
+        content = '[\n{"a": 1},\n  {"b": 2,, "c": 3}]'
+        self.write(content)
+        with self.assertRaises(json.JSONDecodeError) as expected:
+            json.loads(content)
+        for size in (1, 3, 65536):
+            reader = inmessage.JsonReader(self.filename, 'utf-8', 'strict', size)
+            reader.nextchar()
+            reader.pos += 1
+            reader.value()
+            reader.nextchar()
+            reader.pos += 1
+            with self.assertRaises(inmessage.InMessageError) as error:
+                reader.value()
+            reader.close()
+            self.assertEqual(str(error.exception), str(expected.exception))
+
+    def testreadererrorearly(self):
+        # syntax error: rest of file is not read
+        self.write('[\n{"a": 1,, "b": 2},\n' + ',\n'.join(['{"c": "%s"}' % ('x' * 100)] * 1000) + ']')
+        reader = inmessage.JsonReader(self.filename, 'utf-8', 'strict', 16)
+        reader.nextchar()
+        reader.pos += 1
+        with self.assertRaises(inmessage.InMessageError):
+            reader.value()
+        reader.close()
+        self.assertLess(reader.bytesread, 100)
+
+    def streamingmessages(self, content):
+        self.write(content)
+        ediobject = inmessage.json({'editype': 'json', 'messagetype': 'json', 'checkunknownentities': True})
+        ediobject._jsonreader = inmessage.JsonReader(self.filename, 'utf-8', 'strict', 3)
+        ediobject._jsonoption = ediobject._streamingoption('ST')
+        if not ediobject._jsonoption:
+            return None
+        try:
+            return [dict(message_node.record) for message_node in ediobject._streamingmessages('ST')]
+        finally:
+            ediobject._jsonreader.close()
+
+    def testmessages(self):
+        expected = [{'BOTSID': 'ST', 'BOTSIDnr': '1', 'ST01': '850'}, {'BOTSID': 'ST', 'BOTSIDnr': '1', 'ST01': '1'}]
+        # 1. list of messages, named
+        self.assertEqual(self.streamingmessages('[{"ST": {"ST01": "850"}}, {"ST": {"ST01": 1}}]'), expected)
+        # 2. list of messages, name via grammar; empty message is skipped
+        self.assertEqual(self.streamingmessages('[{"ST01": "850"}, {}, {"ST01": 1}]'), expected)
+        # 4. list of messages, named
+        self.assertEqual(self.streamingmessages('{"ST" : [{"ST01": "850"}, {"ST01": 1}]}'), expected)
+        self.assertEqual(self.streamingmessages(' [ ] '), [])
+        # one message: no streaming
+        self.assertIsNone(self.streamingmessages('{"ST": {"ST01": "850"}}'))
+        self.assertIsNone(self.streamingmessages('{"ST01": "850"}'))
+        with self.assertRaises(inmessage.InMessageError):
+            self.streamingmessages('[{"ST01": "850"}, "text"]')
+        with self.assertRaises(inmessage.InMessageError):
+            self.streamingmessages('{"ST" : [{"ST01": "850"}], "other": 1}')
+
+
+if __name__ == '__main__':
+    unittest.main()
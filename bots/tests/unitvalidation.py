@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+validation profiles (syntax parameters 'validation', 'validation_sample'; message._validationdepth):
+full, structure (format of fields not checked) or nooutput (outgoing messages not checked).
+records are always sorted and fields converted.
+"""
+
+import types
+import unittest
+
+from bots import grammar, message
+from bots.botsconfig import FIELDINDEX, FIELDS, ID, LEVEL, MAX, MIN
+from bots.exceptions import MessageError
+from bots.node import Node
+
+try:
+    from utilsunit import STRUCTURE_RECORD, Edifact, EdifactOut, FixedOut, compilestructure, field
+except ImportError:
+    from .utilsunit import STRUCTURE_RECORD, Edifact, EdifactOut, FixedOut, compilestructure, field
+
+
+def makegrammar():
+    structure = [
+        {ID: 'HEA', MIN: 1, MAX: 1, FIELDS: [
+            field('A', 3, name='BOTSID'), field('D', name='DATE', mandatory=True),
+        ], LEVEL: [
+            {ID: 'REF', MIN: 1, MAX: 1, FIELDS: [field('A', 3, name='BOTSID'), field('A', 3, name='REF')]},
+            {ID: 'LIN', MIN: 0, MAX: 2, FIELDS: [
+                field('A', 3, name='BOTSID'), field('N', 4, decimals=1, name='QTY'), field('A', 3, name='ART'),
+            ]},
+        ]},
+    ]
+    compilestructure(structure)
+    for record_definition in [structure[0]] + structure[0][LEVEL]:
+        record_definition[FIELDINDEX] = grammar.Grammar._fieldindex(record_definition[FIELDS])
+    return types.SimpleNamespace(structure=structure, grammarname='test', formattables={})
+
+
+def maketree():
+    """LIN before (missing) REF; unknown field, date not valid, quantity too big, article too long."""
+    root = Node({'BOTSID': 'HEA', 'DATE': '20231301'})
+    root.append(Node({'BOTSID': 'LIN', 'QTY': '12345.26', 'ART': 'ABCD', 'XX': 'unknown'}))
+    root.append(Node({'BOTSID': 'LIN', 'QTY': '1.5'}))
+    root.append(Node({'BOTSID': 'LIN'}))
+    return root
+
+
+def check(messageclass, defmessage=None, **ta_info):
+    """check tree; return the records of tree and the errors."""
+    messageobject = messageclass(
+        dict(has_structure=True, checkunknownentities=True, triad='', decimaal=',', lengthnumericbare=True, **ta_info)
+    )
+    root = maketree()
+    messageobject.checkmessage(root, defmessage or makegrammar(), subtranslation=True)
+    records = [dict(root.record)] + [dict(childnode.record) for childnode in root.children]
+    return records, errorcodes(messageobject)
+
+
+def errorcodes(messageobject):
+    return [errortxt.split(':')[0] for errortxt in messageobject.errorlist]
+
+
+class TestValidation(unittest.TestCase):
+
+    def setUp(self):
+        message._validationcounts.clear()
+
+    def testfull(self):
+        records, errors = check(EdifactOut)
+        self.assertEqual(errors, ['[F01]', '[F22]', '[S03]', '[F28]', '[F20]', '[S04]'])
+        self.assertEqual(records[1], {'BOTSID': 'LIN', 'BOTSIDnr': '1', 'QTY': '12345,3', 'ART': 'ABCD'})
+
+    def teststructure(self):
+        # format of fields is not checked; unknown entities, occurences and mandatory fields are checked
+        records, errors = check(EdifactOut, validation='structure')
+        self.assertEqual(errors, ['[F01]', '[S03]', '[S04]'])
+        self.assertEqual(records[1], {'BOTSID': 'LIN', 'BOTSIDnr': '1', 'QTY': '12345,3', 'ART': 'ABCD'})
+        records, errors = check(Edifact, validation='structure')
+        self.assertEqual(errors, ['[F01]', '[S03]', '[S04]'])
+        self.assertEqual(records[2], {'BOTSID': 'LIN', 'BOTSIDnr': '1', 'QTY': '1.5'})
+
+    def testnooutput(self):
+        # incoming messages: full check
+        self.assertEqual(
+            check(Edifact, validation='nooutput')[1], ['[F01]', '[F07]', '[S03]', '[F10]', '[F14]', '[F05]', '[S04]']
+        )
+        # outgoing messages: not checked; fields not in grammar are dropped, fields are converted
+        records, errors = check(EdifactOut, validation='nooutput')
+        self.assertEqual(errors, [])
+        self.assertEqual(records[1], {'BOTSID': 'LIN', 'BOTSIDnr': '1', 'QTY': '12345,3', 'ART': 'ABCD'})
+        # content that can not be converted is reported
+        messageobject = EdifactOut(dict(decimaal=',', lengthnumericbare=True, validation='nooutput'))
+        messageobject.validation = messageobject._validationdepth()
+        formatter = messageobject._formatter(field('N', 4, decimals=1, name='QTY'))
+        self.assertEqual(formatter(messageobject, 'abc', STRUCTURE_RECORD, None), 'abc')
+        self.assertEqual(errorcodes(messageobject), ['[F26]'])
+
+    def testconverted(self):
+        # fixed: alignment is always done
+        messageobject = FixedOut(dict(decimaal='.', lengthnumericbare=False, validation='structure'))
+        messageobject.validation = messageobject._validationdepth()
+        self.assertEqual(messageobject.validation, 'structure')
+        formatter = messageobject._formatter(field('A', 5, 5, fmt='AR', name='ART'))
+        self.assertEqual(formatter(messageobject, 'ab', STRUCTURE_RECORD, None), '   ab')
+        # length is not checked
+        self.assertEqual(formatter(messageobject, 'abcdefg', STRUCTURE_RECORD, None), 'abcdefg')
+        formatter = messageobject._formatter(field('N', 6, 6, 2, name='QTY'))
+        self.assertEqual(formatter(messageobject, '1.5', STRUCTURE_RECORD, None), '001.50')
+        self.assertEqual(messageobject.errorlist, [])
+
+    def testsample(self):
+        defmessage = makegrammar()
+        errors = [
+            len(check(EdifactOut, defmessage, validation='structure', validation_sample=3, messagetype='ORDERS')[1])
+            for _ in range(7)
+        ]
+        self.assertEqual(errors, [6, 3, 3, 6, 3, 3, 6])
+        # counted for each messagetype and partners
+        self.assertEqual(len(check(EdifactOut, defmessage, validation='structure', validation_sample=3)[1]), 6)
+        self.assertEqual(
+            len(check(EdifactOut, defmessage, validation='structure', validation_sample=3, topartner='P')[1]), 6
+        )
+        # compiled formatters with and without check of format
+        self.assertEqual(len(defmessage.formattables), 2)
+
+    def testunknown(self):
+        messageobject = EdifactOut({'validation': 'partial'})
+        self.assertRaises(MessageError, messageobject._validationdepth)
+        self.assertEqual(EdifactOut({})._validationdepth(), 'full')
+        for sample in ('x', [3]):
+            self.assertRaises(MessageError, EdifactOut({'validation_sample': sample})._validationdepth)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+no plugin needed.
+incoming xml: bots-nodes-tree build by xml_iterparse is the same as by parsing the complete xml file.
+"""
+
+import os
+import tempfile
+import types
+import unittest
+import xml.etree.ElementTree as ET
+
+from bots import inmessage
+from bots.botsconfig import ID, MIN, MAX, LEVEL
+
+
+STRUCTURE = [
+    {ID: 'message', MIN: 1, MAX: 1, LEVEL: [
+        {ID: 'partys', MIN: 0, MAX: 1, LEVEL: [
+            {ID: 'party', MIN: 1, MAX: 99},
+        ]},
+        {ID: 'lines', MIN: 0, MAX: 1, LEVEL: [
+            {ID: 'line', MIN: 1, MAX: 99999},
+        ]},
+    ]},
+]
+
+XMLFILE = b'''<?xml version="1.0" encoding="utf-8" ?>
+<message sender=" 111 " empty="  ">text of message
+    <receiver attr="x"> 222 </receiver>
+    <empty/>
+    <partys>
+        <party qual="BY"><id>1</id>  <name> name 1 </name></party>
+        <party><id>2</id><unknown><deeper>a</deeper></unknown></party>
+    </partys>
+    <unknown2><id>3</id></unknown2>
+    <lines>
+        <line><linenum>1</linenum></line>
+        <line>
+            text of line
+            <linenum a="b">2</linenum>
+        </line>
+    </lines>
+    <docnum>last field</docnum>
+</message>
+'''
+
+
+def dumpnode(inode):
+    return (list(inode.record.items()), [dumpnode(childnode) for childnode in inode.children])
+
+
+class TestXmlIterparse(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp(suffix='.xml')
+        os.write(handle, XMLFILE)
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def parse(self, classofxml, iterparse):
+        ediobject = classofxml({'editype': 'xml', 'messagetype': 'orders',
+                                'attributemarker': '__', 'checkunknownentities': False})
+        ediobject.defmessage = types.SimpleNamespace(structure=STRUCTURE)
+        ediobject.stackinit()
+        if iterparse:
+            root = ediobject._iterparse2botstree(self.filename, ET.XMLParser())
+        else:
+            etreeroot = ET.parse(self.filename).getroot()
+            ediobject._handle_empty(etreeroot)
+            root = ediobject._etree2botstree(etreeroot)
+        self.assertEqual(ediobject.stack, [ediobject.stack[0]])
+        return dumpnode(root)
+
+    def testxml(self):
+        result = self.parse(inmessage.xml, iterparse=True)
+        self.assertEqual(result, self.parse(inmessage.xml, iterparse=False))
+        self.assertEqual(
+            result[0],
+            [('message__sender', '111'), ('BOTSID', 'message'), ('BOTSCONTENT', 'text of message'),
+             ('BOTSIDnr', '1'), ('receiver', '222'), ('receiver__attr', 'x'), ('docnum', 'last field')],
+        )
+        self.assertEqual([childnode[0][0] for childnode in result[1]], [('BOTSID', 'partys'), ('BOTSID', 'lines')])
+
+    def testxmlnocheck(self):
+        result = self.parse(inmessage.xmlnocheck, iterparse=True)
+        self.assertEqual(result, self.parse(inmessage.xmlnocheck, iterparse=False))
+        self.assertEqual(
+            [childnode[0][0] for childnode in result[1]],
+            [('BOTSID', 'partys'), ('BOTSID', 'unknown2'), ('BOTSID', 'lines')],
+        )
+
+    def testfirstelements(self):
+        root = inmessage.xml._firstelements(self.filename, ET.XMLParser())
+        self.assertEqual([xmlnode.tag for xmlnode in root], ['receiver', 'empty', 'partys'])
+        self.assertEqual(root.find('partys/party').get('qual'), 'BY')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,7 +9,8 @@ import shutil
 import subprocess
 import sys
 
-from bots import botsglobal, botslib, inmessage, outmessage
+from bots import botsglobal, botslib, grammar, inmessage, outmessage
+from bots.botsconfig import MPATH
 
 if sys.version_info[0] > 2:
     basestring = unicode = str
@@ -135,3 +136,43 @@ def RunTestCompareResults(command,comparedict):
     botsglobal.db.commit()
     comparedicts(comparedict,getreportlastrun()) #check report
 
+
+def compilestructure(structure, grammarname='test'):
+    """structure (without recorddefs) checked and compiled as by grammar.py: MPATH, BOTSIDnr, lookup tables."""
+    grammarobject = grammar.Grammar.__new__(grammar.Grammar)
+    grammarobject.grammarname = grammarname
+    grammarobject._checkstructure(structure, [])
+    grammarobject._checkbotscollision(structure)
+    grammarobject._compilestructure(structure)
+    return structure
+
+
+def field(bformat, length=8, minlength=0, decimals=0, fmt=None, name='TEST', mandatory=False, maxrepeat=1):
+    # ID, MANDATORY, LENGTH, FORMAT, ISFIELD, DECIMALS, MINLENGTH, BFORMAT, MAXREPEAT
+    return [name, mandatory, length, fmt or bformat, True, decimals, minlength, bformat, maxrepeat]
+
+
+STRUCTURE_RECORD = {MPATH: ['UNH', 'LIN']}
+
+
+class ErrorList:
+    """collect errors (add2errorlist uses bots.ini)."""
+
+    def add2errorlist(self, errortxt):
+        self.errorlist.append(errortxt)
+
+
+class Edifact(ErrorList, inmessage.edifact):
+    pass
+
+
+class Fixed(ErrorList, inmessage.fixed):
+    pass
+
+
+class EdifactOut(ErrorList, outmessage.edifact):
+    pass
+
+
+class FixedOut(ErrorList, outmessage.fixed):
+    pass